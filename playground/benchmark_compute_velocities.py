@@ -0,0 +1,60 @@
+"""Time to compute velocities of paths with 10k to 1M points.
+
+run with: python playground/benchmark_compute_velocities.py
+"""
+import time
+import numpy as np
+from slither.core.geodetic import dist_on_earth, compute_velocities
+
+
+def compute_velocities_loop(timestamps, coords):
+    """Previous implementation: loop over all steps."""
+    delta_t = np.diff(timestamps)
+    dists = dist_on_earth(
+        coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+    n_steps = len(timestamps)
+    velocities = np.empty(n_steps)
+    velocities[0] = 0.0
+    total_distance = 0.0
+
+    for t in range(1, n_steps):
+        dt = delta_t[t - 1]
+        if dt <= 0.0:
+            velocity = velocities[t - 1]
+        else:
+            velocity = dists[t - 1] / dt
+            total_distance += dists[t - 1]
+        velocities[t] = velocity
+    return velocities, total_distance
+
+
+def make_path(n_steps, random_state):
+    timestamps = np.cumsum(random_state.choice(
+        [0.0, 1.0], size=n_steps, p=[0.05, 0.95]))
+    coords = np.deg2rad(np.column_stack((
+        53.0 + np.cumsum(random_state.randn(n_steps) * 1e-5),
+        8.8 + np.cumsum(random_state.randn(n_steps) * 1e-5))))
+    return timestamps, coords
+
+
+def benchmark(compute, timestamps, coords, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = compute(timestamps, coords)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    random_state = np.random.RandomState(0)
+    print("%10s %10s %14s %8s" % ("n_steps", "loop [s]", "vectorized [s]",
+                                  "speedup"))
+    for n_steps in [10000, 100000, 1000000]:
+        timestamps, coords = make_path(n_steps, random_state)
+        old, expected = benchmark(compute_velocities_loop, timestamps, coords)
+        new, result = benchmark(compute_velocities, timestamps, coords)
+        np.testing.assert_array_equal(result[0], expected[0])
+        assert result[1] == expected[1]
+        print("%10d %10.4f %14.4f %7.1fx" % (n_steps, old, new, old / new))
@@ -0,0 +1,82 @@
+"""Time to compute records for all distances of a sport.
+
+run with: python playground/benchmark_fastest_part.py [n_steps]
+"""
+import sys
+import time
+from collections import deque
+import numpy as np
+from slither.core.config import config
+from slither.core.analysis import fastest_parts
+
+
+def fastest_part_loop(sport, timestamps, velocities, distance):
+    """Previous implementation: one iteration per step."""
+    queue_dist = 0.0
+    queue_time = 0.0
+    dqueue = deque()
+    tqueue = deque()
+
+    v = velocities[1:]
+    dt = np.diff(timestamps)
+    record = float("inf")
+
+    for t in range(len(v)):
+        if np.isnan(v[t]):
+            queue_dist = 0.0
+            queue_time = 0.0
+            dqueue.clear()
+            tqueue.clear()
+            continue
+        if v[t] > config["max_velocity"][sport]:
+            continue
+        dist = v[t] * dt[t]
+        dqueue.appendleft(dist)
+        tqueue.appendleft(dt[t])
+        queue_dist += dist
+        queue_time += dt[t]
+        while queue_dist > distance:
+            if queue_time < record:
+                record = queue_time
+            dist = dqueue.pop()
+            time = tqueue.pop()
+            queue_dist -= dist
+            queue_time -= time
+
+    return record
+
+
+def records_loop(timestamps, velocities, distances):
+    return [fastest_part_loop("running", timestamps, velocities, distance)
+            for distance in distances]
+
+
+def records_vectorized(timestamps, velocities, distances):
+    return fastest_parts("running", timestamps, velocities, distances)
+
+
+def benchmark(name, compute, timestamps, velocities, distances, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = compute(timestamps, velocities, distances)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-12s %8.4f s" % (name, best))
+    return best, records
+
+
+if __name__ == "__main__":
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random_state = np.random.RandomState(0)
+    timestamps = np.cumsum(random_state.uniform(0.5, 1.5, n_steps))
+    velocities = random_state.uniform(2.0, 5.0, n_steps)
+    velocities[random_state.rand(n_steps) < 0.001] = np.nan
+    distances = config["records"]["running"]
+    print("%d steps, %d distances" % (n_steps, len(distances)))
+    old, expected = benchmark(
+        "Loop", records_loop, timestamps, velocities, distances)
+    new, records = benchmark(
+        "Vectorized", records_vectorized, timestamps, velocities, distances)
+    np.testing.assert_array_almost_equal(records, expected)
+    print("Speedup: %.1fx" % (old / new))
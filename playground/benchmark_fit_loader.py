@@ -0,0 +1,60 @@
+"""Decoding of record messages from long FIT files.
+
+A long FIT file is simulated by chaining the test file multiple times.
+
+run with: python playground/benchmark_fit_loader.py [n_copies]
+"""
+import sys
+import time
+import numpy as np
+from fitparse import FitFile
+from slither.io.fit_loader import _read_messages
+
+
+def read_records_as_dicts(content):
+    """Previous implementation: list of messages and one dict per record."""
+    fitfile = FitFile(content)
+    records = list(fitfile.get_messages("record"))
+    for message_type in ["sport", "activity", "session"]:
+        list(fitfile.get_messages(message_type))
+    n_trackpoints = len(records)
+    timestamps = []
+    coords = np.full((n_trackpoints, 2), np.nan)
+    altitudes = np.full(n_trackpoints, np.nan)
+    heartrates = np.full(n_trackpoints, np.nan)
+    for i, record in enumerate(records):
+        record = record.get_values()
+        timestamps.append(record["timestamp"])
+        if "position_lat" in record and "position_long" in record:
+            coords[i] = (record["position_lat"], record["position_long"])
+        if "altitude" in record:
+            altitudes[i] = record["altitude"]
+        if "heart_rate" in record:
+            heartrates[i] = record["heart_rate"]
+    return timestamps, coords, altitudes, heartrates
+
+
+def read_records_as_columns(content):
+    return _read_messages(FitFile(content))
+
+
+def benchmark(name, fun, content, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun(content)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-10s %8.3f s" % (name, best))
+    return best
+
+
+if __name__ == "__main__":
+    n_copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open("test_data/running.fit", "rb") as f:
+        content = f.read() * n_copies
+    n_records = len(_read_messages(FitFile(content))[0])
+    print("%d records, %.1f MB" % (n_records, len(content) / 1e6))
+    old = benchmark("dicts", read_records_as_dicts, content)
+    new = benchmark("columns", read_records_as_columns, content)
+    print("Speedup: %.2fx" % (old / new))
@@ -0,0 +1,81 @@
+"""Time to load the path of an activity from the database.
+
+run with: python playground/benchmark_get_path.py [n_trackpoints]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from slither.core.config import config
+from slither.database import Database
+from slither.domain_model import Activity
+
+
+def make_database(n_trackpoints, storage):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(filename)
+    config["trackpoint_storage"] = storage
+    activity = Activity(sport="running", start_time=datetime.now(),
+                        has_path=True)
+    activity.set_path(
+        timestamps=1.5e9 + np.arange(n_trackpoints, dtype=float),
+        coords=np.deg2rad(np.column_stack((
+            np.linspace(53.0, 53.1, n_trackpoints),
+            np.linspace(8.0, 8.1, n_trackpoints)))),
+        altitudes=np.linspace(0.0, 100.0, n_trackpoints),
+        heartrates=np.full(n_trackpoints, 140.0),
+        velocities=np.full(n_trackpoints, 3.0))
+    db.session.add(activity)
+    db.session.commit()
+    config["trackpoint_storage"] = "rows"
+    db.session.close()
+    return filename
+
+
+def get_path_orm(activity):
+    """Previous implementation: one ORM object per trackpoint."""
+    return {
+        "timestamps": np.array(
+            [t.timestamp for t in activity.trackpoints], dtype=float),
+        "coords": np.array(
+            [(t.latitude, t.longitude) for t in activity.trackpoints],
+            dtype=float),
+        "altitudes": np.array(
+            [t.altitude for t in activity.trackpoints], dtype=float),
+        "heartrates": np.array(
+            [t.heartrate for t in activity.trackpoints], dtype=float),
+        "velocities": np.array(
+            [t.velocity for t in activity.trackpoints], dtype=float)
+    }
+
+
+def benchmark(name, get_path, filename, n_trackpoints, repeat=5):
+    db = Database(filename)
+    times = []
+    for _ in range(repeat):
+        # new session, so that nothing is cached
+        db.session.close()
+        activity = db.session.query(Activity).one()
+        start = time.perf_counter()
+        get_path(activity)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-20s %8.4f s %12.0f trackpoints/s"
+          % (name, best, n_trackpoints / best))
+    return best
+
+
+if __name__ == "__main__":
+    n_trackpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("%d trackpoints" % n_trackpoints)
+    rows = make_database(n_trackpoints, "rows")
+    columns = make_database(n_trackpoints, "columns")
+    old = benchmark("ORM objects", get_path_orm, rows, n_trackpoints)
+    new = benchmark("DBAPI cursor", Activity.get_path, rows, n_trackpoints)
+    blobs = benchmark("Columns", Activity.get_path, columns, n_trackpoints)
+    print("Speedup of DBAPI cursor: %.1fx" % (old / new))
+    print("Speedup of columns: %.1fx" % (old / blobs))
+    os.remove(rows)
+    os.remove(columns)
@@ -0,0 +1,123 @@
+"""Query times with and without secondary indexes.
+
+The queries correspond to Database.list_activities_between, summaries per
+sport, Activity.get_path, Service._get_records_for_activity, and
+Service.list_records.
+
+run with: python playground/benchmark_indexes.py [n_activities]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import sqlalchemy
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from slither.core.config import config
+from slither.database import Database
+from slither.domain_model import Activity, Record, Trackpoint, Base
+
+
+N_TRACKPOINTS = 100
+
+
+def make_database(n_activities):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(filename)
+    random_state = np.random.RandomState(0)
+    start = datetime(2000, 1, 1)
+    sports = list(config["records"].keys())
+    activities = []
+    records = []
+    trackpoints = []
+    for i in range(n_activities):
+        activities.append({
+            "id": i + 1, "sport": sports[i % len(sports)],
+            "start_time": start + timedelta(hours=12 * i),
+            "distance": 10000.0, "time": 3600.0, "has_path": True})
+        for distance in config["records"][activities[-1]["sport"]]:
+            records.append({
+                "sport": activities[-1]["sport"], "distance": distance,
+                "time": random_state.rand() * distance, "valid": True,
+                "activity_id": i + 1})
+        trackpoints.extend(
+            {"activity_id": i + 1, "timestamp": float(t), "latitude": 0.0,
+             "longitude": 0.0, "altitude": 0.0, "heartrate": 0.0,
+             "velocity": 0.0} for t in range(N_TRACKPOINTS))
+    with db.engine.begin() as connection:
+        connection.execute(Activity.__table__.insert(), activities)
+        connection.execute(Record.__table__.insert(), records)
+        connection.execute(Trackpoint.__table__.insert(), trackpoints)
+    return filename
+
+
+def drop_indexes(filename):
+    engine = sqlalchemy.create_engine("sqlite:///" + filename)
+    with engine.begin() as connection:
+        for table in Base.metadata.tables.values():
+            for index in table.indexes:
+                connection.exec_driver_sql("DROP INDEX %s" % index.name)
+
+
+def run_queries(filename, n_activities, repeat=3):
+    # Database would add missing indexes
+    engine = sqlalchemy.create_engine("sqlite:///" + filename)
+    session = sessionmaker(bind=engine)()
+    start = datetime(2000, 1, 1)
+    activity_ids = np.linspace(1, n_activities, 100).astype(int).tolist()
+    queries = {
+        "activities between": lambda: [
+            session.query(Activity).filter(
+                Activity.start_time >= start + timedelta(days=7 * week),
+                Activity.start_time < start + timedelta(days=7 * week + 7)
+            ).order_by(Activity.start_time).all() for week in range(100)],
+        "sport, start time": lambda: [
+            session.query(Activity).filter(
+                Activity.sport == "running",
+                Activity.start_time >= start + timedelta(days=30 * month),
+                Activity.start_time < start + timedelta(days=30 * month + 30)
+            ).all() for month in range(100)],
+        "trackpoints": lambda: [
+            session.query(Trackpoint.timestamp).filter(
+                Trackpoint.activity_id == activity_id).all()
+            for activity_id in activity_ids],
+        "records of activity": lambda: [
+            session.query(Record).filter(
+                Record.activity_id == activity_id).order_by(
+                Record.distance).all()
+            for activity_id in activity_ids],
+        "best records": lambda: [
+            session.query(Record, func.min(Record.time)).filter(
+                Record.valid).group_by(Record.sport, Record.distance).all()
+            for _ in range(10)],
+    }
+    results = {}
+    for name, query in queries.items():
+        times = []
+        for _ in range(repeat):
+            session.expire_all()
+            start_time = time.perf_counter()
+            query()
+            times.append(time.perf_counter() - start_time)
+        results[name] = min(times)
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    filename = make_database(n_activities)
+    print("%d activities, %d trackpoints per activity"
+          % (n_activities, N_TRACKPOINTS))
+    with_indexes = run_queries(filename, n_activities)
+    drop_indexes(filename)
+    without_indexes = run_queries(filename, n_activities)
+    os.remove(filename)
+    print("%-20s %12s %12s %8s"
+          % ("Query", "No indexes", "Indexes", "Speedup"))
+    for name in with_indexes:
+        print("%-20s %10.4f s %10.4f s %7.1fx"
+              % (name, without_indexes[name], with_indexes[name],
+                 without_indexes[name] / with_indexes[name]))
@@ -0,0 +1,96 @@
+"""Best records from a GROUP BY over all records and from the leaderboard.
+
+The first query is the previous implementation of Service.list_records, the
+window function corresponds to the previous print_personal_bests.py.
+
+run with: python playground/benchmark_leaderboard.py [n_activities]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
+from slither.core.config import config
+from slither.database import Database
+from slither.domain_model import Activity, LeaderboardEntry, Record
+
+
+def make_database(n_activities):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(filename)
+    random_state = np.random.RandomState(0)
+    start = datetime(2000, 1, 1)
+    sports = list(config["records"].keys())
+    activities = []
+    records = []
+    for i in range(n_activities):
+        activities.append({
+            "id": i + 1, "sport": sports[i % len(sports)],
+            "start_time": start + timedelta(hours=12 * i),
+            "distance": 10000.0, "time": 3600.0, "has_path": False})
+        for distance in config["records"][activities[-1]["sport"]]:
+            records.append({
+                "sport": activities[-1]["sport"], "distance": distance,
+                "time": random_state.rand() * distance
+                if distance <= 10000.0 else float("inf"),
+                "valid": True, "activity_id": i + 1})
+    with db.engine.begin() as connection:
+        connection.execute(Activity.__table__.insert(), activities)
+        connection.execute(Record.__table__.insert(), records)
+    db.rebuild_leaderboards()
+    db.session.commit()
+    return db
+
+
+def group_by(session):
+    q = session.query(Record, func.min(Record.time))
+    grouped = q.filter(Record.valid).group_by(Record.sport, Record.distance)
+    return grouped.order_by(Record.sport, Record.distance).all()
+
+
+def window(session):
+    subquery = session.query(Record, func.rank().over(
+        order_by=Record.time.asc(),
+        partition_by=(Record.sport, Record.distance)
+    ).label("rank")).subquery()
+    return session.query(subquery).filter(subquery.c.rank <= 30).filter(
+        subquery.c.valid).filter(subquery.c.time != float("inf")).all()
+
+
+def leaderboard_best(session):
+    q = session.query(Record).join(
+        LeaderboardEntry, LeaderboardEntry.record_id == Record.id)
+    return q.filter(LeaderboardEntry.rank == 1).order_by(
+        LeaderboardEntry.sport, LeaderboardEntry.distance).all()
+
+
+def leaderboard_top(session):
+    return session.query(LeaderboardEntry).filter(
+        LeaderboardEntry.rank <= 30).all()
+
+
+def measure(query, session, repeat=20):
+    query(session)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        session.expunge_all()
+        query(session)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    db = make_database(n_activities)
+    print("%d activities, %d records, %d leaderboard entries" % (
+        n_activities, db.session.query(Record).count(),
+        db.session.query(LeaderboardEntry).count()))
+    for name, query in [("best: GROUP BY", group_by),
+                        ("best: leaderboard", leaderboard_best),
+                        ("top 30: window function", window),
+                        ("top 30: leaderboard", leaderboard_top)]:
+        print("%-25s %8.2f ms" % (name, 1000.0 * measure(query, db.session)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Disk size and read latency of compressed activity files.
+
+run with: python playground/benchmark_registry_compression.py [n_files]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from slither.registry import Registry
+
+
+FILENAMES = ["test_data/running.tcx", "test_data/running.gpx"]
+
+
+def disk_size(path):
+    return sum(os.path.getsize(os.path.join(path, filename))
+               for filename in os.listdir(path))
+
+
+def benchmark(compression, contents, n_files):
+    try:
+        registry = Registry(tempfile.mkdtemp(), compression=compression)
+        start = time.perf_counter()
+        registry.update_many([
+            (contents[i % len(contents)], "%d.tcx" % i, None)
+            for i in range(n_files)])
+        write_time = time.perf_counter() - start
+    except ImportError as e:
+        print("%-6s %s" % (compression, e))
+        return
+    size = disk_size(registry.base_path)
+    start = time.perf_counter()
+    for i in range(n_files):
+        registry.content("%d.tcx" % i)
+    read_time = time.perf_counter() - start
+    print("%-6s %10.1f MiB %12.2f ms/write %12.2f ms/read"
+          % (compression, size / 1024 ** 2, 1000 * write_time / n_files,
+             1000 * read_time / n_files))
+    registry.close()
+    shutil.rmtree(registry.temp_dir)
+
+
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    contents = []
+    for filename in FILENAMES:
+        with open(filename, "r") as f:
+            contents.append(f.read())
+    print("%d files" % n_files)
+    for compression in ["none", "gzip", "zstd"]:
+        benchmark(compression, contents, n_files)
@@ -0,0 +1,43 @@
+"""Time to split a long path.
+
+run with: python playground/benchmark_splits.py [n_steps] [split_length]
+"""
+import sys
+import time
+import numpy as np
+from slither.core.analysis import compute_splits
+
+
+def splits_argmax(path, split_length):
+    """Previous implementation: one search per split."""
+    velocities = path["velocities"][1:]
+    delta_t = np.diff(path["timestamps"])
+    dist = np.cumsum(velocities * delta_t)
+    indices = []
+    for threshold in range(split_length, int(dist[-1]), split_length):
+        indices.append(np.argmax(dist >= threshold))
+    return indices
+
+
+def benchmark(name, split, path, split_length, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_splits = len(split(path, split_length))
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-14s %8.4f s (%d splits)" % (name, best, n_splits))
+    return best
+
+
+if __name__ == "__main__":
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    split_length = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    random_state = np.random.RandomState(0)
+    path = {"timestamps": np.arange(n_steps, dtype=float),
+            "velocities": random_state.uniform(5.0, 10.0, n_steps)}
+    print("%d steps, splits of %d m" % (n_steps, split_length))
+    old = benchmark("argmax", splits_argmax, path, split_length)
+    new = benchmark("searchsorted", lambda path, split_length: compute_splits(
+        path, "cycling", split_length), path, split_length)
+    print("Speedup: %.1fx" % (old / new))
@@ -0,0 +1,92 @@
+"""Throughput of concurrent reads and writes for each performance profile.
+
+One process stores new activities while another process lists activities,
+e.g. an import script runs while the GUI is open.
+
+run with: python playground/benchmark_sqlite_profile.py [seconds]
+"""
+import os
+import sys
+import tempfile
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from slither.database import Database, PROFILES
+from slither.domain_model import Activity
+
+
+N_TRACKPOINTS = 1000
+
+
+def write(filename, profile, stop, result):
+    db = Database(filename, profile)
+    start_time = datetime(2000, 1, 1)
+    n_trackpoints = N_TRACKPOINTS
+    n_writes = 0
+    while not stop.is_set():
+        activity = Activity(
+            sport="running", start_time=start_time + timedelta(hours=n_writes),
+            distance=10000.0, time=3600.0, has_path=True)
+        activity.set_path(
+            timestamps=np.arange(n_trackpoints, dtype=float),
+            coords=np.zeros((n_trackpoints, 2)),
+            altitudes=np.zeros(n_trackpoints),
+            heartrates=np.zeros(n_trackpoints),
+            velocities=np.zeros(n_trackpoints))
+        db.session.add(activity)
+        db.session.commit()
+        n_writes += 1
+    db.session.close()
+    result["writes"] = n_writes
+
+
+def read(filename, profile, stop, result):
+    db = Database(filename, profile)
+    start_time = datetime(2000, 1, 1)
+    n_reads = 0
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        for activity in db.list_activities_between(
+                start_time + timedelta(days=n_reads % 30),
+                start_time + timedelta(days=n_reads % 30 + 1)):
+            activity.get_path()
+        # end the read transaction like a new query of the GUI would
+        db.session.commit()
+        latencies.append(time.perf_counter() - start)
+        n_reads += 1
+    db.session.close()
+    result["reads"] = n_reads
+    result["max_latency"] = max(latencies)
+
+
+def benchmark(profile, seconds):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    Database(filename, profile).session.close()
+    with multiprocessing.Manager() as manager:
+        stop = manager.Event()
+        result = manager.dict()
+        processes = [multiprocessing.Process(target=fun, args=(
+            filename, profile, stop, result)) for fun in (write, read)]
+        for process in processes:
+            process.start()
+        time.sleep(seconds)
+        stop.set()
+        for process in processes:
+            process.join()
+        result = dict(result)
+    print("%-12s %8.0f writes/s %8.0f reads/s %8.3f s max. read latency"
+          % (profile, result["writes"] / seconds, result["reads"] / seconds,
+             result["max_latency"]))
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(filename + suffix):
+            os.remove(filename + suffix)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    print("%d trackpoints per activity, %g s per profile"
+          % (N_TRACKPOINTS, seconds))
+    for profile in sorted(PROFILES):
+        benchmark(profile, seconds)
@@ -0,0 +1,90 @@
+"""Time to export an activity to TCX.
+
+run with: python playground/benchmark_tcx_export.py [n_trackpoints]
+"""
+import sys
+import time
+from datetime import datetime
+import jinja2
+import numpy as np
+from slither.domain_model import Activity, Trackpoint
+from slither.io.tcx_export import (
+    TcxExport, rad2deg, datetime_to_str, timestamp_to_str)
+
+
+TRACKPOINTS_TEMPLATE = """
+          {%- for trackpoint in trackpoints %}
+          <Trackpoint>
+            <Time>{{ trackpoint.timestamp|timestamp_to_str }}</Time>
+            <HeartRateBpm>
+              <Value>{{ trackpoint.heartrate }}</Value>
+            </HeartRateBpm>
+            {%- if trackpoint.altitude %}
+            <AltitudeMeters>{{ trackpoint.altitude }}</AltitudeMeters>
+            {%- endif %}
+            <Position>
+              <LatitudeDegrees>{{ trackpoint.latitude|rad2deg }}</LatitudeDegrees>
+              <LongitudeDegrees>{{ trackpoint.longitude|rad2deg }}</LongitudeDegrees>
+            </Position>
+          </Trackpoint>
+          {%- endfor %}"""
+
+
+def make_activity(n_trackpoints):
+    activity = Activity(sport="running", start_time=datetime.now(),
+                        distance=10000.0, time=float(n_trackpoints),
+                        calories=500.0, heartrate=140.0, has_path=True)
+    activity.set_path(
+        timestamps=1.5e9 + np.arange(n_trackpoints, dtype=float),
+        coords=np.deg2rad(np.column_stack((
+            np.linspace(53.0, 53.1, n_trackpoints),
+            np.linspace(8.0, 8.1, n_trackpoints)))),
+        altitudes=np.linspace(0.0, 100.0, n_trackpoints),
+        heartrates=np.full(n_trackpoints, 140.0),
+        velocities=np.full(n_trackpoints, 3.0))
+    return activity
+
+
+def dumps_per_trackpoint(activity):
+    """Previous implementation: template loaded for each export and
+    rendered for each trackpoint."""
+    env = jinja2.Environment(
+        loader=jinja2.PackageLoader("slither", "resources"))
+    env.filters["rad2deg"] = rad2deg
+    env.filters["datetime_to_str"] = datetime_to_str
+    env.filters["timestamp_to_str"] = timestamp_to_str
+    path = activity.get_path()
+    trackpoints = [
+        Trackpoint(timestamp=t, latitude=p[0], longitude=p[1], altitude=a,
+                   heartrate=h, velocity=v)
+        for t, p, a, h, v in zip(
+            path["timestamps"].tolist(), path["coords"].tolist(),
+            path["altitudes"].tolist(), path["heartrates"].tolist(),
+            path["velocities"].tolist())]
+    trackpoints = env.from_string(TRACKPOINTS_TEMPLATE).render(
+        trackpoints=trackpoints)
+    template = env.get_template("export.tcx.template")
+    return template.render(activity=activity, trackpoints=trackpoints)
+
+
+def benchmark(name, dumps, activity, n_trackpoints, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dumps(activity)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-20s %8.4f s %12.0f trackpoints/s"
+          % (name, best, n_trackpoints / best))
+    return best
+
+
+if __name__ == "__main__":
+    n_trackpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print("%d trackpoints" % n_trackpoints)
+    activity = make_activity(n_trackpoints)
+    assert dumps_per_trackpoint(activity) == TcxExport().dumps(activity)
+    old = benchmark("Per trackpoint", dumps_per_trackpoint, activity,
+                    n_trackpoints)
+    new = benchmark("Bulk", TcxExport().dumps, activity, n_trackpoints)
+    print("Speedup: %.1fx" % (old / new))
@@ -0,0 +1,75 @@
+"""Throughput of the streaming TCX reader compared to BeautifulSoup.
+
+run with: python playground/benchmark_tcx_loader.py [n_trackpoints]
+"""
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from bs4 import BeautifulSoup
+from slither.domain_model import Activity
+from slither.io.tcx_export import TcxExport
+from slither.io.tcx_loader import read_tcx
+from slither.io.utils import to_utf8, datetime_from_iso8601
+
+
+def make_tcx(n_trackpoints):
+    with open("test_data/running.tcx", "r") as f:
+        _, path = read_tcx(f.read())
+    repetitions = n_trackpoints // len(path["timestamps"]) + 1
+    timestamps = path["timestamps"][0] + np.arange(
+        repetitions * len(path["timestamps"]), dtype=float)
+    activity = Activity(
+        sport="running", start_time=datetime.now(),
+        distance=0.0, time=0.0, calories=0.0, heartrate=0.0, has_path=True)
+    activity.set_path(
+        timestamps=timestamps[:n_trackpoints],
+        coords=np.tile(path["coords"], (repetitions, 1))[:n_trackpoints],
+        altitudes=np.tile(path["altitudes"], repetitions)[:n_trackpoints],
+        heartrates=np.tile(path["heartrates"], repetitions)[:n_trackpoints],
+        velocities=np.zeros(n_trackpoints))
+    return TcxExport().dumps(activity)
+
+
+def read_tcx_beautifulsoup(content):
+    """Previous implementation: one find() per trackpoint and field."""
+    training = BeautifulSoup(to_utf8(content), "xml")
+    trackpoints = training.find_all("Trackpoint")
+    timestamps = np.empty(len(trackpoints))
+    coords = np.empty((len(trackpoints), 2))
+    altitudes = np.empty(len(trackpoints))
+    heartrates = np.empty(len(trackpoints))
+    for t, trackpoint in enumerate(trackpoints):
+        timestamps[t] = time.mktime(datetime_from_iso8601(
+            trackpoint.find("Time").text).timetuple())
+        position = trackpoint.find("Position")
+        coords[t] = (
+            np.deg2rad(float(position.find("LatitudeDegrees").text)),
+            np.deg2rad(float(position.find("LongitudeDegrees").text)))
+        altitude = trackpoint.find("AltitudeMeters")
+        altitudes[t] = 0.0 if altitude is None else float(altitude.text)
+        heartrates[t] = float(trackpoint.find("HeartRateBpm").find(
+            "Value").text)
+    return timestamps, coords, altitudes, heartrates
+
+
+def benchmark(name, fun, content, n_trackpoints, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun(content)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-16s %8.3f s %12.0f trackpoints/s"
+          % (name, best, n_trackpoints / best))
+    return best
+
+
+if __name__ == "__main__":
+    n_trackpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    content = make_tcx(n_trackpoints)
+    print("%d trackpoints, %.1f MB" % (n_trackpoints, len(content) / 1e6))
+    old = benchmark("BeautifulSoup", read_tcx_beautifulsoup, content,
+                    n_trackpoints)
+    new = benchmark("lxml.iterparse", read_tcx, content, n_trackpoints)
+    print("Speedup: %.1fx" % (old / new))
@@ -0,0 +1,41 @@
+"""Per-point timestamp conversion compared to batch conversion.
+
+run with: python playground/benchmark_timestamps.py [n_trackpoints]
+"""
+import sys
+import time
+import numpy as np
+from slither.io.utils import datetime_from_iso8601, timestamps_from_iso8601
+
+
+def per_point(date_strs):
+    return np.array([time.mktime(datetime_from_iso8601(date_str).timetuple())
+                     for date_str in date_strs])
+
+
+def batch(date_strs):
+    return timestamps_from_iso8601(date_strs, local_time=True)
+
+
+def benchmark(name, fun, date_strs, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fun(date_strs)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-10s %8.4f s %12.0f timestamps/s"
+          % (name, best, len(date_strs) / best))
+    return best, result
+
+
+if __name__ == "__main__":
+    n_trackpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    start = time.time()
+    date_strs = [time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(t))
+                 for t in start + np.arange(n_trackpoints)]
+    print("%d timestamps" % n_trackpoints)
+    old, expected = benchmark("per point", per_point, date_strs)
+    new, result = benchmark("batch", batch, date_strs)
+    assert np.array_equal(expected, result)
+    print("Speedup: %.1fx" % (old / new))
@@ -0,0 +1,71 @@
+"""Inserts per second of trackpoints when an activity is stored.
+
+run with: python playground/benchmark_trackpoint_insert.py [n_trackpoints]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from slither.core.config import config
+from slither.database import Database
+from slither.domain_model import Activity, Trackpoint
+
+
+def make_path(n_trackpoints):
+    return {
+        "timestamps": 1.5e9 + np.arange(n_trackpoints, dtype=float),
+        "coords": np.deg2rad(np.column_stack((
+            np.linspace(53.0, 53.1, n_trackpoints),
+            np.linspace(8.0, 8.1, n_trackpoints)))),
+        "altitudes": np.linspace(0.0, 100.0, n_trackpoints),
+        "heartrates": np.full(n_trackpoints, 140.0),
+        "velocities": np.full(n_trackpoints, 3.0)
+    }
+
+
+def set_path_orm(activity, timestamps, coords, altitudes, heartrates,
+                 velocities):
+    """Previous implementation: one ORM object per trackpoint."""
+    activity.trackpoints = [
+        Trackpoint(timestamp=t, latitude=p[0], longitude=p[1], altitude=a,
+                   heartrate=h, velocity=v)
+        for t, p, a, h, v in zip(timestamps, coords, altitudes, heartrates,
+                                 velocities)]
+
+
+def store(path, set_path, storage):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(filename)
+    config["trackpoint_storage"] = storage
+    start = time.perf_counter()
+    activity = Activity(sport="running", start_time=datetime.now(),
+                        has_path=True)
+    set_path(activity, **path)
+    db.session.add(activity)
+    db.session.commit()
+    duration = time.perf_counter() - start
+    config["trackpoint_storage"] = "rows"
+    db.session.close()
+    os.remove(filename)
+    return duration
+
+
+def benchmark(name, set_path, storage, path, repeat=3):
+    n_trackpoints = len(path["timestamps"])
+    best = min(store(path, set_path, storage) for _ in range(repeat))
+    print("%-20s %8.3f s %12.0f trackpoints/s"
+          % (name, best, n_trackpoints / best))
+    return best
+
+
+if __name__ == "__main__":
+    n_trackpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    path = make_path(n_trackpoints)
+    print("%d trackpoints" % n_trackpoints)
+    old = benchmark("ORM unit of work", set_path_orm, "rows", path)
+    new = benchmark("Core executemany", Activity.set_path, "rows", path)
+    columns = benchmark("Columns", Activity.set_path, "columns", path)
+    print("Speedup of Core executemany: %.1fx" % (old / new))
+    print("Speedup of columns: %.1fx" % (old / columns))
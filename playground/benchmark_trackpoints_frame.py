@@ -0,0 +1,80 @@
+"""Time to load coordinates of all trackpoints into a DataFrame.
+
+run with: python playground/benchmark_trackpoints_frame.py [n_activities]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from slither.core.config import config
+from slither.database import Database
+from slither.domain_model import Activity
+from slither.dataframes import trackpoints_frame
+
+
+N_TRACKPOINTS = 5000
+
+
+def make_database(n_activities, storage):
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(filename)
+    config["trackpoint_storage"] = storage
+    for i in range(n_activities):
+        activity = Activity(
+            sport="running", start_time=datetime(2020, 1, 1) + timedelta(i),
+            has_path=True)
+        activity.set_path(
+            timestamps=1.5e9 + np.arange(N_TRACKPOINTS, dtype=float),
+            coords=np.deg2rad(np.column_stack((
+                np.linspace(53.0, 53.1, N_TRACKPOINTS),
+                np.linspace(8.0, 8.1, N_TRACKPOINTS)))),
+            altitudes=np.linspace(0.0, 100.0, N_TRACKPOINTS),
+            heartrates=np.full(N_TRACKPOINTS, 140.0),
+            velocities=np.full(N_TRACKPOINTS, 3.0))
+        db.session.add(activity)
+    db.session.commit()
+    config["trackpoint_storage"] = "rows"
+    db.session.close()
+    return filename
+
+
+def read_sql(db):
+    """Previous approach of the analysis scripts."""
+    return pd.read_sql(
+        "select latitude, longitude from trackpoints", db.engine)
+
+
+def frame(db):
+    return trackpoints_frame(db.session, columns=["latitude", "longitude"])
+
+
+def benchmark(name, load, filename, repeat=3):
+    db = Database(filename)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_trackpoints = len(load(db))
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print("%-28s %8.4f s %12.0f trackpoints/s"
+          % (name, best, n_trackpoints / best))
+    db.session.close()
+    return best
+
+
+if __name__ == "__main__":
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print("%d activities, %d trackpoints"
+          % (n_activities, n_activities * N_TRACKPOINTS))
+    rows = make_database(n_activities, "rows")
+    columns = make_database(n_activities, "columns")
+    old = benchmark("read_sql (rows)", read_sql, rows)
+    new = benchmark("trackpoints_frame (rows)", frame, rows)
+    blobs = benchmark("trackpoints_frame (columns)", frame, columns)
+    print("Speedup (rows): %.1fx" % (old / new))
+    print("Speedup (columns): %.1fx" % (old / blobs))
+    os.remove(rows)
+    os.remove(columns)
@@ -1,7 +1,6 @@
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-import pandas as pd
 from matplotlib import ticker
 from slither.service import Service
 from scipy.stats import binned_statistic_2d
@@ -9,8 +8,7 @@ from scipy.stats import binned_statistic_2d
 
 def all_trackpoints():
     s = Service()
-    sql = "select latitude, longitude from trackpoints"
-    df = pd.read_sql(sql, s.database.engine)
+    df = s.trackpoints_frame(columns=["latitude", "longitude"])
     df.latitude = np.rad2deg(df.latitude)
     df.longitude = np.rad2deg(df.longitude)
     df.dropna(inplace=True)
@@ -1,6 +1,5 @@
 import sys
 import numpy as np
-import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib import ticker
@@ -12,8 +11,7 @@ from scipy.stats import binned_statistic_2d
 
 def all_trackpoints(lat_range, lon_range):
     s = Service()
-    sql = "select latitude, longitude from trackpoints"
-    df = pd.read_sql(sql, s.database.engine)
+    df = s.trackpoints_frame(columns=["latitude", "longitude"])
     df.latitude = np.rad2deg(df.latitude)
     df.longitude = np.rad2deg(df.longitude)
     df = df[df.latitude >= lat_range[0]]
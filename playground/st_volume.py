@@ -10,10 +10,8 @@ import altair as alt
 @st.cache
 def load_df():
     s = Service()
-    sql = "select sport, start_time, distance, time from activities order by start_time"
-    df = pd.read_sql(sql, s.database.engine)
+    df = s.activities_frame(columns=["sport", "start_time", "distance", "time"])
     df["time"] = df["time"].div(3600.0)  # seconds to hours
-    df["start_time"] = pd.to_datetime(df["start_time"])
     return df
 
 
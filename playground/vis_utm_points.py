@@ -1,5 +1,4 @@
 import numpy as np
-import pandas as pd
 import utm  # https://github.com/Turbo87/utm
 from pytransform3d import visualizer
 import open3d as o3d
@@ -9,9 +8,7 @@ from slither.core.unit_conversions import convert_m_to_km
 
 def all_trackpoints(lat_range, lon_range):
     s = Service()
-    df = pd.read_sql_table(
-        "trackpoints", s.database.engine,
-        index_col="id", columns=["latitude", "longitude", "altitude"])
+    df = s.trackpoints_frame(columns=["latitude", "longitude", "altitude"])
     df.latitude = np.rad2deg(df.latitude)
     df.longitude = np.rad2deg(df.longitude)
     df = df[df.latitude >= lat_range[0]]
@@ -30,39 +30,43 @@ def parse_args():
 def fill_database(args):
     s = Service(debug=args.debug, datadir=args.datadir,
                 db_filename=args.db_filename, base_path=args.base_path)
-    data = read_data(args.filename)
-    with Progress() as progress:
-        task = progress.add_task("Data import", total=len(data))
-        for row in data.iterrows():
-            progress.console.print("Importing:\n%s" % (row,))
-            progress.advance(task)
-            row = row[1]
-            try:
-                distance = distance_from_stroke(row["Stroke"])
-                time = row["Time"]
-                if not np.isfinite(time):
-                    raise Exception(time)
-
-                activities = s.list_activity_for_date(row["Date"])
-                duplicate = False
-                for a in activities:
-                    if a.time == time and a.distance == distance:
-                        progress.console.print("Duplicate entry, ignored.")
-                        duplicate = True
-                        break
-                if duplicate:
-                    progress.console.print("[red]Found similar activity, ignored.[/red]")
-                    continue
-
-                metadata = {"sport": "swimming",
-                            "start_time": row["Date"],
-                            "distance": distance,
-                            "time": time,
-                            "filetype": "",
-                            "has_path": False}
-                s.new_activity(metadata)
-            except Exception as e:
-                progress.console.print(e)
+    try:
+        data = read_data(args.filename)
+        with Progress() as progress:
+            task = progress.add_task("Data import", total=len(data))
+            for row in data.iterrows():
+                progress.console.print("Importing:\n%s" % (row,))
+                progress.advance(task)
+                row = row[1]
+                try:
+                    distance = distance_from_stroke(row["Stroke"])
+                    time = row["Time"]
+                    if not np.isfinite(time):
+                        raise Exception(time)
+
+                    activities = s.list_activity_for_date(row["Date"])
+                    duplicate = False
+                    for a in activities:
+                        if a.time == time and a.distance == distance:
+                            progress.console.print("Duplicate entry, ignored.")
+                            duplicate = True
+                            break
+                    if duplicate:
+                        progress.console.print("[red]Found similar activity, ignored.[/red]")
+                        continue
+
+                    metadata = {"sport": "swimming",
+                                "start_time": row["Date"],
+                                "distance": distance,
+                                "time": time,
+                                "filetype": "",
+                                "has_path": False}
+                    s.new_activity(metadata)
+                except Exception as e:
+                    progress.console.print(e)
+    finally:
+        # activity files are written in the background
+        s.close()
 
 
 def read_data(filename):
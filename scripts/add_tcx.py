@@ -4,26 +4,44 @@ from rich.progress import Progress
 from slither.service import Service
 
 
-parser = argparse.ArgumentParser(
-    description="Import batch of TCX files.")
-parser.add_argument(
-    "filenames", type=str, nargs="+",
-    help="Files (TCX) that should be imported.")
-parser.add_argument(
-    "--base_path", type=str, default=None,
-    help="Base path in which data will be stored. "
-         "This will be ~/.slither by default.")
-args = parser.parse_args()
-
-
-s = Service(base_path=args.base_path)
-with Progress() as progress:
-    task = progress.add_task("Data import", total=len(args.filenames))
-    for filename in args.filenames:
-        progress.console.print("Importing '%s'" % filename)
-        progress.advance(task)
-        with open(filename, "r") as f:
-            try:
-                s.import_activity(f.read(), filename)
-            except ValueError:
-                progress.console.print("Could not import %s" % filename)
+def main():
+    args = parse_args()
+    s = Service(base_path=args.base_path)
+    try:
+        with Progress() as progress:
+            task = progress.add_task("Data import", total=len(args.filenames))
+
+            def report(filename, activity, error):
+                progress.advance(task)
+                if error is None:
+                    progress.console.print("Imported '%s'" % filename)
+                else:
+                    progress.console.print("Could not import %s" % filename)
+                    progress.console.print(error)
+
+            s.import_many(
+                args.filenames, workers=args.workers, callback=report)
+    finally:
+        # activity files are written in the background
+        s.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Import batch of TCX files.")
+    parser.add_argument(
+        "filenames", type=str, nargs="+",
+        help="Files (TCX) that should be imported.")
+    parser.add_argument(
+        "--base_path", type=str, default=None,
+        help="Base path in which data will be stored. "
+             "This will be ~/.slither by default.")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Number of processes that parse files. "
+             "This will be the number of CPUs by default.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
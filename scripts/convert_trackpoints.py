@@ -0,0 +1,39 @@
+"""Converts trackpoint rows of existing activities to columns."""
+import argparse
+from rich.progress import Progress
+from slither.service import Service
+
+
+def main():
+    args = parse_args()
+    s = Service(base_path=args.base_path, db_filename=args.db_filename)
+    with Progress() as progress:
+        task = progress.add_task("Conversion", total=None)
+        n_converted = s.database.convert_trackpoints(
+            callback=lambda activity: progress.advance(task))
+        progress.console.print("Converted %d activities" % n_converted)
+    if args.vacuum:
+        # free space of deleted trackpoints
+        with s.database.engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert trackpoints of existing activities from one "
+                    "row per trackpoint to one row per activity.")
+    parser.add_argument(
+        "--base_path", type=str, default=None,
+        help="Base path in which data will be stored. "
+             "This will be ~/.slither by default.")
+    parser.add_argument(
+        "--db_filename", type=str, default="db.sqlite",
+        help="Filename of SQLite database")
+    parser.add_argument(
+        "--vacuum", action="store_true",
+        help="Shrink database file after conversion.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ if __name__ == "__main__":
               "sqlalchemy", "pyproj", "folium", "fitparse", "requests"],
           extras_require={
               "all": ["rich", "pandas", "seaborn", "utm", "pytransform3d",
-                      "open3d", "bokeh"],
+                      "open3d", "bokeh", "zstandard"],
               "server": ["Flask", "Flask-HTTPAuth", "Werkzeug", "passlib"],
               "test": ["nose", "coverage"],
               "doc": ["pdoc3"]
@@ -1,6 +1,4 @@
 """Training data analysis and preprocessing."""
-from collections import deque
-
 import numpy as np
 from scipy.signal import medfilt
 
@@ -186,6 +184,263 @@ def elevation_summary(altitudes, total_distance_in_m):
     return gain, loss, slope_in_percent
 
 
+def elevation_profile(path, filter=True):
+    """Altitudes over distance.
+
+    Parameters
+    ----------
+    path : dict
+        Path with entries 'timestamps', 'velocities', and 'altitudes'
+
+    filter : bool, optional (default: True)
+        Filter altitude data
+
+    Returns
+    -------
+    distances_in_m : array, shape (n_valid_steps,)
+        Distances in meters at which altitudes are available
+
+    altitudes : array, shape (n_valid_steps,)
+        Altitudes
+
+    total_distance_in_m : float
+        Total distance in meters, NaN if there are no valid trackpoints
+    """
+    distances_in_m, valid_trackpoints = \
+        compute_distances_for_valid_trackpoints(path)
+    if len(distances_in_m) == 0:
+        return distances_in_m, distances_in_m, np.nan
+    total_distance_in_m = np.nanmax(distances_in_m)
+
+    altitudes = path["altitudes"][valid_trackpoints]
+    # TODO exactly 0 seems to be an indicator for an error, a better
+    # method would be to detect jumps
+    valid_altitudes = np.logical_and(
+        np.isfinite(altitudes), altitudes != 0.0)
+    distances_in_m = distances_in_m[valid_altitudes]
+    altitudes = altitudes[valid_altitudes]
+
+    if filter and len(altitudes) > 0:
+        altitudes = filter_median_average(
+            altitudes, config["plot"]["filter_width"])
+    return distances_in_m, altitudes, total_distance_in_m
+
+
+def compute_metrics(path, sport):
+    """Derived metrics of a path.
+
+    Parameters
+    ----------
+    path : dict
+        Path with entries 'timestamps', 'altitudes', 'heartrates', and
+        'velocities'
+
+    sport : str
+        Sport
+
+    Returns
+    -------
+    metrics : dict
+        Elevation gain and loss in meters ('elevation_gain',
+        'elevation_loss'), time in motion in seconds ('moving_time', see
+        detect_pauses),
+        maximum valid velocity in meters per second ('max_velocity'), and
+        minimum, quartiles, and maximum of heart rates ('heartrate_min',
+        'heartrate_q1', 'heartrate_median', 'heartrate_q3',
+        'heartrate_max'). Metrics that cannot be computed are None.
+    """
+    metrics = dict.fromkeys((
+        "elevation_gain", "elevation_loss", "moving_time", "max_velocity",
+        "heartrate_min", "heartrate_q1", "heartrate_median", "heartrate_q3",
+        "heartrate_max"))
+
+    _, altitudes, total_distance_in_m = elevation_profile(path)
+    if len(altitudes) > 0:
+        gain, loss, _ = elevation_summary(altitudes, total_distance_in_m)
+        metrics["elevation_gain"] = float(gain)
+        metrics["elevation_loss"] = float(loss)
+
+    _, metrics["moving_time"] = detect_pauses(path, sport)
+    velocities = path["velocities"][1:]
+    max_velocity = config["max_velocity"].get(
+        sport, config["max_velocity"]["default"])
+    valid_velocities = np.isfinite(velocities) & (velocities <= max_velocity)
+    if np.any(valid_velocities):
+        metrics["max_velocity"] = float(np.max(velocities[valid_velocities]))
+
+    heartrates = path["heartrates"]
+    heartrates = heartrates[np.isfinite(heartrates) & (heartrates > 0.0)]
+    if len(heartrates) > 0:
+        (metrics["heartrate_min"], metrics["heartrate_q1"],
+         metrics["heartrate_median"], metrics["heartrate_q3"],
+         metrics["heartrate_max"]) = np.percentile(
+            heartrates, [0, 25, 50, 75, 100]).tolist()
+    return metrics
+
+
+def detect_pauses(path, sport=None):
+    """Detect pauses of an activity.
+
+    A step between two trackpoints is a pause if its velocity is below
+    config['pause_detection']['min_velocity'] of the sport, if its velocity
+    is unknown or above config['max_velocity'], or if it takes longer than
+    config['pause_detection']['max_gap'] seconds, e.g., because the
+    recording has been paused. Paths without any known velocity, e.g.,
+    recordings without GPS, are only split by gaps.
+
+    Parameters
+    ----------
+    path : dict
+        A path that has at least the entries 'timestamps' and 'velocities'.
+
+    sport : str, optional (default: None)
+        Sport
+
+    Returns
+    -------
+    pauses : array, shape (n_steps,)
+        Indicates if the step from the previous trackpoint to this one is a
+        pause. The first trackpoint is not a pause.
+
+    moving_time : float
+        Time in motion in seconds.
+    """
+    timestamps = np.asarray(path["timestamps"], dtype=float)
+    velocities = np.asarray(path["velocities"], dtype=float)[1:]
+    delta_t = np.diff(timestamps)
+    settings = config["pause_detection"]
+    min_velocity = settings["min_velocity"].get(
+        sport, settings["min_velocity"]["default"])
+    max_velocity = config["max_velocity"].get(
+        sport, config["max_velocity"]["default"])
+    moving = delta_t <= settings["max_gap"]
+    if np.any(np.isfinite(velocities)):
+        # comparisons with NaN are False
+        moving &= (velocities >= min_velocity) & (velocities <= max_velocity)
+    pauses = np.zeros(len(timestamps), dtype=bool)
+    pauses[1:] = ~moving
+    return pauses, float(np.sum(delta_t[moving]))
+
+
+SPLIT_DTYPE = np.dtype([
+    ("boundary", float), ("index", int), ("distance", float),
+    ("time", float), ("moving_time", float), ("split_distance", float),
+    ("split_time", float), ("split_moving_time", float), ("pace", float),
+    ("moving_pace", float)])
+"""Data type of splits, see compute_splits."""
+
+
+def cumulative_distances(path, sport=None):
+    """Compute traveled distance at each trackpoint.
+
+    Parameters
+    ----------
+    path : dict
+        A path that has at least the entries 'timestamps' and 'velocities'.
+
+    sport : str, optional (default: None)
+        Sport. Steps with a velocity above config['max_velocity'] of this
+        sport and steps with unknown velocity do not count.
+
+    Returns
+    -------
+    distances : array, shape (n_steps,)
+        Traveled distance in meters at each trackpoint.
+    """
+    velocities = np.asarray(path["velocities"], dtype=float)[1:]
+    delta_t = np.diff(path["timestamps"])
+    max_velocity = config["max_velocity"].get(
+        sport, config["max_velocity"]["default"])
+    valid = np.zeros(len(velocities), dtype=bool)
+    finite = np.isfinite(velocities)
+    valid[finite] = velocities[finite] <= max_velocity
+    steps = np.where(valid, velocities * delta_t, 0.0)
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def compute_splits(path, sport=None, split_length=None, boundaries=None,
+                   by="distance"):
+    """Split a path into parts.
+
+    All split boundaries are found with one binary search in the cumulative
+    distances or times of the path.
+
+    Parameters
+    ----------
+    path : dict
+        A path that has at least the entries 'timestamps' and 'velocities'.
+
+    sport : str, optional (default: None)
+        Sport, see cumulative_distances.
+
+    split_length : float, optional (default: None)
+        Length of splits in meters or seconds. The last split will be
+        omitted if it is shorter. By default, an appropriate length will be
+        selected for splits by distance, see appropriate_partition.
+
+    boundaries : array-like, shape (n_splits,), optional (default: None)
+        Ends of the splits in meters or seconds since the start, e.g., the
+        ends of laps. Splits that end after the end of the path will be
+        omitted. Overrides split_length.
+
+    by : str, optional (default: 'distance')
+        Split by 'distance' or by 'time'.
+
+    Returns
+    -------
+    splits : array, shape (n_splits,)
+        Structured array (see SPLIT_DTYPE) with the fields 'boundary'
+        (requested end of the split), 'index' (index of the first trackpoint
+        at or after the boundary), 'distance', 'time', and 'moving_time'
+        (traveled distance, elapsed time, and time in motion at this
+        trackpoint, see detect_pauses), 'split_distance', 'split_time', and
+        'split_moving_time' (distance, time, and time in motion of the
+        split), and 'pace' and 'moving_pace' (time and time in motion per
+        config['pace_distance_table'] of the sport).
+    """
+    if by not in ["distance", "time"]:
+        raise ValueError("Cannot split by '%s'" % by)
+    timestamps = np.asarray(path["timestamps"], dtype=float)
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=SPLIT_DTYPE)
+    distances = cumulative_distances(path, sport)
+    times = timestamps - timestamps[0]
+    values = distances if by == "distance" else times
+
+    if boundaries is None:
+        if split_length is None:
+            if by == "time":
+                raise ValueError("Splits by time require a split length")
+            split_length = appropriate_partition(distances[-1])
+        boundaries = np.arange(split_length, int(values[-1]), split_length)
+    boundaries = np.asarray(boundaries, dtype=float)
+    boundaries = boundaries[boundaries <= values[-1]]
+
+    splits = np.empty(len(boundaries), dtype=SPLIT_DTYPE)
+    splits["boundary"] = boundaries
+    splits["index"] = np.searchsorted(values, boundaries)
+    pauses, _ = detect_pauses(path, sport)
+    moving_times = np.cumsum(
+        np.where(pauses, 0.0, np.diff(timestamps, prepend=timestamps[0])))
+    splits["distance"] = distances[splits["index"]]
+    splits["time"] = times[splits["index"]]
+    splits["moving_time"] = moving_times[splits["index"]]
+    splits["split_distance"] = np.diff(splits["distance"], prepend=0.0)
+    splits["split_time"] = np.diff(splits["time"], prepend=0.0)
+    splits["split_moving_time"] = np.diff(
+        splits["moving_time"], prepend=0.0)
+
+    pdt = config["pace_distance_table"]
+    pace_distance = pdt.get(sport, pdt["other"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        splits["pace"] = (splits["split_time"] / splits["split_distance"] *
+                          pace_distance)
+        splits["moving_pace"] = (
+            splits["split_moving_time"] / splits["split_distance"] *
+            pace_distance)
+    return splits
+
+
 def get_paces(path, sport):
     """Generate pace table of an activity.
 
@@ -204,17 +459,15 @@ def get_paces(path, sport):
         corresponding average pace at this distance in seconds per
         kilometer.
     """
-    velocities = path["velocities"][1:]
-    timestamps = path["timestamps"]
+    velocities = np.asarray(path["velocities"], dtype=float)[1:]
+    timestamps = np.asarray(path["timestamps"], dtype=float)
     delta_t = np.diff(timestamps)
 
     max_velocity = config["max_velocity"].get(
         sport, config["max_velocity"]["default"])
-    valid_velocities = np.where(velocities <= max_velocity)
-    velocities = velocities[valid_velocities]
-    delta_t = delta_t[valid_velocities]
-
-    dist = np.cumsum(velocities * delta_t)
+    with np.errstate(invalid="ignore"):
+        valid_velocities = velocities <= max_velocity
+    dist = np.cumsum(velocities[valid_velocities] * delta_t[valid_velocities])
     if len(dist) == 0:
         return []
     split_distance = appropriate_partition(dist[-1])
@@ -222,15 +475,12 @@ def get_paces(path, sport):
     pdt = config["pace_distance_table"]
     pace_distance = pdt.get(sport, pdt["other"])
 
-    paces = []
-    last_t = 0
-    for threshold in range(split_distance, int(dist[-1]), split_distance):
-        t = np.argmax(dist >= threshold)
-        split_time = timestamps[t] - timestamps[last_t]
-        pace = split_time / split_distance * pace_distance
-        paces.append((threshold, pace))
-        last_t = t
-    return paces
+    thresholds = np.arange(split_distance, int(dist[-1]), split_distance)
+    # index of the first step that reaches each threshold
+    t = np.searchsorted(dist, thresholds)
+    split_times = timestamps[t] - timestamps[np.r_[0, t[:-1]]]
+    paces = split_times / split_distance * pace_distance
+    return list(zip(thresholds.tolist(), paces.tolist()))
 
 
 def fastest_part(sport, timestamps, velocities, distance):
@@ -256,38 +506,67 @@ def fastest_part(sport, timestamps, velocities, distance):
     record : float
         Fastest time for the requested distance in seconds
     """
-    queue_dist = 0.0
-    queue_time = 0.0
-    dqueue = deque()
-    tqueue = deque()
-
-    v = velocities[1:]
-    dt = np.diff(timestamps)
-    record = float("inf")
-
-    for t in range(len(v)):
-        if np.isnan(v[t]):
-            queue_dist = 0.0
-            queue_time = 0.0
-            dqueue.clear()
-            tqueue.clear()
-            continue
-        if v[t] > config["max_velocity"][sport]:
-            continue
-        dist = v[t] * dt[t]
-        dqueue.appendleft(dist)
-        tqueue.appendleft(dt[t])
-        queue_dist += dist
-        queue_time += dt[t]
-        while queue_dist > distance:
-            if queue_time < record:
-                record = queue_time
-            dist = dqueue.pop()
-            time = tqueue.pop()
-            queue_dist -= dist
-            queue_time -= time
-
-    return record
+    return float(fastest_parts(sport, timestamps, velocities, [distance])[0])
+
+
+def fastest_parts(sport, timestamps, velocities, distances):
+    """Compute fastest times for multiple distances in an activity.
+
+    A part is a sequence of steps that is longer than the distance. Parts
+    cannot contain steps with unknown velocity (NaN). Steps with a velocity
+    above config['max_velocity'][sport] are ignored, i.e., they do not count
+    to the time or the distance of a part.
+
+    Cumulative distances and times are computed once. For each step, the
+    shortest part that ends with this step is found by binary search.
+
+    Parameters
+    ----------
+    sport : str
+        Sport
+
+    timestamps : array, shape (n_steps,)
+        Timestamps
+
+    velocities : array, shape (n_steps,)
+        Velocities
+
+    distances : array-like, shape (n_distances,)
+        Lengths of the segments for which we want to compute the fastest
+        time in this activity.
+
+    Returns
+    -------
+    records : array, shape (n_distances,)
+        Fastest times for the requested distances in seconds, inf if the
+        activity is too short
+    """
+    distances = np.asarray(distances, dtype=float)
+    v = np.asarray(velocities, dtype=float)[1:]
+    dt = np.diff(np.asarray(timestamps, dtype=float))
+    gaps = np.isnan(v)
+    valid = ~gaps
+    valid[valid] = v[valid] <= config["max_velocity"][sport]
+
+    cum_dist = np.concatenate(([0.0], np.cumsum(np.where(valid, v * dt, 0.0))))
+    cum_time = np.concatenate(([0.0], np.cumsum(np.where(valid, dt, 0.0))))
+    # a part must start after the last gap
+    first_start = np.maximum.accumulate(
+        np.where(gaps, np.arange(len(v)), -1)) + 1
+    ends = np.flatnonzero(valid)
+    end_dist = cum_dist[ends + 1]
+    end_time = cum_time[ends + 1]
+    first_start = first_start[ends]
+
+    records = np.full(len(distances), np.inf)
+    for i, distance in enumerate(distances):
+        # last start at which the part is longer than the distance
+        starts = np.searchsorted(cum_dist, end_dist - distance) - 1
+        feasible = starts >= first_start
+        if np.any(feasible):
+            records[i] = np.min(
+                end_time[feasible] - cum_time[starts[feasible]])
+    return records
 
 
 def appropriate_partition(distance):
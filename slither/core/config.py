@@ -31,6 +31,14 @@ config = {
          "racecycling": 30,
          "cycling": 30,
          "default": 50},
+    "pause_detection":
+        {"min_velocity":
+            {"swimming": 0.1,
+             "running": 0.5,
+             "racecycling": 1.0,
+             "cycling": 1.0,
+             "default": 0.3},
+         "max_gap": 30.0},
     "velocity_thresholds":
         {"running":
              [1.39, 1.81, 2.22, 2.64, 3.06, 3.47, 3.89, 4.31, 4.72],
@@ -47,7 +55,14 @@ config = {
     "geodetic":
         {
             "ellipsoid": "WGS84"
-        }
+        },
+    "trackpoint_storage": "rows",
+    "path_cache":
+        {"max_bytes": 256 * 1024 ** 2},
+    "registry":
+        {"compression": "gzip"},
+    "leaderboard":
+        {"size": 30}
 }
 
 
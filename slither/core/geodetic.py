@@ -87,6 +87,10 @@ dist_on_earth = PyprojDist(config)
 def compute_velocities(timestamps, coords):
     """Compute velocities from geodetic coordinates.
 
+    If the time does not advance between two steps, the velocity of the
+    previous step will be used and the distance between these steps will
+    not be counted.
+
     Parameters
     ----------
     timestamps : array, shape (n_steps,)
@@ -107,17 +111,53 @@ def compute_velocities(timestamps, coords):
     dists = dist_on_earth(
         coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
 
-    n_steps = len(timestamps)
-    velocities = np.empty(n_steps)
+    # the previous velocity is kept if the time does not advance
+    moving = np.concatenate(([True], ~(delta_t <= 0.0)))
+    velocities = np.empty(len(timestamps))
     velocities[0] = 0.0
-    total_distance = 0.0
-
-    for t in range(1, n_steps):
-        dt = delta_t[t - 1]
-        if dt <= 0.0:
-            velocity = velocities[t - 1]
-        else:
-            velocity = dists[t - 1] / dt
-            total_distance += dists[t - 1]
-        velocities[t] = velocity
+    velocities[1:] = dists / np.where(moving[1:], delta_t, 1.0)
+    last_moving = np.maximum.accumulate(
+        np.where(moving, np.arange(len(timestamps)), 0))
+    velocities = velocities[last_moving]
+
+    # same order of summation as a loop over all steps
+    moving_dists = dists[moving[1:]]
+    if len(moving_dists) > 0:
+        total_distance = float(np.cumsum(moving_dists)[-1])
+    else:
+        total_distance = 0.0
     return velocities, total_distance
+
+
+def recompute_velocities(timestamps, coords, segment_starts):
+    """Recompute velocities of a stored path.
+
+    Loaders compute velocities per track segment, so that each segment
+    starts with a velocity of 0. Velocities will be computed again in the
+    same way, e.g., after the ellipsoid has been changed.
+
+    Parameters
+    ----------
+    timestamps : array, shape (n_steps,)
+        Timestamps
+
+    coords : array, shape (n_steps, 2)
+        Latitudes and longitudes in radians
+
+    segment_starts : array-like, shape (n_segments,)
+        Indices of the first trackpoint of each segment
+
+    Returns
+    -------
+    velocities : array, shape (n_steps,)
+        Velocities in meters per second
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if len(timestamps) == 0:
+        return np.empty(0)
+    bounds = np.unique(np.concatenate(
+        ([0], np.asarray(segment_starts, dtype=int), [len(timestamps)])))
+    return np.concatenate([
+        compute_velocities(timestamps[start:end], coords[start:end])[0]
+        for start, end in zip(bounds[:-1], bounds[1:])])
@@ -6,14 +6,14 @@ import numpy as np
 from .config import config
 from .analysis import (
     is_outlier, check_coords, filtered_heartrates, elevation_summary,
-    filter_median_average, appropriate_partition,
-    compute_distances_for_valid_trackpoints)
+    elevation_profile, filter_median_average, compute_splits,
+    cumulative_distances, appropriate_partition)
 from .ui_text import d
 from .unit_conversions import (
     convert_m_to_km, convert_mps_to_kmph, minutes_from_start)
 
 
-def render_map(path):
+def render_map(path, sport=None):
     """Draw path on map with leaflet.js.
 
     Parameters
@@ -21,16 +21,19 @@ def render_map(path):
     path : dict
         A path that has at least the entries 'timestamps' and 'coords'.
 
+    sport : str, optional (default: None)
+        Sport, see generate_distance_markers.
+
     Returns
     -------
     html : str
         HTML representation of the rendered map.
     """
-    m = make_map(path)
+    m = make_map(path, sport)
     return m.get_root().render()
 
 
-def make_map(path):
+def make_map(path, sport=None):
     """Create folium map.
 
     Parameters
@@ -38,6 +41,9 @@ def make_map(path):
     path : dict
         Path with entry 'coords': latitude and longitude coordinates in radians
 
+    sport : str, optional (default: None)
+        Sport, see generate_distance_markers.
+
     Returns
     -------
     m : folium.Map
@@ -48,7 +54,7 @@ def make_map(path):
         m = folium.Map()
     else:
         center = np.mean(coords, axis=0)
-        distance_markers = generate_distance_markers(path)
+        distance_markers = generate_distance_markers(path, sport)
 
         # TODO find a way to colorize path according to velocities
         # valid_velocities = np.isfinite(path["velocities"])
@@ -62,9 +68,11 @@ def make_map(path):
             coords[-1].tolist(), tooltip="Finish",
             icon=folium.Icon(color="green", icon="flag")).add_to(m)
         for label, marker in distance_markers.items():
-            marker_location = coords[marker].tolist()
+            marker_location = np.rad2deg(path["coords"][marker])
+            if not np.all(np.isfinite(marker_location)):
+                continue
             folium.Marker(
-                marker_location, tooltip=label,
+                marker_location.tolist(), tooltip=label,
                 icon=folium.Icon(color="blue", icon="flag")).add_to(m)
         folium.PolyLine(coords).add_to(m)
         south_west = np.min(coords, axis=0).tolist()
@@ -73,27 +81,34 @@ def make_map(path):
     return m
 
 
-def generate_distance_markers(path):
+def generate_distance_markers(path, sport=None):
     """Generate indices of distance markers.
 
     Parameters
     ----------
     path : dict
-        A path that has at least the entries 'timestamps' and 'coords'.
+        A path that has at least the entries 'timestamps' and 'velocities'.
+
+    sport : str, optional (default: None)
+        Sport, see slither.core.analysis.cumulative_distances. The distance
+        between markers is scaled with the entry of the sport in
+        config['pace_distance_table'], e.g., markers of swimming activities
+        are closer.
 
     Returns
     -------
     marker_indices : dict
         Mapping of label (e.g., '1 km') to corresponding index of the path.
     """
-    distances, _ = compute_distances_for_valid_trackpoints(path)
-    total_distance = distances[-1]
-    marker_dist = appropriate_partition(total_distance)
-    thresholds = np.arange(marker_dist, int(total_distance), marker_dist)
-    indices = np.searchsorted(distances, thresholds)
-    marker_indices = {d.display_distance(threshold): index
-                      for threshold, index in zip(thresholds, indices)}
-    return marker_indices
+    if len(path["timestamps"]) == 0:
+        return {}
+    pdt = config["pace_distance_table"]
+    scale = pdt.get(sport, pdt["other"]) / pdt["other"]
+    total_distance = cumulative_distances(path, sport)[-1]
+    split_length = scale * appropriate_partition(total_distance / scale)
+    splits = compute_splits(path, sport, split_length=split_length)
+    return {d.display_distance(boundary): index for boundary, index
+            in zip(splits["boundary"].tolist(), splits["index"].tolist())}
 
 
 def plot_velocity_histogram(path, ax):
@@ -136,26 +151,13 @@ def plot_elevation(path, ax, filter=True):
     filter : bool, optional (default: True)
         Filter altitude data
     """
-    distances_in_m, valid_trackpoints = \
-        compute_distances_for_valid_trackpoints(path)
-    if len(distances_in_m) > 0:
+    distances_in_m, altitudes, total_distance_in_m = elevation_profile(
+        path, filter)
+    if np.isfinite(total_distance_in_m):
         distances_in_km = convert_m_to_km(distances_in_m)
-        total_distance_in_m = np.nanmax(distances_in_m)
-
-        altitudes = path["altitudes"][valid_trackpoints]
-        # TODO exactly 0 seems to be an indicator for an error, a better
-        # method would be to detect jumps
-        valid_altitudes = np.logical_and(
-            np.isfinite(altitudes), altitudes != 0.0)
-        distances_in_km = distances_in_km[valid_altitudes]
-        altitudes = altitudes[valid_altitudes]
         if len(altitudes) == 0:
             return
 
-        if filter:
-            altitudes = filter_median_average(
-                altitudes, config["plot"]["filter_width"])
-
         gain, loss, slope_in_percent = elevation_summary(
             altitudes, total_distance_in_m)
 
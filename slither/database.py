@@ -1,10 +1,61 @@
 """Database interface."""
 import os
+import re
+import numpy as np
 import sqlalchemy
 from . import domain_model
 from sqlalchemy.orm import sessionmaker
 
 
+PROFILES = {
+    "default": {},
+    "performance": {
+        # readers do not block writers and vice versa
+        "journal_mode": "WAL",
+        # no fsync per commit in WAL mode, still safe for the database
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 ** 2,
+        # negative values are in KiB
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+"""Performance profiles: PRAGMA statements for each SQLite connection."""
+
+
+def sqlite_pragmas(profile=None):
+    """Get PRAGMA settings of a performance profile.
+
+    Parameters
+    ----------
+    profile : str or dict, optional (default: None)
+        Name of a profile from PROFILES or a dictionary that maps names of
+        PRAGMAs to values. None corresponds to the defaults of SQLite.
+
+    Returns
+    -------
+    pragmas : dict
+        Maps names of PRAGMAs to values.
+
+    Raises
+    ------
+    ValueError
+        Unknown profile or invalid PRAGMA.
+    """
+    if profile is None:
+        return {}
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError("Unknown profile '%s', available: %s"
+                             % (profile, ", ".join(sorted(PROFILES))))
+        profile = PROFILES[profile]
+    for name, value in profile.items():
+        if (re.fullmatch(r"\w+", name) is None or
+                re.fullmatch(r"-?\w+", str(value)) is None):
+            raise ValueError("Invalid PRAGMA %s = %s" % (name, value))
+    return dict(profile)
+
+
 class Database:
     """Database for activity data.
 
@@ -12,23 +63,138 @@ class Database:
     ----------
     db_filename : str
         Filename of database file.
+
+    profile : str or dict, optional (default: None)
+        Performance profile, see sqlite_pragmas. The PRAGMAs will be set on
+        each new connection.
     """
-    def __init__(self, db_filename):
+    def __init__(self, db_filename, profile=None):
         self.db_filename = db_filename
+        self.pragmas = sqlite_pragmas(profile)
         self._setup_database()
 
     def _setup_database(self):
         self.engine = sqlalchemy.create_engine("sqlite:///" + self.db_filename)
+        if self.pragmas:
+            sqlalchemy.event.listen(self.engine, "connect", self._set_pragmas)
         initialized = os.path.exists(self.db_filename)
-        if not initialized:
-            domain_model.Base.metadata.create_all(bind=self.engine)
+        if initialized:
+            new_tables = self._missing_tables()
+        # only creates tables that do not exist yet
+        domain_model.Base.metadata.create_all(bind=self.engine)
 
         Session = sessionmaker()
         Session.configure(bind=self.engine)
         self.session = Session()
-        if not initialized:
+        if initialized:
+            self._migrate(new_tables)
+        else:
             domain_model.init_database(self.session)
 
+    def _set_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in self.pragmas.items():
+            cursor.execute("PRAGMA %s = %s" % (name, value))
+        cursor.close()
+
+    def _missing_tables(self):
+        inspector = sqlalchemy.inspect(self.engine)
+        return [name for name in domain_model.Base.metadata.tables
+                if not inspector.has_table(name)]
+
+    def _migrate(self, new_tables):
+        """Update an existing database to the current domain model.
+
+        Indexes that do not exist yet will be created and tables that have
+        been added to the database will be filled.
+
+        Parameters
+        ----------
+        new_tables : list
+            Names of tables that have just been created.
+        """
+        for table in domain_model.Base.metadata.tables.values():
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+        if "fingerprints" in new_tables:
+            # hashes of the original files are not available anymore
+            for activity in self.session.query(domain_model.Activity):
+                fingerprint = domain_model.Fingerprint()
+                fingerprint.update(activity)
+                self.session.add(fingerprint)
+        if "activity_metrics" in new_tables:
+            for activity in self.session.query(domain_model.Activity):
+                activity.metrics = domain_model.ActivityMetrics()
+                activity.metrics.update(activity)
+        if "leaderboard" in new_tables:
+            self.rebuild_leaderboards()
+        if "path_segments" in new_tables:
+            # FIT files are read as one segment, other files might have
+            # consisted of multiple segments
+            q = self.session.query(domain_model.Activity).filter(
+                domain_model.Activity.filetype == "fit",
+                domain_model.Activity.has_path)
+            for activity in q:
+                activity.segments = domain_model.PathSegments.from_starts([0])
+        self.session.commit()
+
+    def rebuild_leaderboards(self):
+        """Build leaderboards of all sports and distances from records.
+
+        The changes will not be committed.
+        """
+        q = self.session.query(
+            domain_model.Record.sport, domain_model.Record.distance)
+        for sport, distance in q.distinct().all():
+            domain_model.rebuild_leaderboard(self.session, sport, distance)
+
+    def convert_trackpoints(self, callback=None):
+        """Convert trackpoint rows of all activities to columns.
+
+        Each activity is converted in its own transaction, so that the
+        conversion can be interrupted and continued later. New activities
+        will only be stored in columns if config['trackpoint_storage'] is
+        'columns'.
+
+        Parameters
+        ----------
+        callback : callable, optional (default: None)
+            Will be called with each converted activity.
+
+        Returns
+        -------
+        n_converted : int
+            Number of converted activities.
+        """
+        columns = (
+            domain_model.Trackpoint.timestamp,
+            domain_model.Trackpoint.latitude,
+            domain_model.Trackpoint.longitude,
+            domain_model.Trackpoint.altitude,
+            domain_model.Trackpoint.heartrate,
+            domain_model.Trackpoint.velocity)
+        q = self.session.query(domain_model.Activity).filter(
+            ~domain_model.Activity.path_data.has())
+        n_converted = 0
+        for activity in q.all():
+            trackpoints = self.session.query(*columns).filter(
+                domain_model.Trackpoint.activity_id == activity.id
+            ).order_by(domain_model.Trackpoint.id)
+            values = np.array(trackpoints.all(), dtype=float).reshape(
+                -1, len(columns))
+            if len(values) > 0:
+                activity.path_data = domain_model.PathData.from_path(
+                    values[:, 0], values[:, 1:3], values[:, 3],
+                    values[:, 4], values[:, 5])
+                self.session.query(domain_model.Trackpoint).filter(
+                    domain_model.Trackpoint.activity_id == activity.id
+                ).delete()
+                self.session.commit()
+                n_converted += 1
+                if callback is not None:
+                    callback(activity)
+        return n_converted
+
     def list_activities_between(self, start, end):
         """List activities within date range.
 
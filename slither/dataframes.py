@@ -0,0 +1,302 @@
+"""Tables of activities and trackpoints for data analysis.
+
+The functions in this module require pandas. The Parquet export requires
+pyarrow.
+"""
+import os
+import shutil
+import numpy as np
+import sqlalchemy
+from . import domain_model
+from .domain_model import _decode_channel
+
+
+ACTIVITY_COLUMNS = ["id", "sport", "start_time", "distance", "time",
+                    "calories", "heartrate", "filetype", "has_path"]
+"""Columns of activity tables."""
+
+TRACKPOINT_COLUMNS = ["timestamp", "latitude", "longitude", "altitude",
+                      "heartrate", "velocity"]
+"""Columns of trackpoint tables. Coordinates are given in radians."""
+
+CHANNELS = {"timestamp": "timestamps", "latitude": "latitudes",
+            "longitude": "longitudes", "altitude": "altitudes",
+            "heartrate": "heartrates", "velocity": "velocities"}
+"""Names of the trackpoint columns in the columnar storage (PathData)."""
+
+MAX_IDS_PER_QUERY = 500
+"""SQLite limits the number of parameters of a query."""
+
+
+def activities_frame(session, columns=None, sport=None, start=None,
+                     end=None):
+    """Table of activities.
+
+    Parameters
+    ----------
+    session : Session
+        Database session.
+
+    columns : list, optional (default: all)
+        Columns that will be loaded, see ACTIVITY_COLUMNS. The id of the
+        activities will always be loaded.
+
+    sport : str or list, optional (default: None)
+        Only activities of these sports will be loaded.
+
+    start : datetime, optional (default: None)
+        Only activities that start at or after this time will be loaded.
+
+    end : datetime, optional (default: None)
+        Only activities that start before this time will be loaded.
+
+    Returns
+    -------
+    activities : DataFrame
+        Activities sorted by start time.
+
+    Raises
+    ------
+    ValueError
+        Unknown column.
+    """
+    pd = _import("pandas")
+    columns = _check_columns(columns, ACTIVITY_COLUMNS, ["id"])
+    table = domain_model.Activity.__table__
+    query = sqlalchemy.select([table.c[column] for column in columns])
+    query = _filter_activities(query, sport, start, end).order_by(
+        table.c.start_time)
+    rows = session.execute(query).fetchall()
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    if "start_time" in columns:
+        frame["start_time"] = pd.to_datetime(frame["start_time"])
+    return frame
+
+
+def trackpoints_frame(session, ids=None, columns=None, sport=None,
+                      start=None, end=None):
+    """Table of trackpoints.
+
+    Trackpoints are loaded from both storages of paths, see
+    config['trackpoint_storage']. Filters are evaluated by the database.
+    Only the requested channels of paths in the columnar storage are
+    decoded.
+
+    Parameters
+    ----------
+    session : Session
+        Database session.
+
+    ids : list, optional (default: None)
+        Ids of activities. By default, trackpoints of all activities will be
+        loaded.
+
+    columns : list, optional (default: all)
+        Columns that will be loaded, see TRACKPOINT_COLUMNS. The id of the
+        activity will always be loaded.
+
+    sport : str or list, optional (default: None)
+        Only trackpoints of activities of these sports will be loaded.
+
+    start : datetime, optional (default: None)
+        Only trackpoints of activities that start at or after this time will
+        be loaded.
+
+    end : datetime, optional (default: None)
+        Only trackpoints of activities that start before this time will be
+        loaded.
+
+    Returns
+    -------
+    trackpoints : DataFrame
+        Trackpoints sorted by activity id and time.
+
+    Raises
+    ------
+    ValueError
+        Unknown column.
+    """
+    pd = _import("pandas")
+    columns = _check_columns(columns, TRACKPOINT_COLUMNS, [])
+    activities = domain_model.Activity.__table__
+    query = _filter_activities(
+        sqlalchemy.select([activities.c.id]), sport, start, end)
+    if ids is None:
+        selected_ids = [
+            activity_id for activity_id, in session.execute(query)]
+    else:
+        ids = sorted(set(int(activity_id) for activity_id in ids))
+        selected_ids = []
+        for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+            selected_ids.extend(
+                activity_id for activity_id, in session.execute(
+                    query.where(activities.c.id.in_(
+                        ids[i:i + MAX_IDS_PER_QUERY]))))
+
+    activity_ids = [np.empty(0, dtype=int)]
+    values = {column: [np.empty(0)] for column in columns}
+    for i in range(0, len(selected_ids), MAX_IDS_PER_QUERY):
+        chunk = selected_ids[i:i + MAX_IDS_PER_QUERY]
+        _load_paths(session, chunk, columns, activity_ids, values)
+        _load_trackpoint_rows(session, chunk, columns, activity_ids, values)
+
+    activity_ids = np.concatenate(activity_ids)
+    # all trackpoints of an activity are in one storage
+    order = np.argsort(activity_ids, kind="stable")
+    frame = pd.DataFrame({"activity_id": activity_ids[order]})
+    for column in columns:
+        frame[column] = np.concatenate(values[column])[order]
+    return frame
+
+
+def export_parquet(session, path, activity_filter=None, batch_size=100):
+    """Export activities and trackpoints to a Parquet dataset.
+
+    The dataset contains the tables 'activities' and 'trackpoints' in the
+    subdirectories of the same name. Both tables are partitioned by sport
+    (Hive partitioning, e.g., 'trackpoints/sport=running/'). Exported
+    partitions of an existing dataset will be replaced unless the activities
+    are filtered by 'start' or 'end'. In that case, the data will be written
+    to files that are named after the date range and only files of the same
+    range will be replaced, i.e., overlapping ranges should not be exported.
+
+    Parameters
+    ----------
+    session : Session
+        Database session.
+
+    path : str
+        Directory of the dataset.
+
+    activity_filter : dict, optional (default: None)
+        Only these activities will be exported. May contain the entries
+        'sport', 'start', and 'end', see activities_frame.
+
+    batch_size : int, optional (default: 100)
+        Number of activities of which the trackpoints will be loaded at
+        once.
+    """
+    pa = _import("pyarrow")
+    pq = _import("pyarrow.parquet")
+    if activity_filter is None:
+        activity_filter = {}
+    start = activity_filter.get("start")
+    end = activity_filter.get("end")
+    replace = start is None and end is None
+    part_filename = _part_filename(start, end)
+
+    activities = activities_frame(session, **activity_filter)
+    for sport, group in activities.groupby("sport"):
+        directory = _partition(path, "activities", sport, replace)
+        pq.write_table(
+            pa.Table.from_pandas(
+                group.drop(columns="sport"), preserve_index=False),
+            os.path.join(directory, part_filename))
+
+    # trackpoints are written in batches from this thread because the
+    # session must not be used by other threads
+    schema = pa.schema(
+        [("activity_id", pa.int64())] +
+        [(column, pa.float64()) for column in TRACKPOINT_COLUMNS])
+    sports = activities.set_index("id")["sport"]
+    ids = activities["id"][activities["has_path"].fillna(False).astype(bool)]
+    writers = {}
+    try:
+        for i in range(0, len(ids), batch_size):
+            trackpoints = trackpoints_frame(
+                session, ids[i:i + batch_size].tolist())
+            for sport, group in trackpoints.groupby(
+                    trackpoints["activity_id"].map(sports)):
+                if sport not in writers:
+                    writers[sport] = pq.ParquetWriter(os.path.join(
+                        _partition(path, "trackpoints", sport, replace),
+                        part_filename), schema)
+                writers[sport].write_table(pa.Table.from_pandas(
+                    group, schema=schema, preserve_index=False))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+def _partition(path, table, sport, replace):
+    """Create directory of a partition (Hive partitioning)."""
+    directory = os.path.join(path, table, "sport=%s" % sport)
+    if replace and os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _part_filename(start, end):
+    """Name of the file of a partition that contains a date range."""
+    if start is None and end is None:
+        return "part-0.parquet"
+    return "part-%s-%s.parquet" % tuple(
+        "open" if date is None else date.strftime("%Y%m%dT%H%M%S")
+        for date in (start, end))
+
+
+def _filter_activities(query, sport, start, end):
+    activities = domain_model.Activity.__table__
+    if sport is not None:
+        if isinstance(sport, str):
+            sport = [sport]
+        query = query.where(activities.c.sport.in_(list(sport)))
+    if start is not None:
+        query = query.where(activities.c.start_time >= start)
+    if end is not None:
+        query = query.where(activities.c.start_time < end)
+    return query
+
+
+def _load_paths(session, ids, columns, activity_ids, values):
+    paths = domain_model.PathData.__table__
+    query = sqlalchemy.select(
+        [paths.c.activity_id, paths.c.n_trackpoints] +
+        [paths.c[CHANNELS[column]] for column in columns]).where(
+        paths.c.activity_id.in_(ids))
+    for row in session.execute(query):
+        activity_ids.append(np.full(row[1], row[0], dtype=int))
+        for column, blob in zip(columns, row[2:]):
+            values[column].append(_decode_channel(
+                blob, domain_model.PathData.CHANNELS[CHANNELS[column]]))
+
+
+def _load_trackpoint_rows(session, ids, columns, activity_ids, values):
+    # rows are fetched by the DBAPI cursor without creating objects,
+    # column names have been checked before
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT %s FROM trackpoints WHERE activity_id IN (%s) "
+            "ORDER BY activity_id, id"
+            % (", ".join(["activity_id"] + columns),
+               ", ".join(["?"] * len(ids))), ids)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return
+    # None will be converted to NaN
+    rows = np.array(rows, dtype=float).reshape(-1, len(columns) + 1)
+    activity_ids.append(rows[:, 0].astype(int))
+    for i, column in enumerate(columns):
+        values[column].append(rows[:, i + 1])
+
+
+def _check_columns(columns, available, required):
+    if columns is None:
+        return list(available)
+    unknown = set(columns).difference(available)
+    if unknown:
+        raise ValueError("Unknown columns: %s" % ", ".join(sorted(unknown)))
+    return required + [column for column in columns
+                       if column not in required]
+
+
+def _import(name):
+    try:
+        return __import__(name, fromlist=["_"])
+    except ImportError:
+        raise ImportError("Package '%s' is required for data frames"
+                          % name.split(".")[0])
@@ -1,11 +1,13 @@
 """Domain model."""
+import zlib
 import sqlalchemy
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, object_session
 import numpy as np
 
-from slither.core.analysis import fastest_part
+from slither.core.analysis import fastest_parts, compute_metrics
 from slither.core.config import config
+from slither.path_cache import memory_cache, activity_key
 
 
 Base = declarative_base()
@@ -14,6 +16,11 @@ Base = declarative_base()
 class Activity(Base):
     """Activity."""
     __tablename__ = "activities"
+    __table_args__ = (
+        sqlalchemy.Index("ix_activities_start_time", "start_time"),
+        sqlalchemy.Index("ix_activities_sport_start_time",
+                         "sport", "start_time"),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     sport = sqlalchemy.Column(sqlalchemy.String, nullable=False)
@@ -25,10 +32,23 @@ class Activity(Base):
     filetype = sqlalchemy.Column(sqlalchemy.String, default="tcx")
     has_path = sqlalchemy.Column(sqlalchemy.Boolean)
     trackpoints = relationship("Trackpoint")
-
-    def set_path(self, timestamps, coords, altitudes, heartrates, velocities):
+    path_data = relationship(
+        "PathData", uselist=False, cascade="all, delete-orphan")
+    metrics = relationship(
+        "ActivityMetrics", uselist=False, cascade="all, delete-orphan")
+    segments = relationship(
+        "PathSegments", uselist=False, cascade="all, delete-orphan")
+
+    def set_path(self, timestamps, coords, altitudes, heartrates, velocities,
+                 segment_starts=None):
         """Set path.
 
+        Depending on config['trackpoint_storage'], the path will be stored
+        in one row per activity ('columns') or in one row per trackpoint
+        ('rows'). Trackpoint rows of a new activity are inserted directly
+        from the arrays when the activity is inserted. Cached paths of a
+        stored activity will be replaced.
+
         Parameters
         ----------
         timestamps : array-like, shape (n_steps,)
@@ -45,6 +65,12 @@ class Activity(Base):
 
         velocities : array-like, shape (n_steps,)
             Velocities.
+
+        segment_starts : array-like, shape (n_segments,), optional
+            Indices of the first trackpoint of each track segment. Velocities
+            are computed per segment, see
+            slither.core.geodetic.recompute_velocities. They cannot be
+            recomputed if the segments are unknown (default: None).
         """
         assert len(timestamps) == len(coords), "%d != %d" % (
             len(timestamps), len(coords))
@@ -55,12 +81,103 @@ class Activity(Base):
         assert len(timestamps) == len(velocities), "%d != %d" % (
             len(timestamps), len(velocities))
 
+        path = {
+            "timestamps": np.asarray(timestamps, dtype=float),
+            "coords": np.asarray(coords, dtype=float).reshape(-1, 2),
+            "altitudes": np.asarray(altitudes, dtype=float),
+            "heartrates": np.asarray(heartrates, dtype=float),
+            "velocities": np.asarray(velocities, dtype=float)
+        }
+        if segment_starts is None:
+            self.segments = None
+        else:
+            self.segments = PathSegments.from_starts(segment_starts)
+
+        key = activity_key(self)
+        if key is None:
+            # new activities keep their path, so that it does not have to be
+            # decoded to compute records or metrics
+            self.path = path
+        else:
+            self._invalidate_cached_path()
+            memory_cache.put(key, path)
+
+        if config["trackpoint_storage"] == "columns":
+            self.path_data = PathData.from_path(
+                timestamps, coords, altitudes, heartrates, velocities)
+            return
+
+        if self.id is None:
+            self._new_trackpoints = True
+            return
+
         self.trackpoints = [
             Trackpoint(timestamp=t, latitude=p[0], longitude=p[1], altitude=a,
                        heartrate=h, velocity=v)
             for t, p, a, h, v in zip(timestamps, coords, altitudes, heartrates,
                                      velocities)]
 
+    def set_velocities(self, velocities):
+        """Replace velocities of the stored path.
+
+        The other channels of the path are not modified. Trackpoint rows
+        will be updated directly in the database. Cached paths will be
+        invalidated.
+
+        Parameters
+        ----------
+        velocities : array-like, shape (n_steps,)
+            Velocities.
+        """
+        velocities = np.asarray(velocities, dtype=float)
+        if activity_key(self) is None:
+            if hasattr(self, "path"):
+                self.path = dict(self.path, velocities=velocities)
+        else:
+            self._invalidate_cached_path()
+
+        if self.path_data is not None:
+            self.path_data.velocities = _encode_channel(
+                velocities, PathData.CHANNELS["velocities"])
+            return
+
+        session = object_session(self)
+        if session is None or self.id is None:
+            for trackpoint, velocity in zip(
+                    self.trackpoints, velocities.tolist()):
+                trackpoint.velocity = velocity
+            return
+
+        table = Trackpoint.__table__
+        ids = [trackpoint_id for trackpoint_id, in session.execute(
+            sqlalchemy.select([table.c.id]).where(
+                table.c.activity_id == self.id).order_by(table.c.id))]
+        assert len(ids) == len(velocities), "%d != %d" % (
+            len(ids), len(velocities))
+        if ids:
+            # NaN will be stored as NULL
+            session.execute(
+                table.update().where(
+                    table.c.id == sqlalchemy.bindparam("trackpoint_id")
+                ).values(velocity=sqlalchemy.bindparam("new_velocity")),
+                [{"trackpoint_id": trackpoint_id, "new_velocity": velocity}
+                 for trackpoint_id, velocity in zip(
+                    ids, velocities.tolist())])
+        session.expire(self, ["trackpoints"])
+
+    def get_segment_starts(self):
+        """Get track segments of the path.
+
+        Returns
+        -------
+        segment_starts : array, shape (n_segments,) or None
+            Indices of the first trackpoint of each segment or None if the
+            segments are unknown.
+        """
+        if self.segments is None:
+            return None
+        return self.segments.get_starts()
+
     def get_filename(self):
         """Get filename.
 
@@ -75,32 +192,103 @@ class Activity(Base):
     def get_path(self):
         """Get path.
 
+        Paths of activities that are stored in a database are kept in the
+        process-wide cache slither.path_cache.memory_cache, which has a
+        limited size. If the session of the activity has a persistent path
+        cache in session.info['path_cache'] (see
+        slither.path_cache.PathCache), decoded paths will be loaded from and
+        stored in this cache. Paths of other activities are stored in the
+        attribute 'path', which will be moved to the memory cache once the
+        activity has been stored.
+
         Returns
         -------
         path : config or None
             Path. Contains the entries 'timestamps', 'coords', 'altitudes',
             'heartrates', and 'velocities'.
         """
+        key = activity_key(self)
         if hasattr(self, "path"):
-            return self.path
+            if key is None:
+                return self.path
+            path = self.__dict__.pop("path")
+            memory_cache.put(key, path)
+            return path
 
-        if self.has_path:
-            self.path = {
-                "timestamps": np.array(
-                    [t.timestamp for t in self.trackpoints], dtype=np.float),
-                "coords": np.array(
-                    [(t.latitude, t.longitude) for t in self.trackpoints],
-                    dtype=np.float),
-                "altitudes": np.array(
-                    [t.altitude for t in self.trackpoints], dtype=np.float),
-                "heartrates": np.array(
-                    [t.heartrate for t in self.trackpoints], dtype=np.float),
-                "velocities": np.array(
-                    [t.velocity for t in self.trackpoints], dtype=np.float)
-            }
+        if not self.has_path:
+            return None
+
+        if key is None:
+            self.path = self._decode_path()
             return self.path
 
-        return None
+        path = memory_cache.get(key)
+        if path is not None:
+            return path
+
+        cache = object_session(self).info.get("path_cache")
+        if cache is not None:
+            path = cache.load(self)
+        if path is None:
+            path = self._decode_path()
+            if cache is not None:
+                cache.store(self, path)
+        memory_cache.put(key, path)
+        return path
+
+    def _invalidate_cached_path(self):
+        """Remove path of a stored activity from all caches."""
+        self.__dict__.pop("path", None)
+        key = activity_key(self)
+        if key is None:
+            return
+        memory_cache.invalidate(key)
+        cache = object_session(self).info.get("path_cache")
+        if cache is not None:
+            cache.invalidate(self)
+
+    def _decode_path(self):
+        if self.path_data is not None:
+            return self.path_data.get_path()
+
+        values = self._load_trackpoints()
+        return {
+            "timestamps": values[:, 0],
+            "coords": values[:, 1:3],
+            "altitudes": values[:, 3],
+            "heartrates": values[:, 4],
+            "velocities": values[:, 5]
+        }
+
+    def _load_trackpoints(self):
+        """Load values of trackpoint rows.
+
+        If the activity is stored in a database, the rows are fetched with
+        one query on the DBAPI cursor without creating ORM objects.
+
+        Returns
+        -------
+        values : array, shape (n_trackpoints, 6)
+            Timestamps, latitudes, longitudes, altitudes, heart rates, and
+            velocities. Missing values are NaN.
+        """
+        session = object_session(self)
+        if (session is None or self.id is None or
+                "trackpoints" in self.__dict__):
+            rows = [(t.timestamp, t.latitude, t.longitude, t.altitude,
+                     t.heartrate, t.velocity) for t in self.trackpoints]
+        else:
+            cursor = session.connection().connection.cursor()
+            try:
+                cursor.execute(
+                    "SELECT timestamp, latitude, longitude, altitude, "
+                    "heartrate, velocity FROM trackpoints "
+                    "WHERE activity_id = ? ORDER BY id", (self.id,))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        # None will be converted to NaN
+        return np.array(rows, dtype=float).reshape(-1, 6)
 
     def compute_records(self, distance):
         """Compute fastest time for a specific distance.
@@ -115,13 +303,37 @@ class Activity(Base):
         record : Record
             Fastest time.
         """
-        record = self._check_metadata(distance)
-        if self.has_path:
-            fp = fastest_part(self.sport, self.get_path()["timestamps"],
-                              self.get_path()["velocities"], distance)
-            record = min((record, fp))
-        return Record(sport=self.sport, distance=distance, time=record,
-                      activity_id=self.id)
+        return self.compute_all_records([distance])[0]
+
+    def compute_all_records(self, distances, parts=None):
+        """Compute fastest times for multiple distances.
+
+        Parameters
+        ----------
+        distances : list
+            Distances.
+
+        parts : array-like, optional (default: None)
+            Fastest times for the distances on the path, see
+            slither.core.analysis.fastest_parts. They will be computed if
+            they are not given.
+
+        Returns
+        -------
+        records : list
+            Fastest time for each distance.
+        """
+        times = [self._check_metadata(distance) for distance in distances]
+        if parts is None and self.has_path and distances:
+            path = self.get_path()
+            parts = fastest_parts(self.sport, path["timestamps"],
+                                  path["velocities"], distances)
+        if parts is not None:
+            times = [min(time, float(part))
+                     for time, part in zip(times, parts)]
+        return [Record(sport=self.sport, distance=distance, time=time,
+                       activity_id=self.id)
+                for distance, time in zip(distances, times)]
 
     def _check_metadata(self, distance):
         if self.distance >= distance:
@@ -141,7 +353,8 @@ class Trackpoint(Base):
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     activity_id = sqlalchemy.Column(
-        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"))
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        index=True)
     timestamp = sqlalchemy.Column(sqlalchemy.Float)
     latitude = sqlalchemy.Column(sqlalchemy.Float)
     longitude = sqlalchemy.Column(sqlalchemy.Float)
@@ -150,24 +363,432 @@ class Trackpoint(Base):
     velocity = sqlalchemy.Column(sqlalchemy.Float)
 
 
+@sqlalchemy.event.listens_for(Activity, "after_insert")
+def _insert_trackpoints(mapper, connection, activity):
+    """Insert trackpoints of a new activity without ORM objects."""
+    if not getattr(activity, "_new_trackpoints", False):
+        return
+    path = activity.path
+    columns = np.column_stack((
+        path["timestamps"], path["coords"], path["altitudes"],
+        path["heartrates"], path["velocities"]))
+    # NaN will be stored as NULL
+    rows = [
+        {"activity_id": activity.id, "timestamp": t, "latitude": lat,
+         "longitude": lon, "altitude": a, "heartrate": h, "velocity": v}
+        for t, lat, lon, a, h, v in columns.tolist()]
+    if rows:
+        connection.execute(Trackpoint.__table__.insert(), rows)
+    activity._new_trackpoints = False
+
+
+class PathData(Base):
+    """Path of an activity stored in columns.
+
+    Each channel of the path is stored as a compressed binary blob of
+    little-endian numbers. This needs much less space than one row per
+    trackpoint and can be decoded directly to arrays.
+    """
+    __tablename__ = "paths"
+
+    CHANNELS = {
+        "timestamps": "<f8",
+        "latitudes": "<f8",
+        "longitudes": "<f8",
+        "altitudes": "<f8",
+        "heartrates": "<f4",
+        "velocities": "<f8",
+    }
+    """Data types of channels."""
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    activity_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        unique=True)
+    n_trackpoints = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    timestamps = sqlalchemy.Column(sqlalchemy.LargeBinary)
+    latitudes = sqlalchemy.Column(sqlalchemy.LargeBinary)
+    longitudes = sqlalchemy.Column(sqlalchemy.LargeBinary)
+    altitudes = sqlalchemy.Column(sqlalchemy.LargeBinary)
+    heartrates = sqlalchemy.Column(sqlalchemy.LargeBinary)
+    velocities = sqlalchemy.Column(sqlalchemy.LargeBinary)
+
+    @staticmethod
+    def from_path(timestamps, coords, altitudes, heartrates, velocities):
+        """Encode path.
+
+        Parameters
+        ----------
+        timestamps : array-like, shape (n_steps,)
+            Timestamps.
+
+        coords : array-like, shape (n_steps, 2)
+            GPS coordinates.
+
+        altitudes : array-like, shape (n_steps,)
+            Altitudes.
+
+        heartrates : array-like, shape (n_steps,)
+            Heart rates.
+
+        velocities : array-like, shape (n_steps,)
+            Velocities.
+
+        Returns
+        -------
+        path_data : PathData
+            Encoded path.
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        channels = {
+            "timestamps": timestamps,
+            "latitudes": coords[:, 0],
+            "longitudes": coords[:, 1],
+            "altitudes": altitudes,
+            "heartrates": heartrates,
+            "velocities": velocities,
+        }
+        path_data = PathData(n_trackpoints=len(coords))
+        for name, dtype in PathData.CHANNELS.items():
+            setattr(path_data, name, _encode_channel(channels[name], dtype))
+        return path_data
+
+    def get_path(self):
+        """Decode path.
+
+        Returns
+        -------
+        path : dict
+            Path. Contains the entries 'timestamps', 'coords', 'altitudes',
+            'heartrates', and 'velocities'.
+        """
+        channels = {
+            name: _decode_channel(getattr(self, name), dtype)
+            for name, dtype in PathData.CHANNELS.items()}
+        return {
+            "timestamps": channels["timestamps"],
+            "coords": np.column_stack(
+                (channels["latitudes"], channels["longitudes"])),
+            "altitudes": channels["altitudes"],
+            "heartrates": channels["heartrates"],
+            "velocities": channels["velocities"]
+        }
+
+
+class PathSegments(Base):
+    """Track segments of a path.
+
+    Loaders compute velocities for each track segment separately, so that
+    the first trackpoint of each segment has the velocity 0. The segments
+    are stored to compute velocities in the same way again.
+    """
+    __tablename__ = "path_segments"
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    activity_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        unique=True)
+    starts = sqlalchemy.Column(sqlalchemy.LargeBinary, nullable=False)
+
+    @staticmethod
+    def from_starts(starts):
+        """Encode segments.
+
+        Parameters
+        ----------
+        starts : array-like, shape (n_segments,)
+            Indices of the first trackpoint of each segment.
+
+        Returns
+        -------
+        segments : PathSegments
+            Encoded segments.
+        """
+        return PathSegments(starts=_encode_channel(starts, "<i4"))
+
+    def get_starts(self):
+        """Decode segments.
+
+        Returns
+        -------
+        starts : array, shape (n_segments,)
+            Indices of the first trackpoint of each segment.
+        """
+        return _decode_channel(self.starts, "<i4").astype(int)
+
+
+def _encode_channel(values, dtype):
+    # None (e.g. from the database) will be converted to NaN
+    values = np.asarray(values, dtype=float).astype(dtype)
+    return zlib.compress(values.tobytes())
+
+
+def _decode_channel(blob, dtype):
+    # a bytearray is writable, so the array does not have to be copied
+    values = np.frombuffer(bytearray(zlib.decompress(blob)), dtype=dtype)
+    return values.astype(float, copy=False)
+
+
 class Record(Base):
     """Record.
 
     A record is the fastest time for a given distance and sport.
     """
     __tablename__ = "records"
+    __table_args__ = (
+        sqlalchemy.Index("ix_records_sport_distance_valid_time",
+                         "sport", "distance", "valid", "time"),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     sport = sqlalchemy.Column(sqlalchemy.String, nullable=False)
     distance = sqlalchemy.Column(sqlalchemy.Float, nullable=False)
     time = sqlalchemy.Column(sqlalchemy.Float)
     valid = sqlalchemy.Column(sqlalchemy.Boolean, default=True)
+    activity_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        index=True)
+
+    activity = relationship("Activity", foreign_keys=[activity_id])
+
+
+class LeaderboardEntry(Base):
+    """Entry of a leaderboard.
+
+    A leaderboard contains the fastest valid records of a sport and
+    distance, see config['leaderboard']['size']. It is maintained with
+    update_leaderboard whenever records are added, deleted, or invalidated.
+    """
+    __tablename__ = "leaderboard"
+    __table_args__ = (
+        sqlalchemy.Index("ix_leaderboard_sport_distance_rank",
+                         "sport", "distance", "rank", unique=True),
+    )
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    sport = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    distance = sqlalchemy.Column(sqlalchemy.Float, nullable=False)
+    rank = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    time = sqlalchemy.Column(sqlalchemy.Float, nullable=False)
+    record_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("records.id"), index=True)
     activity_id = sqlalchemy.Column(
         sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"))
 
+    record = relationship("Record", foreign_keys=[record_id])
     activity = relationship("Activity", foreign_keys=[activity_id])
 
 
+def update_leaderboard(session, sport, distance, added=(), removed=()):
+    """Update leaderboard of a sport and distance.
+
+    Only records that are on the leaderboard or that have been added will
+    be compared. Records will only be loaded from the database if entries
+    have been removed from a full leaderboard.
+
+    Parameters
+    ----------
+    session : Session
+        Database session.
+
+    sport : str
+        Sport.
+
+    distance : float
+        Distance.
+
+    added : list, optional (default: ())
+        New records of this sport and distance. They must have been flushed
+        to the database. Invalid records and infinite times will be ignored.
+
+    removed : list, optional (default: ())
+        Records of this sport and distance that have been deleted or
+        invalidated.
+    """
+    size = config["leaderboard"]["size"]
+    entries = session.query(LeaderboardEntry).filter(
+        LeaderboardEntry.sport == sport,
+        LeaderboardEntry.distance == distance).order_by(
+        LeaderboardEntry.rank).all()
+    removed_ids = set(record.id for record in removed)
+    board = [(entry.time, entry.record_id, entry.activity_id)
+             for entry in entries if entry.record_id not in removed_ids]
+    if len(board) < len(entries) == size:
+        excluded = removed_ids.union(record_id for _, record_id, _ in board)
+        board.extend(_best_records(
+            session, sport, distance, size - len(board), excluded))
+    board.extend((record.time, record.id, record.activity_id)
+                 for record in added if _qualifies(record))
+    _write_leaderboard(session, sport, distance, entries, board)
+
+
+def rebuild_leaderboard(session, sport, distance):
+    """Build leaderboard of a sport and distance from all records.
+
+    Parameters
+    ----------
+    session : Session
+        Database session.
+
+    sport : str
+        Sport.
+
+    distance : float
+        Distance.
+    """
+    entries = session.query(LeaderboardEntry).filter(
+        LeaderboardEntry.sport == sport,
+        LeaderboardEntry.distance == distance).all()
+    board = _best_records(
+        session, sport, distance, config["leaderboard"]["size"], ())
+    _write_leaderboard(session, sport, distance, entries, board)
+
+
+def _qualifies(record):
+    return (record.valid is not False and record.time is not None and
+            np.isfinite(record.time))
+
+
+def _best_records(session, sport, distance, n, excluded):
+    """Fastest valid records, uses the index of the records table."""
+    q = session.query(Record.time, Record.id, Record.activity_id).filter(
+        Record.sport == sport, Record.distance == distance, Record.valid,
+        Record.time < float("inf"))
+    if excluded:
+        q = q.filter(Record.id.notin_(list(excluded)))
+    return q.order_by(Record.time, Record.id).limit(n).all()
+
+
+def _write_leaderboard(session, sport, distance, entries, board):
+    """Store the best records of a leaderboard, reuses existing rows."""
+    board = sorted(board, key=lambda entry: entry[:2])
+    board = board[:config["leaderboard"]["size"]]
+    entries = sorted(entries, key=lambda entry: entry.rank)
+    for rank, (time, record_id, activity_id) in enumerate(board, 1):
+        if rank <= len(entries):
+            entry = entries[rank - 1]
+        else:
+            entry = LeaderboardEntry(sport=sport, distance=distance)
+            session.add(entry)
+        entry.rank = rank
+        entry.time = time
+        entry.record_id = record_id
+        entry.activity_id = activity_id
+    for entry in entries[len(board):]:
+        session.delete(entry)
+
+
+class ActivityMetrics(Base):
+    """Metrics that are derived from an activity.
+
+    Metrics are computed once when the activity is stored, so that they can
+    be used in queries without loading paths.
+    """
+    __tablename__ = "activity_metrics"
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    activity_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        unique=True)
+    elevation_gain = sqlalchemy.Column(sqlalchemy.Float)
+    elevation_loss = sqlalchemy.Column(sqlalchemy.Float)
+    moving_time = sqlalchemy.Column(sqlalchemy.Float)
+    max_velocity = sqlalchemy.Column(sqlalchemy.Float)
+    average_pace = sqlalchemy.Column(sqlalchemy.Float)
+    heartrate_min = sqlalchemy.Column(sqlalchemy.Float)
+    heartrate_q1 = sqlalchemy.Column(sqlalchemy.Float)
+    heartrate_median = sqlalchemy.Column(sqlalchemy.Float)
+    heartrate_q3 = sqlalchemy.Column(sqlalchemy.Float)
+    heartrate_max = sqlalchemy.Column(sqlalchemy.Float)
+
+    def update(self, activity, metrics=None):
+        """Compute metrics of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+
+        metrics : dict, optional (default: None)
+            Metrics of the activity's path, see
+            slither.core.analysis.compute_metrics. They will be computed if
+            they are not given.
+        """
+        if metrics is None:
+            path = activity.get_path()
+            if path is not None and len(path["timestamps"]) > 1:
+                metrics = compute_metrics(path, activity.sport)
+            else:
+                metrics = {"moving_time": activity.time}
+        for column in self.__table__.columns.keys():
+            if column not in ("id", "activity_id", "average_pace"):
+                setattr(self, column, metrics.get(column))
+
+        # average pace in seconds per distance of the pace table
+        pdt = config["pace_distance_table"]
+        pace_distance = pdt.get(activity.sport, pdt["other"])
+        if self.moving_time and activity.distance:
+            self.average_pace = (
+                self.moving_time / activity.distance * pace_distance)
+        else:
+            self.average_pace = None
+
+
+class Fingerprint(Base):
+    """Fingerprint of an activity.
+
+    Fingerprints are used to detect activities that have been imported
+    already, either by the hash of the imported file or by sport, start
+    time, and duration.
+    """
+    __tablename__ = "fingerprints"
+    __table_args__ = (
+        sqlalchemy.Index("ix_fingerprints_content_hash", "content_hash"),
+        sqlalchemy.Index("ix_fingerprints_sport_start_time_duration",
+                         "sport", "start_time", "duration"),
+    )
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    activity_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("activities.id"),
+        index=True)
+    content_hash = sqlalchemy.Column(sqlalchemy.String)
+    sport = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    start_time = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
+    duration = sqlalchemy.Column(sqlalchemy.Integer)
+
+    def update(self, activity):
+        """Update fingerprint from metadata of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+        """
+        self.activity_id = activity.id
+        self.sport = activity.sport
+        self.start_time = activity.start_time
+        self.duration = fingerprint_duration(activity.time)
+
+
+def fingerprint_duration(time):
+    """Duration of an activity as it is stored in a fingerprint.
+
+    Parameters
+    ----------
+    time : float or None
+        Duration in seconds.
+
+    Returns
+    -------
+    duration : int or None
+        Duration rounded to seconds.
+    """
+    if time is None or not np.isfinite(time):
+        return None
+    return int(round(time))
+
+
 def init_database(session):
     """Create new database structure.
 
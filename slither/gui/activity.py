@@ -41,7 +41,7 @@ from .new_activity import EditActivity
 from slither.core.config import slither_ressource_filename
 from slither.core.config import config
 from slither.core.ui_text import d
-from slither.core.analysis import get_paces
+from slither.core.analysis import compute_splits
 
 
 class ActivityTab(QWidget):
@@ -370,7 +370,7 @@ class Map(WebView):
 
     def load_map(self, activity):
         if activity.has_path:
-            html = render_map(activity.get_path())
+            html = render_map(activity.get_path(), activity.sport)
             self.setHtml(html)
             self.new_activity_loaded = True
         else:
@@ -407,11 +407,13 @@ class PaceTable(QTableWidget):
             self.setRowCount(0)
             return
 
-        paces = get_paces(activity.get_path(), activity.sport)
-        self.setRowCount(len(paces))
-        for i, pace in enumerate(paces):
-            self.setItem(i, 0, QTableWidgetItem(d.display_distance(pace[0])))
-            self.setItem(i, 1, QTableWidgetItem(d.display_time(pace[1])))
+        splits = compute_splits(activity.get_path(), activity.sport)
+        self.setRowCount(len(splits))
+        for i, split in enumerate(splits):
+            self.setItem(i, 0, QTableWidgetItem(
+                d.display_distance(split["boundary"])))
+            self.setItem(i, 1, QTableWidgetItem(
+                d.display_time(split["moving_pace"])))
 
         self.resizeColumnsToContents()
 
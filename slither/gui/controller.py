@@ -106,7 +106,10 @@ class ImportActivityThread(QThread):
                 content = f.read()
             except:
                 content = None
-            self.running_service.import_activity(content, filename)
+            try:
+                self.running_service.import_activity(content, filename)
+            finally:
+                self.running_service.close()
 
 
 class SyncThread(QThread):
@@ -115,4 +118,7 @@ class SyncThread(QThread):
         super(SyncThread, self).__init__()
 
     def run(self):
-        self.service.sync_to_server()
+        try:
+            self.service.sync_to_server()
+        finally:
+            self.service.close()
@@ -7,14 +7,19 @@ except ImportError:
 
 from . import Controller, MainWindow
 from ..service import Service
+from ..database import sqlite_pragmas
 
 
 def start(args):
+    db_profile = sqlite_pragmas(args.db_profile)
+    db_profile.update(args.pragma)
     service = Service(args.debug, args.db_filename, args.datadir,
                       args.remote, args.username, args.password,
-                      args.base_path)
+                      args.base_path, db_profile)
     app = QApplication(sys.argv)
     controller = Controller(service, app)
     win = MainWindow(controller)
     win.show()
-    sys.exit(app.exec_())
+    result = app.exec_()
+    service.close()
+    sys.exit(result)
@@ -1,7 +1,7 @@
 """Read Flexible and Interoperable Data Transfer file (FIT)."""
-import time
 import numpy as np
 from slither.core.geodetic import compute_velocities
+from slither.io.utils import timestamps_from_datetimes
 from slither.core.unit_conversions import semicircles_to_radians
 from fitparse import FitFile
 
@@ -12,14 +12,32 @@ SPORTS_MAPPING = {
     "training": "other"
 }
 
+RECORD_FIELDS = {
+    "position_lat": 0,
+    "position_long": 1,
+    "altitude": 2,
+    "enhanced_altitude": 2,
+    "heart_rate": 3,
+    "cadence": 4,
+    "power": 5,
+    "speed": 6,
+    "enhanced_speed": 6,
+}
+"""Maps fields of record messages to columns of the trackpoint data."""
+
+N_COLUMNS = 7
 
-def read_fit(filename):
+
+def read_fit(fileish):
     """Read Flexible and Interoperable Data Transfer file (FIT).
 
+    All messages are read in one pass. The fields of record messages are
+    directly written to columns of an array.
+
     Parameters
     ----------
-    filename : str
-        Filename
+    fileish : str, bytes, or file-like object
+        Filename, file content, or binary file object
 
     Returns
     -------
@@ -27,31 +45,89 @@ def read_fit(filename):
         Activity metadata
 
     path : dict
-        Trackpoint data
+        Trackpoint data. In addition to the usual entries, it contains
+        'cadences', 'powers', and 'speeds' (as measured by the device).
 
     Raises
     ------
     ValueError
         No activity data
     """
-    fitfile = FitFile(filename)
-    records = list(fitfile.get_messages("record"))
-    n_trackpoints = len(records)
-    sport_messages = list(fitfile.get_messages("sport"))
-    if len(sport_messages) != 1:
+    fitfile = FitFile(fileish)
+    dates, columns, messages = _read_messages(fitfile)
+    fitfile.close()
+
+    metadata = _metadata(messages, len(dates))
+    if metadata["has_path"]:
+        path = _make_path(dates, columns)
+    else:
+        path = None
+    return metadata, path
+
+
+def _read_messages(fitfile):
+    """Read record, sport, activity, and session messages.
+
+    Parameters
+    ----------
+    fitfile : FitFile
+        FIT file
+
+    Returns
+    -------
+    dates : list
+        Timestamps of records. Records without timestamp are skipped.
+
+    columns : array, shape (n_records, N_COLUMNS)
+        Values of record fields, see RECORD_FIELDS
+
+    messages : dict
+        Lists of sport, activity, and session messages
+    """
+    messages = {"sport": [], "activity": [], "session": []}
+    dates = []
+    columns = np.full((4096, N_COLUMNS), np.nan)
+    for message in fitfile.get_messages(
+            ["record", "sport", "activity", "session"]):
+        if message.name != "record":
+            messages[message.name].append(message)
+            continue
+
+        i = len(dates)
+        if i == len(columns):
+            columns = np.vstack((columns, np.full_like(columns, np.nan)))
+        row = columns[i]
+        date = None
+        for field in message.fields:
+            if field.name == "timestamp":
+                date = field.value
+            else:
+                column = RECORD_FIELDS.get(field.name)
+                if column is not None and field.value is not None:
+                    row[column] = field.value
+        if date is None:
+            # the row will be reused by the next record
+            row[:] = np.nan
+            continue
+        dates.append(date)
+    return dates, columns[:len(dates)], messages
+
+
+def _metadata(messages, n_trackpoints):
+    if len(messages["sport"]) != 1:
         raise ValueError("No activity data!")
-    sport = sport_messages[0].get_value("sport")
+    sport = messages["sport"][0].get_value("sport")
     sport = SPORTS_MAPPING.get(sport, sport)
-    activity_messages = list(fitfile.get_messages("activity"))
-    assert len(activity_messages) == 1
-    start_time = activity_messages[0].get_value("local_timestamp")
-    total_timer_time = activity_messages[0].get_value("total_timer_time")
-    session_messages = list(fitfile.get_messages("session"))
-    assert len(session_messages) == 1
-    distance = session_messages[0].get_value("total_distance")
-    calories = session_messages[0].get_value("total_calories")
-    heartrate = session_messages[0].get_value("avg_heart_rate")
-    metadata = {
+    assert len(messages["activity"]) == 1
+    activity = messages["activity"][0]
+    start_time = activity.get_value("local_timestamp")
+    total_timer_time = activity.get_value("total_timer_time")
+    assert len(messages["session"]) == 1
+    session = messages["session"][0]
+    distance = session.get_value("total_distance")
+    calories = session.get_value("total_calories")
+    heartrate = session.get_value("avg_heart_rate")
+    return {
         "sport": sport,
         "start_time": start_time,
         "time": total_timer_time,
@@ -61,33 +137,24 @@ def read_fit(filename):
         "filetype": "fit",
         "has_path": n_trackpoints > 0
     }
-    if metadata["has_path"]:
-        path = {
-            "timestamps": np.empty(n_trackpoints),
-            "coords": np.empty((n_trackpoints, 2)),
-            "altitudes": np.empty(n_trackpoints),
-            "heartrates": np.empty(n_trackpoints)
-        }
-        for k in path.keys():
-            path[k][:] = np.nan
-
-        for i, record in enumerate(records):
-            record = record.get_values()
-            path["timestamps"][i] = time.mktime(
-                record["timestamp"].timetuple())
-            if "position_lat" in record and "position_long" in record:
-                path["coords"][i] = (record["position_lat"],
-                                     record["position_long"])
-            if "altitude" in record:
-                path["altitudes"][i] = record["altitude"]
-            if "heart_rate" in record:
-                path["heartrates"][i] = record["heart_rate"]
-
-        finite_coords = np.isfinite(path["coords"])
-        path["coords"][finite_coords] = semicircles_to_radians(
-            path["coords"][finite_coords])
-        path["velocities"], _ = compute_velocities(
-            path["timestamps"], path["coords"])
-    else:
-        path = None
-    return metadata, path
+
+
+def _make_path(dates, columns):
+    coords = columns[:, :2].copy()
+    # a position is only valid if latitude and longitude are available
+    coords[np.isnan(coords).any(axis=1)] = np.nan
+    finite_coords = np.isfinite(coords)
+    coords[finite_coords] = semicircles_to_radians(coords[finite_coords])
+    path = {
+        "timestamps": timestamps_from_datetimes(dates, local_time=True),
+        "coords": coords,
+        "altitudes": columns[:, 2].copy(),
+        "heartrates": columns[:, 3].copy(),
+        "cadences": columns[:, 4].copy(),
+        "powers": columns[:, 5].copy(),
+        "speeds": columns[:, 6].copy()
+    }
+    path["velocities"], _ = compute_velocities(
+        path["timestamps"], path["coords"])
+    path["segment_starts"] = np.zeros(1, dtype=int)
+    return path
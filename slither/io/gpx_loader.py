@@ -1,16 +1,29 @@
 """Read GPS exchange format file (GPX)."""
-import time
+import io
+from datetime import datetime
 
 import numpy as np
-from bs4 import BeautifulSoup
+from lxml import etree
 
-from slither.io.utils import datetime_from_iso8601, to_utf8
+from slither.io.utils import (
+    datetime_from_iso8601, to_utf8, xml_namespace, release_element,
+    TrackpointBuffer)
 from slither.core.geodetic import compute_velocities
 
 
+HEARTRATE_TAGS = ("hr", "heartrate")
+"""Names of extension tags that contain the heart rate of a trackpoint, e.g.
+Garmin's TrackPointExtension (gpxtpx:hr)."""
+
+
 def read_gpx(content):
     """Read GPS exchange format file (GPX).
 
+    The file is parsed incrementally with lxml's iterparse. All tracks and
+    track segments are read. Trackpoints are appended to growable arrays and
+    the corresponding XML elements are released immediately, so that the
+    memory consumption does not depend on the size of the XML tree.
+
     Parameters
     ----------
     content : str
@@ -24,14 +37,52 @@ def read_gpx(content):
     path : dict
         Trackpoint data
     """
-    training = BeautifulSoup(to_utf8(content), "xml")
+    content = to_utf8(content)
+    # only opening tags of trackpoints have attributes
+    buffer = TrackpointBuffer(content.count(b"trkpt "))
+    segments = []
+    start_time = None
+    n_tracks = 0
+
+    context = etree.iterparse(
+        io.BytesIO(content), events=("start", "end"),
+        tag=("{*}metadata", "{*}trk", "{*}trkseg", "{*}trkpt"))
+    for event, element in context:
+        tag = etree.QName(element).localname
+        if event == "start":
+            if tag == "trkseg":
+                segment_start = buffer.n_trackpoints
+            elif tag == "trk":
+                n_tracks += 1
+            continue
+
+        if tag == "trkpt":
+            _parse_trackpoint(element, xml_namespace(element), buffer)
+            release_element(element)
+        elif tag == "trkseg":
+            segments.append((segment_start, buffer.n_trackpoints))
+        elif tag == "metadata":
+            start_time = element.findtext(xml_namespace(element) + "time")
+
+    if etree.QName(context.root).localname != "gpx":
+        raise Exception("No 'gpx' tag found")
+    if n_tracks == 0:
+        raise Exception("No 'trk' tag found")
+    if len(segments) == 0:
+        raise Exception("No 'trkseg' tag found")
 
-    metadata = _metadata(training)
+    metadata = _metadata(start_time)
 
-    if metadata["has_path"]:
-        path, metadata["distance"], metadata["time"] = _parse_training(
-            training)
+    if buffer.n_trackpoints > 0:
+        path, metadata["distance"], metadata["time"] = _make_path(
+            buffer, segments)
+        if metadata["start_time"] is None:
+            metadata["start_time"] = datetime.fromtimestamp(
+                path["timestamps"][0])
+        if np.isfinite(path["heartrates"]).any():
+            metadata["heartrate"] = np.nanmean(path["heartrates"])
     else:
+        metadata["has_path"] = False
         path = None
         metadata["distance"] = 0.0
         metadata["time"] = 0.0
@@ -39,12 +90,9 @@ def read_gpx(content):
     return metadata, path
 
 
-def _metadata(training):
-    gpx = training.find("gpx")
-    if gpx is None:
-        raise Exception("No 'gpx' tag found")
-    metadata = gpx.find("metadata")
-    start_time = datetime_from_iso8601(metadata.find("time").text)
+def _metadata(start_time):
+    if start_time is not None:
+        start_time = datetime_from_iso8601(start_time)
 
     metadata = {
         "sport": "Other",  # not available in GPX
@@ -54,49 +102,49 @@ def _metadata(training):
     return metadata
 
 
-def _parse_training(training):
-    track = training.find("trk")
-    if track is None:
-        raise Exception("No 'trk' tag found")
-    track_sequence = track.find("trkseg")
-    if track_sequence is None:
-        raise Exception("No 'trkseg' tag found")
-    return _parse_track_sequence(track_sequence)
-
-
-def _parse_track_sequence(track_sequence):
-    trackpoints = track_sequence.findAll("trkpt")
-    n_trackpoints = len(trackpoints)
-    result = {
-        "timestamps": np.empty(n_trackpoints),
-        "coords": np.empty((n_trackpoints, 2)),
-        "altitudes": np.empty(n_trackpoints),
-        "heartrates": np.zeros(n_trackpoints)
-    }
-
-    for t, trackpoint in enumerate(trackpoints):
-        result["timestamps"][t] = _parse_timestamp(trackpoint)
-        result["coords"][t] = _parse_position(trackpoint)
-        result["altitudes"][t] = _parse_altitude(trackpoint)
-        result["heartrates"][t] = float("nan")
-
-    result["velocities"], distance = compute_velocities(
-        result["timestamps"], result["coords"])
+def _make_path(buffer, segments):
+    result = buffer.path()
+    result["coords"] = np.deg2rad(result["coords"], out=result["coords"])
+
+    velocities = []
+    segment_starts = []
+    distance = 0.0
+    for start, end in segments:
+        if end == start:
+            continue
+        segment_velocities, segment_distance = compute_velocities(
+            result["timestamps"][start:end], result["coords"][start:end])
+        velocities.append(segment_velocities)
+        segment_starts.append(start)
+        distance += segment_distance
+    result["velocities"] = np.concatenate(velocities)
+    result["segment_starts"] = np.array(segment_starts, dtype=int)
+
     time = result["timestamps"][-1] - result["timestamps"][0]
     return result, distance, time
 
 
-def _parse_timestamp(trackpoint):
-    date = datetime_from_iso8601(trackpoint.find("time").text)
-    return time.mktime(date.timetuple())
+def _parse_trackpoint(trackpoint, ns, buffer):
+    # coordinates are stored in degrees and converted once for all points
+    buffer.append(
+        trackpoint.findtext(ns + "time"),
+        float(trackpoint.get("lat")), float(trackpoint.get("lon")),
+        _parse_altitude(trackpoint.findtext(ns + "ele")),
+        _parse_heartrate(trackpoint.find(ns + "extensions")))
 
 
-def _parse_position(trackpoint):
-    latitude = np.deg2rad(float(trackpoint["lat"]))
-    longitude = np.deg2rad(float(trackpoint["lon"]))
-    return latitude, longitude
+def _parse_altitude(text):
+    if text is None:
+        return float("nan")
+    return float(text)
 
 
-def _parse_altitude(trackpoint):
-    elevation = float(trackpoint.find("ele").text)
-    return elevation
+def _parse_heartrate(extensions):
+    if extensions is not None:
+        for element in extensions.iter():
+            if (isinstance(element.tag, str) and
+                    etree.QName(element).localname in HEARTRATE_TAGS):
+                if element.text is None or not element.text.strip():
+                    break
+                return float(element.text)
+    return float("nan")
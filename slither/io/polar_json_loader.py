@@ -1,11 +1,11 @@
 """Read Polar's JSON format."""
-import time
 from datetime import datetime
 
 import numpy as np
 import json
 
 from slither.core.geodetic import compute_velocities
+from slither.io.utils import timestamps_from_iso8601
 
 SPORTS_MAPPING = {
     "RUNNING": "running",
@@ -68,7 +68,7 @@ def read_polar_json(content):
             alts.append(entry["altitude"])
             lons.append(entry["longitude"])
             lats.append(entry["latitude"])
-            timestamps.append(_parse_timestamp(entry["dateTime"]))
+            timestamps.append(entry["dateTime"])
 
         hrs = [float("nan")] * len(alts)
         for idx, hr in enumerate(exercise["samples"]["heartRate"]):
@@ -97,14 +97,10 @@ def read_polar_json(content):
     return metadata, path
 
 
-def _parse_timestamp(t):
-    date = datetime_from_str(t)
-    return time.mktime(date.timetuple())
-
-
 def _make_path(timestamps, latitudes, longitudes, altitudes, heartrates):
     result = {
-        "timestamps": np.array(timestamps),
+        # Polar stores local time without timezone designator
+        "timestamps": timestamps_from_iso8601(timestamps, local_time=True),
         "coords": np.deg2rad(np.column_stack((latitudes, longitudes))),
         "altitudes": np.array(altitudes),
         "heartrates": np.array(heartrates)
@@ -112,6 +108,7 @@ def _make_path(timestamps, latitudes, longitudes, altitudes, heartrates):
 
     result["velocities"], _ = compute_velocities(
         result["timestamps"], result["coords"])
+    result["segment_starts"] = np.zeros(1, dtype=int)
     return result
 
 
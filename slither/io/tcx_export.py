@@ -1,7 +1,25 @@
 """Export training center XML file (TCX)."""
+from functools import lru_cache
 import numpy as np
 import jinja2
 from datetime import datetime
+from .utils import local_time_strings
+
+
+TRACKPOINT = """
+          <Trackpoint>
+            <Time>%s.000Z</Time>
+            <HeartRateBpm>
+              <Value>%r</Value>
+            </HeartRateBpm>%s
+            <Position>
+              <LatitudeDegrees>%r</LatitudeDegrees>
+              <LongitudeDegrees>%r</LongitudeDegrees>
+            </Position>
+          </Trackpoint>"""
+
+ALTITUDE = """
+            <AltitudeMeters>%r</AltitudeMeters>"""
 
 
 class TcxExport:
@@ -10,13 +28,51 @@ class TcxExport:
         pass
 
     def dumps(self, activity):
-        env = jinja2.Environment(
-            loader=jinja2.PackageLoader("slither", "resources"))
-        env.filters["rad2deg"] = rad2deg
-        env.filters["datetime_to_str"] = datetime_to_str
-        env.filters["timestamp_to_str"] = timestamp_to_str
-        template = env.get_template("export.tcx.template")
-        return template.render(activity=activity)
+        if activity.has_path:
+            trackpoints = trackpoints_to_str(activity.get_path())
+        else:
+            trackpoints = ""
+        return _template().render(activity=activity, trackpoints=trackpoints)
+
+
+@lru_cache(maxsize=None)
+def _template():
+    """The template is loaded only once."""
+    env = jinja2.Environment(
+        loader=jinja2.PackageLoader("slither", "resources"))
+    env.filters["rad2deg"] = rad2deg
+    env.filters["datetime_to_str"] = datetime_to_str
+    env.filters["timestamp_to_str"] = timestamp_to_str
+    return env.get_template("export.tcx.template")
+
+
+def trackpoints_to_str(path):
+    """Convert trackpoints to TCX.
+
+    Times and coordinates of all trackpoints are converted at once.
+
+    Parameters
+    ----------
+    path : dict
+        Path with entries 'timestamps', 'coords', 'altitudes', and
+        'heartrates'
+
+    Returns
+    -------
+    trackpoints : str
+        Trackpoint elements
+    """
+    times = local_time_strings(path["timestamps"]).tolist()
+    coords = np.rad2deg(path["coords"])
+    latitudes = coords[:, 0].tolist()
+    longitudes = coords[:, 1].tolist()
+    heartrates = np.asarray(path["heartrates"], dtype=float).tolist()
+    # altitudes of exactly 0 are not exported
+    altitudes = [ALTITUDE % a if a else ""
+                 for a in np.asarray(path["altitudes"], dtype=float).tolist()]
+    return "".join([
+        TRACKPOINT % trackpoint for trackpoint in zip(
+            times, heartrates, altitudes, latitudes, longitudes)])
 
 
 def rad2deg(angle):  # handles None correctly
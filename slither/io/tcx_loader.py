@@ -1,16 +1,23 @@
 """Read training center XML file (TCX)."""
-import time
+import io
 
 import numpy as np
-from bs4 import BeautifulSoup
+from lxml import etree
 
-from slither.io.utils import datetime_from_iso8601, to_utf8
+from slither.io.utils import (
+    datetime_from_iso8601, to_utf8, xml_namespace, release_element,
+    TrackpointBuffer)
 from slither.core.geodetic import compute_velocities
 
 
 def read_tcx(content):
     """Read training center XML file (TCX).
 
+    The file is parsed incrementally with lxml's iterparse. Trackpoints are
+    written to preallocated arrays in a single pass and the corresponding
+    XML elements are released immediately, so that the memory consumption
+    does not depend on the size of the XML tree.
+
     Parameters
     ----------
     content : str
@@ -24,38 +31,70 @@ def read_tcx(content):
     path : dict
         Trackpoint data
     """
-    training = BeautifulSoup(to_utf8(content), "xml")
+    content = to_utf8(content)
+    # each trackpoint has an opening and a closing tag
+    buffer = TrackpointBuffer(content.count(b"Trackpoint>") // 2)
+    segments = []
+    laps = []
+    n_activities = 0
+    sport = None
+
+    context = etree.iterparse(
+        io.BytesIO(content), events=("start", "end"),
+        tag=("{*}Activity", "{*}Lap", "{*}Track", "{*}Trackpoint"))
+    for event, element in context:
+        tag = etree.QName(element).localname
+        if event == "start":
+            if tag == "Track":
+                segment_start = buffer.n_trackpoints
+            elif tag == "Activity":
+                n_activities += 1
+                sport = element.get("Sport")
+            continue
+
+        if tag == "Trackpoint":
+            _parse_trackpoint(element, xml_namespace(element), buffer)
+            release_element(element)
+        elif tag == "Track":
+            if buffer.n_trackpoints > segment_start:
+                segments.append((segment_start, buffer.n_trackpoints))
+        elif tag == "Lap":
+            laps.append(_parse_lap(element, xml_namespace(element)))
+            release_element(element)
+
+    if etree.QName(context.root).localname != "TrainingCenterDatabase":
+        raise Exception("No 'TrainingCenterDatabase' tag found")
+    assert n_activities == 1
 
-    metadata = _metadata(training)
+    metadata = _metadata(sport, laps, buffer.n_trackpoints > 0)
 
     if metadata["has_path"]:
-        path = _parse_training(training)
+        path = _make_path(buffer, segments)
     else:
         path = None
 
     return metadata, path
 
 
-def _metadata(training):
-    training_center_database = training.find("TrainingCenterDatabase")
-    if training_center_database is None:
-        raise Exception("No 'TrainingCenterDatabase' tag found")
-    activities = training_center_database.find("Activities").findAll(
-        "Activity")
-    assert len(activities) == 1
-    activity = activities[0]
-
-    sport = activity["Sport"].lower()
-
-    calories, heartrates, start_time, times, total_dist = \
-        _parse_lap_metadata(activity)
+def _metadata(sport, laps, has_path):
+    start_time = None
+    total_dist = 0
+    times = np.empty(len(laps))
+    calories = 0
+    heartrates = np.empty(len(laps))
+    for i, (lap_start_time, dist, lap_time, lap_calories, hr) in enumerate(
+            laps):
+        if start_time is None:
+            start_time = lap_start_time
+        total_dist += dist
+        times[i] = lap_time
+        calories += lap_calories
+        heartrates[i] = hr
 
     average_heartrate = np.sum(times * heartrates) / np.sum(times)
 
-    has_path = activity.find("Trackpoint") is not None
-
     metadata = {
-        "sport": sport,
+        "sport": sport.lower(),
         "start_time": start_time,
         "distance": total_dist,
         "time": sum(times),
@@ -66,127 +105,68 @@ def _metadata(training):
     return metadata
 
 
-def _parse_lap_metadata(activity):
-    laps = activity.findAll("Lap")
-    n_laps = len(laps)
-    start_time = None
-    total_dist = 0
-    times = np.empty(n_laps)
-    calories = 0
-    heartrates = np.empty(n_laps)
-    for i, lap in enumerate(laps):
-        if start_time is None:
-            start_time = datetime_from_iso8601(lap["StartTime"])
-        total_dist += float(lap.find("DistanceMeters").text)
-        times[i] = float(lap.find("TotalTimeSeconds").text)
-        calories += float(lap.find("Calories").text)
-        hr = lap.find("AverageHeartRateBpm")
-        if hr is None:
-            heartrates[i] = 0
-        else:
-            heartrates[i] = float(hr.text)
-    return calories, heartrates, start_time, times, total_dist
-
-
-def _parse_training(training):
-    training_center_database = training.find("TrainingCenterDatabase")
-    if training_center_database is None:
-        raise Exception("No 'TrainingCenterDatabase' tag found")
-    return _parse_activity(training_center_database)
-
+def _parse_lap(lap, ns):
+    start_time = datetime_from_iso8601(lap.get("StartTime"))
+    distance = float(lap.findtext(ns + "DistanceMeters"))
+    lap_time = float(lap.findtext(ns + "TotalTimeSeconds"))
+    calories = float(lap.findtext(ns + "Calories"))
+    hr = lap.findtext(ns + "AverageHeartRateBpm/" + ns + "Value")
+    if hr is None:
+        heartrate = 0.0
+    else:
+        heartrate = float(hr)
+    return start_time, distance, lap_time, calories, heartrate
+
+
+def _make_path(buffer, segments):
+    result = buffer.path()
+    result["coords"] = np.deg2rad(result["coords"], out=result["coords"])
+    # velocities are computed per track, each track starts with velocity 0
+    result["velocities"] = np.concatenate([
+        compute_velocities(result["timestamps"][start:end],
+                           result["coords"][start:end])[0]
+        for start, end in segments])
+    result["segment_starts"] = np.array(
+        [start for start, _ in segments], dtype=int)
+    return result
 
-def _parse_activity(training_center_database):
-    activities = training_center_database.find("Activities").findAll(
-        "Activity")
-    assert len(activities) == 1
-    activity = activities[0]
 
-    lap_infos = _parse_laps(activity)
-    if len(lap_infos) > 0:
-        result = {k: np.concatenate([lap_info[k] for lap_info in lap_infos])
-                  for k in lap_infos[0].keys()}
-        return result
-    return {}
+def _parse_trackpoint(trackpoint, ns, buffer):
+    # coordinates are stored in degrees and converted once for all points
+    latitude, longitude = _parse_position(trackpoint, ns)
+    buffer.append(
+        trackpoint.findtext(ns + "Time"),
+        latitude, longitude,
+        _parse_altitude(trackpoint.findtext(ns + "AltitudeMeters")),
+        _parse_heartrate(
+            trackpoint.findtext(ns + "HeartRateBpm/" + ns + "Value")))
 
 
-def _parse_laps(activity):
-    laps = activity.findAll("Lap")
-    lap_infos = []
-    for lap in laps:
-        tracks = lap.findAll("Track")
-        if len(tracks) == 0:  # no GPS info
-            continue
-        for track in tracks:
-            lap_info = _parse_trackpoints(track)
-            lap_infos.append(lap_info)
-    return lap_infos
-
-
-def _parse_trackpoints(track):
-    trackpoints = track.findAll("Trackpoint")
-    n_trackpoints = len(trackpoints)
-    result = {
-        "timestamps": np.empty(n_trackpoints),
-        "coords": np.empty((n_trackpoints, 2)),
-        "altitudes": np.empty(n_trackpoints),
-        "heartrates": np.empty(n_trackpoints)
-    }
-
-    for t, trackpoint in enumerate(trackpoints):
-        result["timestamps"][t] = _parse_timestamp(trackpoint)
-        result["coords"][t] = _parse_position(trackpoint)
-        result["altitudes"][t] = _parse_altitude(trackpoint)
-        result["heartrates"][t] = _parse_heartrate(trackpoint)
-
-    result["velocities"], _ = compute_velocities(
-        result["timestamps"], result["coords"])
-    return result
+def _parse_heartrate(text):
+    if text is None or text == "None":
+        return float("nan")
+    return float(text)
 
 
-def _parse_heartrate(trackpoint):
-    heartrate_tag = trackpoint.find("HeartRateBpm")
-    if heartrate_tag is None:
-        heartrate = float("nan")
-    else:
-        text = heartrate_tag.find("Value").text
-        if text == "None":
-            heartrate = float("nan")
-        else:
-            heartrate = float(text)
-    return heartrate
-
-
-def _parse_altitude(trackpoint):
-    altitude_meters = trackpoint.find("AltitudeMeters")
-    if altitude_meters is None:
-        altitude = 0.0
-    else:
-        try:
-            altitude = float(altitude_meters.text)
-        except ValueError:
-            altitude = float("nan")
-    return altitude
+def _parse_altitude(text):
+    if text is None:
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
 
 
-def _parse_position(trackpoint):
-    position = trackpoint.find("Position")
+def _parse_position(trackpoint, ns):
+    position = trackpoint.find(ns + "Position")
     if position is None:
-        latitude = float("nan")
-        longitude = float("nan")
-    else:
-        latitude_degrees = position.find("LatitudeDegrees")
-        if latitude_degrees is None:
-            latitude = float("nan")
-        else:
-            latitude = np.deg2rad(float(latitude_degrees.text))
-        longitude_degrees = position.find("LongitudeDegrees")
-        if longitude_degrees is None:
-            longitude = float("nan")
-        else:
-            longitude = np.deg2rad(float(longitude_degrees.text))
+        return float("nan"), float("nan")
+    latitude = _parse_degrees(position.findtext(ns + "LatitudeDegrees"))
+    longitude = _parse_degrees(position.findtext(ns + "LongitudeDegrees"))
     return latitude, longitude
 
 
-def _parse_timestamp(trackpoint):
-    date = datetime_from_iso8601(trackpoint.find("Time").text)
-    return time.mktime(date.timetuple())
+def _parse_degrees(text):
+    if text is None:
+        return float("nan")
+    return float(text)
@@ -1,12 +1,22 @@
 """Utilities for input and output related code."""
+import hashlib
+import re
+import time
 from datetime import datetime
 
+import numpy as np
+
 
 def datetime_from_iso8601(date_str):
     """Convert ISO 8601 datetime string to datetime.
 
     See `ISO 8601 (Wikipedia) <https://en.wikipedia.org/wiki/ISO_8601>`_.
 
+    The same formats as in timestamps_from_iso8601 are accepted. Like
+    timestamps_from_iso8601 with local_time=True, the result is the date
+    and time of day as written in the string: fractions of a second and
+    timezone designators are ignored.
+
     Parameters
     ----------
     date_str : str
@@ -16,9 +26,219 @@ def datetime_from_iso8601(date_str):
     -------
     dt : datetime
         Datetime representation
+
+    Raises
+    ------
+    ValueError
+        Unknown date format.
+    """
+    _parse_iso8601_suffix(date_str[19:])
+    return datetime.strptime(date_str[:19], "%Y-%m-%dT%H:%M:%S")
+
+
+_ISO8601_SUFFIX = re.compile(
+    r"^(?P<fraction>\.\d+)?"
+    r"(?:(?P<utc>Z)|(?P<sign>[+-])(?P<hours>\d\d):?(?P<minutes>\d\d))?$")
+
+
+def timestamps_from_iso8601(date_strs, local_time=False):
+    """Convert ISO 8601 datetime strings to timestamps.
+
+    All strings are converted at once with NumPy's datetime64 parser. Only
+    the distinct suffixes after the seconds (fractions of a second and
+    timezone designators) are inspected in Python, typically only one per
+    file.
+
+    Parameters
+    ----------
+    date_strs : array-like, shape (n_steps,)
+        ISO 8601 strings with a precision of at least one second, optionally
+        followed by fractions of seconds and a timezone designator ('Z' or an
+        offset like '+01:00'), e.g. 2016-12-11T10:00:00.000Z
+
+    local_time : bool, optional (default: False)
+        Interpret the date and time of day as local time of this machine and
+        ignore timezone designators. This is what
+        time.mktime(datetime_from_iso8601(date_str).timetuple()) computes and
+        the convention of timestamps in slither's database, which are
+        converted back with datetime.fromtimestamp. Otherwise the result
+        are POSIX timestamps, i.e., strings are interpreted in UTC unless
+        they contain an offset.
+
+    Returns
+    -------
+    timestamps : array, shape (n_steps,)
+        Seconds since the epoch
+
+    Raises
+    ------
+    ValueError
+        Unknown date format.
+    """
+    date_strs = np.asarray(date_strs, dtype=np.str_)
+    n_steps = len(date_strs)
+    if n_steps == 0:
+        return np.empty(0)
+    width = date_strs.dtype.itemsize // np.dtype("U1").itemsize
+    if width < 19:
+        raise ValueError("Unknown date format: '%s'" % date_strs[0])
+
+    # date and time of day (YYYY-MM-DDThh:mm:ss) are the first 19 characters
+    seconds = date_strs.astype("U19").astype("datetime64[s]").astype(
+        np.int64).astype(float)
+
+    if width > 19:
+        chars = np.ascontiguousarray(date_strs).view("U1").reshape(
+            n_steps, width)
+        suffixes = np.ascontiguousarray(chars[:, 19:]).view(
+            "U%d" % (width - 19)).ravel()
+        unique_suffixes, inverse = np.unique(suffixes, return_inverse=True)
+        fractions, offsets = np.array(
+            [_parse_iso8601_suffix(suffix) for suffix in unique_suffixes]).T
+        seconds += fractions[inverse]
+        if not local_time:
+            seconds -= offsets[inverse]
+
+    if local_time:
+        return _local_time_to_timestamps(seconds)
+    return seconds
+
+
+def timestamps_from_datetimes(dates, local_time=False):
+    """Convert datetimes to timestamps.
+
+    Parameters
+    ----------
+    dates : array-like, shape (n_steps,)
+        Naive datetime objects or datetime64 values
+
+    local_time : bool, optional (default: False)
+        Interpret dates as local time of this machine like
+        time.mktime(date.timetuple()). Otherwise they are interpreted as UTC.
+
+    Returns
+    -------
+    timestamps : array, shape (n_steps,)
+        Seconds since the epoch
+    """
+    dates = np.asarray(dates, dtype="datetime64[us]")
+    seconds = dates.astype(np.int64) / 1e6
+    if local_time:
+        return _local_time_to_timestamps(seconds)
+    return seconds
+
+
+def _parse_iso8601_suffix(suffix):
+    """Fractions of a second and UTC offset in seconds."""
+    match = _ISO8601_SUFFIX.match(suffix)
+    if match is None:
+        raise ValueError("Unknown date format: '...%s'" % suffix)
+    fraction = match.group("fraction")
+    fraction = 0.0 if fraction is None else float(fraction)
+    offset = 0.0
+    if match.group("sign") is not None:
+        offset = (3600.0 * int(match.group("hours")) +
+                  60.0 * int(match.group("minutes")))
+        if match.group("sign") == "-":
+            offset = -offset
+    return fraction, offset
+
+
+def _local_time_to_timestamps(seconds):
+    """Interpret wall clock times as local time.
+
+    Parameters
+    ----------
+    seconds : array, shape (n_steps,)
+        Wall clock times, encoded as seconds since the epoch as if they were
+        given in UTC.
+
+    Returns
+    -------
+    timestamps : array, shape (n_steps,)
+        Timestamps, equivalent to time.mktime with tm_isdst=-1 (plus
+        fractions of seconds). The UTC offset of the local timezone is
+        determined once per minute of wall clock time, which takes into
+        account changes of the offset (e.g., daylight saving time) during an
+        activity.
+    """
+    minutes, inverse = np.unique(
+        np.floor(seconds / 60.0), return_inverse=True)
+    offsets = np.array([
+        60.0 * minute - time.mktime(time.gmtime(60.0 * minute)[:8] + (-1,))
+        for minute in minutes])
+    return seconds - offsets[inverse]
+
+
+def local_time_strings(timestamps):
+    """Format timestamps as local wall clock time.
+
+    Parameters
+    ----------
+    timestamps : array-like, shape (n_steps,)
+        Seconds since the epoch
+
+    Returns
+    -------
+    dates : array, shape (n_steps,)
+        Strings like '2016-12-11T10:00:00', equivalent to
+        datetime.fromtimestamp(timestamp).strftime('%Y-%m-%dT%H:%M:%S').
+        The UTC offset of the local timezone is determined once per minute.
+
+    Raises
+    ------
+    ValueError
+        Timestamps are not finite
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    if not np.all(np.isfinite(timestamps)):
+        raise ValueError("Timestamps must be finite")
+    seconds = np.floor(timestamps).astype(np.int64)
+    minutes, inverse = np.unique(seconds // 60, return_inverse=True)
+    offsets = np.array([time.localtime(60 * int(minute)).tm_gmtoff
+                        for minute in minutes], dtype=np.int64)
+    local_seconds = seconds + offsets[inverse]
+    return np.datetime_as_string(
+        local_seconds.astype("datetime64[s]"), unit="s")
+
+
+def content_hash(content):
+    """Hash of the normalized content of an activity file.
+
+    Line endings and surrounding whitespace are normalized, so that copies
+    of a file that have been transferred as text have the same hash.
+
+    Parameters
+    ----------
+    content : str or bytes
+        File content.
+
+    Returns
+    -------
+    content_hash : str
+        SHA-256 digest in hexadecimal representation.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    content = content.replace(b"\r\n", b"\n").strip()
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(filename):
+    """Hash of the normalized content of an activity file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Returns
+    -------
+    content_hash : str
+        SHA-256 digest in hexadecimal representation, see content_hash.
     """
-    date_str = date_str[:-5]  # remove milliseconds: '.000Z'
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+    with open(filename, "rb") as f:
+        return content_hash(f.read())
 
 
 def to_utf8(content):
@@ -38,3 +258,121 @@ def to_utf8(content):
         content = content.decode("windows-1252")
     finally:
         return content.encode("utf-8")
+
+
+def xml_namespace(element):
+    """Namespace prefix of an XML element.
+
+    Parameters
+    ----------
+    element : lxml.etree.Element
+        XML element
+
+    Returns
+    -------
+    namespace : str
+        Namespace in Clark notation, e.g. '{http://www.topografix.com/GPX/1/1}'
+        or an empty string if the element does not have a namespace.
+    """
+    tag = element.tag
+    if tag.startswith("{"):
+        return tag[:tag.index("}") + 1]
+    return ""
+
+
+def release_element(element):
+    """Free memory of an XML element and all of its previous siblings.
+
+    This should be called during lxml's iterparse as soon as an element has
+    been processed so that the parsed tree does not grow with the file.
+
+    Parameters
+    ----------
+    element : lxml.etree.Element
+        XML element
+    """
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+class TrackpointBuffer:
+    """Growable buffer for trackpoints that are read incrementally.
+
+    The arrays are preallocated and their capacity is doubled whenever
+    they are full, so that appending a trackpoint has amortized constant
+    cost. Times are collected as ISO 8601 strings and decoded all at once.
+
+    Parameters
+    ----------
+    capacity : int, optional (default: 1024)
+        Initial number of trackpoints that can be stored.
+    """
+    def __init__(self, capacity=1024):
+        capacity = max(capacity, 1)
+        self.n_trackpoints = 0
+        self.times = []
+        self.coords = np.empty((capacity, 2))
+        self.altitudes = np.empty(capacity)
+        self.heartrates = np.empty(capacity)
+
+    def append(self, time_str, latitude, longitude, altitude, heartrate):
+        """Append trackpoint.
+
+        Parameters
+        ----------
+        time_str : str
+            Time in ISO 8601 format.
+
+        latitude : float
+            Latitude.
+
+        longitude : float
+            Longitude.
+
+        altitude : float
+            Altitude.
+
+        heartrate : float
+            Heart rate.
+        """
+        t = self.n_trackpoints
+        if t == len(self.altitudes):
+            self._grow()
+        self.times.append(time_str)
+        self.coords[t, 0] = latitude
+        self.coords[t, 1] = longitude
+        self.altitudes[t] = altitude
+        self.heartrates[t] = heartrate
+        self.n_trackpoints += 1
+
+    def _grow(self):
+        """Double capacity of all arrays."""
+        capacity = 2 * len(self.altitudes)
+        self.coords = _resize(self.coords, capacity)
+        self.altitudes = _resize(self.altitudes, capacity)
+        self.heartrates = _resize(self.heartrates, capacity)
+
+    def path(self):
+        """Get trackpoint data without unused capacity.
+
+        Returns
+        -------
+        path : dict
+            Trackpoint data with entries 'timestamps', 'coords', 'altitudes',
+            and 'heartrates'. Timestamps follow slither's convention
+            (see timestamps_from_iso8601 with local_time=True).
+        """
+        n = self.n_trackpoints
+        return {
+            "timestamps": timestamps_from_iso8601(self.times, local_time=True),
+            "coords": self.coords[:n].copy(),
+            "altitudes": self.altitudes[:n].copy(),
+            "heartrates": self.heartrates[:n].copy()
+        }
+
+
+def _resize(array, capacity):
+    resized = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    resized[:len(array)] = array
+    return resized
@@ -6,6 +6,66 @@ from slither.io.polar_json_loader import read_polar_json
 from slither.io.tcx_loader import read_tcx
 
 
+def read_file(filename):
+    """Read activity file with the reader that corresponds to its ending.
+
+    Parameters
+    ----------
+    filename : str
+        Name of a TCX, GPX, FIT, or Polar JSON file.
+
+    Returns
+    -------
+    metadata : dict
+        Activity metadata
+
+    path : dict
+        Trackpoint data
+
+    Raises
+    ------
+    ValueError
+        Cannot handle file format.
+    """
+    ending = filename.split(".")[-1].lower()
+    if ending == "fit":
+        return read_fit(filename)
+    readers = {"gpx": read_gpx, "tcx": read_tcx, "xml": read_tcx,
+               "json": read_polar_json}
+    if ending not in readers:
+        raise ValueError("Cannot handle file format '%s'" % ending)
+    with open(filename, "r") as f:
+        return readers[ending](f.read())
+
+
+def make_activity(metadata, path):
+    """Create activity from the result of a reader.
+
+    Parameters
+    ----------
+    metadata : dict
+        Activity metadata
+
+    path : dict or None
+        Trackpoint data. Only the channels 'timestamps', 'coords',
+        'altitudes', 'heartrates', and 'velocities' will be stored. The
+        optional entry 'segment_starts' contains the indices of the first
+        trackpoint of each track segment.
+
+    Returns
+    -------
+    activity : Activity
+        New activity.
+    """
+    activity = Activity(**metadata)
+    if activity.has_path:
+        activity.set_path(
+            path["timestamps"], path["coords"], path["altitudes"],
+            path["heartrates"], path["velocities"],
+            path.get("segment_starts"))
+    return activity
+
+
 class Loader:
     """Loader factory.
 
@@ -22,8 +82,9 @@ class Loader:
 
         Parameters
         ----------
-        file_content : str, optional (default: None)
-            File content.
+        file_content : str or bytes, optional (default: None)
+            File content. FIT files are read from the file content if it is
+            given as bytes and from the file otherwise.
 
         Raises
         ------
@@ -36,6 +97,8 @@ class Loader:
         if ending.lower() in ["tcx", "xml"]:
             return TcxLoader(file_content)
         if ending.lower() == "fit":
+            if isinstance(file_content, bytes):
+                return FitLoader(file_content)
             return FitLoader(self.filename)
         raise ValueError("Cannot handle file format '%s'" % ending)
 
@@ -45,8 +108,9 @@ class FitLoader:
 
     Parameters
     ----------
-    filename : str
-        Name of the file that should be loaded.
+    filename : str, bytes, or file-like object
+        Name of the file that should be loaded, its content, or a binary
+        file object, e.g., from an archive.
     """
     def __init__(self, filename):
         self.filename = filename
@@ -60,10 +124,7 @@ class FitLoader:
             Loaded activity.
         """
         metadata, path = read_fit(self.filename)
-        activity = Activity(**metadata)
-        if activity.has_path:
-            activity.set_path(**path)
-        return activity
+        return make_activity(metadata, path)
 
 
 class GpxLoader:
@@ -86,10 +147,7 @@ class GpxLoader:
             Loaded activity.
         """
         metadata, path = read_gpx(self.content)
-        activity = Activity(**metadata)
-        if activity.has_path:
-            activity.set_path(**path)
-        return activity
+        return make_activity(metadata, path)
 
 
 class PolarJsonLoader:
@@ -118,10 +176,7 @@ class PolarJsonLoader:
             Loaded activity.
         """
         metadata, path = read_polar_json(self.content)
-        activity = Activity(**metadata)
-        if activity.has_path:
-            activity.set_path(**path)
-        return activity
+        return make_activity(metadata, path)
 
 
 class TcxLoader:
@@ -144,7 +199,4 @@ class TcxLoader:
             Loaded activity.
         """
         metadata, path = read_tcx(self.content)
-        activity = Activity(**metadata)
-        if activity.has_path:
-            activity.set_path(**path)
-        return activity
+        return make_activity(metadata, path)
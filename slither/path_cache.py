@@ -0,0 +1,262 @@
+"""Caches of decoded paths."""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy.orm import object_session
+from .core.config import config
+
+
+class PathCache:
+    """Persistent cache of decoded paths.
+
+    The path of each activity is stored in one .npy file with one row per
+    channel. Cached paths are memory-mapped, i.e., loading them does not
+    copy any data and they are read-only. Files that are still mapped cannot
+    be removed on Windows. Invalidated paths will be marked as stale in this
+    case and their files will be overwritten by the next call to store.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory in which the paths will be stored.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def load(self, activity):
+        """Load path of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+
+        Returns
+        -------
+        path : dict or None
+            Path of the activity or None if it is not cached.
+        """
+        filename = self._filename(activity)
+        if os.path.exists(self._stale_filename(filename)):
+            return None
+        try:
+            channels = np.load(filename, mmap_mode="r")
+        except (IOError, ValueError):
+            return None
+        return {
+            "timestamps": channels[0],
+            "coords": channels[1:3].T,
+            "altitudes": channels[3],
+            "heartrates": channels[4],
+            "velocities": channels[5]
+        }
+
+    def store(self, activity, path):
+        """Store path of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+
+        path : dict
+            Path. Contains the entries 'timestamps', 'coords', 'altitudes',
+            'heartrates', and 'velocities'.
+        """
+        channels = np.vstack((
+            path["timestamps"], np.asarray(path["coords"]).T,
+            path["altitudes"], path["heartrates"], path["velocities"]))
+        # readers must never see partially written files
+        fd, temp_filename = tempfile.mkstemp(
+            suffix=".npy", dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, channels.astype(float, copy=False))
+        filename = self._filename(activity)
+        try:
+            os.replace(temp_filename, filename)
+        except PermissionError:
+            # the old file is still mapped, it stays stale
+            os.remove(temp_filename)
+            return
+        stale_filename = self._stale_filename(filename)
+        if os.path.exists(stale_filename):
+            os.remove(stale_filename)
+
+    def invalidate(self, activity):
+        """Remove path of an activity from cache.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+        """
+        filename = self._filename(activity)
+        if not os.path.exists(filename):
+            return
+        try:
+            os.remove(filename)
+        except PermissionError:
+            # the file is still mapped by arrays that we do not own
+            open(self._stale_filename(filename), "w").close()
+
+    def _filename(self, activity):
+        # ids of deleted activities can be reused
+        name = os.path.splitext(activity.get_filename())[0]
+        return os.path.join(self.cache_dir, "%d_%s.npy" % (activity.id, name))
+
+    def _stale_filename(self, filename):
+        return os.path.splitext(filename)[0] + ".stale"
+
+
+class MemoryPathCache:
+    """Least recently used paths in memory.
+
+    The cache is limited by the number of bytes of the cached arrays. It can
+    be used from multiple threads.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum number of bytes of all cached paths.
+
+    Attributes
+    ----------
+    n_bytes : int
+        Number of bytes of all cached paths.
+
+    hits : int
+        Number of requested paths that were cached.
+
+    misses : int
+        Number of requested paths that were not cached.
+
+    evictions : int
+        Number of paths that have been removed to stay within the budget.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def get(self, key):
+        """Get path.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the path, see activity_key.
+
+        Returns
+        -------
+        path : dict or None
+            Path or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._paths.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._paths.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, path):
+        """Add path.
+
+        Least recently used paths will be removed if the budget is exceeded.
+        Paths that are larger than the budget will not be cached.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the path, see activity_key.
+
+        path : dict
+            Path.
+        """
+        n_bytes = sum(np.asarray(channel).nbytes for channel in path.values())
+        with self._lock:
+            self._remove(key)
+            if n_bytes > self.max_bytes:
+                return
+            self._paths[key] = path, n_bytes
+            self.n_bytes += n_bytes
+            self._evict(self.max_bytes)
+
+    def invalidate(self, key):
+        """Remove path.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the path, see activity_key.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def resize(self, max_bytes):
+        """Change budget.
+
+        Parameters
+        ----------
+        max_bytes : int
+            Maximum number of bytes of all cached paths.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict(max_bytes)
+
+    def clear(self):
+        """Remove all paths and reset counters."""
+        with self._lock:
+            self._paths.clear()
+            self.n_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _remove(self, key):
+        entry = self._paths.pop(key, None)
+        if entry is not None:
+            self.n_bytes -= entry[1]
+
+    def _evict(self, max_bytes):
+        while self.n_bytes > max_bytes:
+            _, (_, n_bytes) = self._paths.popitem(last=False)
+            self.n_bytes -= n_bytes
+            self.evictions += 1
+
+
+memory_cache = MemoryPathCache(config["path_cache"]["max_bytes"])
+"""Paths of all activities that are stored in a database."""
+
+
+def activity_key(activity):
+    """Key of an activity's path in the memory cache.
+
+    Parameters
+    ----------
+    activity : Activity
+        Activity.
+
+    Returns
+    -------
+    key : tuple or None
+        URL of the database and id of the activity. None if the activity is
+        not stored in a database.
+    """
+    session = object_session(activity)
+    if session is None or activity.id is None:
+        return None
+    return str(session.get_bind().url), activity.id
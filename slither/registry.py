@@ -1,34 +1,90 @@
 """Local registry of activity files."""
 import os
+import atexit
+import gzip
 import json
+import queue
+import sqlite3
+import threading
 import time
+from collections import Counter
+from .core.config import config
 from .io.utils import to_utf8
 
 
+SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+"""Suffixes of activity files for each compression format."""
+
+
 class Registry:
     """Local registry of activity files.
 
+    The timestamps of all activity files are stored in an SQLite database,
+    so that each update only writes the changed entries.
+
+    Activity files can be stored compressed. Their names in the registry do
+    not depend on the compression, the suffix of the compression format is
+    only added to the name of the file on disk. Files that are stored in a
+    different format, e.g., uncompressed files of a previous version, will
+    be converted when they are read.
+
     Parameters
     ----------
     temp_dir : str
         Directory to store the activity files
+
+    compression : str, optional (default: None)
+        Compression of activity files: 'gzip', 'zstd' (requires the package
+        zstandard), or 'none'. By default, config['registry']['compression']
+        will be used.
     """
-    def __init__(self, temp_dir):
+    def __init__(self, temp_dir, compression=None):
+        if compression is None:
+            compression = config["registry"]["compression"]
+        if compression not in SUFFIXES:
+            raise ValueError("Unknown compression '%s'" % compression)
         self.temp_dir = temp_dir
-        self.registry_filename = os.path.join(temp_dir, "registry.json")
+        self.compression = compression
+        self.registry_filename = os.path.join(temp_dir, "registry.sqlite")
+        self.base_path = os.path.join(self.temp_dir, "data") + os.sep
 
         self._make_base_path()
-        if os.path.exists(self.registry_filename):
-            with open(self.registry_filename, "r") as f:
-                self.registry = json.load(f)
-        else:
-            self.registry = {}
+        # the registry of a service can be used from a worker thread
+        self.connection = sqlite3.connect(
+            self.registry_filename, check_same_thread=False)
+        self.lock = threading.RLock()
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS registry ("
+                "filename TEXT PRIMARY KEY, timestamp REAL NOT NULL)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_registry_timestamp "
+                "ON registry (timestamp)")
+        self._migrate_json(os.path.join(temp_dir, "registry.json"))
 
     def _make_base_path(self):
         """Create base path directory."""
-        base_path = self._base_path()
-        if not os.path.exists(base_path):
-            os.makedirs(base_path)
+        if not os.path.exists(self.base_path):
+            os.makedirs(self.base_path)
+
+    def _migrate_json(self, json_filename):
+        """Import registry from previous JSON format.
+
+        Parameters
+        ----------
+        json_filename : str
+            Name of the JSON file. It will be renamed after the import.
+        """
+        if not os.path.exists(json_filename):
+            return
+        with open(json_filename, "r") as f:
+            registry = json.load(f)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO registry VALUES (?, ?)",
+                [(self._name(filename), timestamp)
+                 for filename, timestamp in registry.items()])
+        os.replace(json_filename, json_filename + ".migrated")
 
     def update(self, content, filename, timestamp=None):
         """Add activity to registry.
@@ -44,18 +100,69 @@ class Registry:
         timestamp : float, optional (default: None)
             Timestamp at which the activity has been stored.
         """
-        filename = self._filename(filename)
+        self.update_many([(content, filename, timestamp)])
+
+    def update_many(self, entries):
+        """Add multiple activities to registry.
+
+        The registry will be updated in one transaction.
+
+        Parameters
+        ----------
+        entries : iterable
+            Tuples of content, filename, and timestamp (can be None) of
+            activity files, see update.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO registry VALUES (?, ?)",
+                [self._update_file(content, filename, timestamp)
+                 for content, filename, timestamp in entries])
+
+    def _update_file(self, content, filename, timestamp):
+        """Write or delete activity file.
+
+        Returns
+        -------
+        row : tuple
+            Name of activity file and timestamp.
+        """
+        name = self._name(filename)
+        filename = os.path.join(self.base_path, name)
         if timestamp is None:
             timestamp = time.time()
 
-        if content is None:
-            if os.path.exists(filename):
-                os.remove(filename)
-        else:
-            with open(filename, "wb") as f:
-                f.write(to_utf8(content))
-        self.registry[filename] = timestamp
-        self._write()
+        if content is not None:
+            self._write(filename, to_utf8(content))
+        for compression in SUFFIXES:
+            if content is None or compression != self.compression:
+                self._remove(filename + SUFFIXES[compression])
+        return name, timestamp
+
+    def _write(self, filename, data):
+        with open(filename + SUFFIXES[self.compression], "wb") as f:
+            f.write(_compress(data, self.compression))
+
+    def _remove(self, filename):
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    def _name(self, filename):
+        """Name of an activity file in the registry.
+
+        Parameters
+        ----------
+        filename : str
+            Name of activity file with or without path.
+
+        Returns
+        -------
+        name : str
+            Name of activity file relative to the base path.
+        """
+        if filename.startswith(self.base_path):
+            return filename[len(self.base_path):]
+        return filename
 
     def _filename(self, filename):
         """Full filename.
@@ -70,16 +177,7 @@ class Registry:
         filename : str
             Full path of activity file.
         """
-        base_path = self._base_path()
-        while base_path in filename:
-            filename = filename.replace(base_path, "")
-        filename = os.path.join(base_path, filename)
-        return filename
-
-    def _write(self):
-        """Write registry."""
-        with open(self.registry_filename, "w") as f:
-            json.dump(self.registry, f)
+        return os.path.join(self.base_path, self._name(filename))
 
     def delete(self, filename, timestamp=None):
         """Delete activity from registry.
@@ -102,9 +200,27 @@ class Registry:
         activities : dict
             List of activities. Maps filenames to timestamps.
         """
-        base_path = self._base_path()
-        return dict((k.replace(base_path, ""), v)
-                    for k, v in self.registry.items())
+        with self.lock:
+            return dict(self.connection.execute(
+                "SELECT filename, timestamp FROM registry"))
+
+    def list_modified_since(self, timestamp):
+        """List activities that have been modified after a point in time.
+
+        Parameters
+        ----------
+        timestamp : float
+            Point in time.
+
+        Returns
+        -------
+        activities : dict
+            Maps filenames to timestamps.
+        """
+        with self.lock:
+            return dict(self.connection.execute(
+                "SELECT filename, timestamp FROM registry "
+                "WHERE timestamp > ?", (timestamp,)))
 
     def timestamp(self, filename):
         """Get timestamp of an ativity file.
@@ -118,9 +234,19 @@ class Registry:
         -------
         timestamp : float
             Timestamp at which the activity has been stored.
+
+        Raises
+        ------
+        KeyError
+            Activity file is not in registry.
         """
-        filename = self._filename(filename)
-        return self.registry[filename]
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT timestamp FROM registry WHERE filename = ?",
+                (self._name(filename),)).fetchone()
+        if row is None:
+            raise KeyError(filename)
+        return row[0]
 
     def content(self, filename):
         """Get content of an activity file.
@@ -136,18 +262,246 @@ class Registry:
             Content of activity file.
         """
         filename = self._filename(filename)
-        if os.path.exists(filename):
-            with open(filename) as f:
-                return f.read()
-        else:
-            return None
+        with self.lock:
+            compression = self._stored_compression(filename)
+            if compression is None:
+                return None
+            stored_filename = filename + SUFFIXES[compression]
+            with open(stored_filename, "rb") as f:
+                data = _decompress(f.read(), compression)
+            if compression != self.compression:
+                self._write(filename, data)
+                os.remove(stored_filename)
+        return data.decode("utf-8")
+
+    def exists(self, filename):
+        """Check if an activity file exists.
+
+        Parameters
+        ----------
+        filename : str
+            Name of activity file.
+
+        Returns
+        -------
+        exists : bool
+            The activity file exists in any format.
+        """
+        return self._stored_compression(self._filename(filename)) is not None
+
+    def _stored_compression(self, filename):
+        """Compression of a stored activity file.
+
+        Parameters
+        ----------
+        filename : str
+            Full path of activity file without suffix of compression format.
+
+        Returns
+        -------
+        compression : str or None
+            Compression format of the stored file or None if the file does
+            not exist. The configured format is preferred.
+        """
+        compressions = [self.compression] + [
+            c for c in SUFFIXES if c != self.compression]
+        for compression in compressions:
+            if os.path.exists(filename + SUFFIXES[compression]):
+                return compression
+        return None
+
+    def close(self):
+        """Close registry database."""
+        self.connection.close()
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        # timestamp in header would make files differ for the same content
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    elif compression == "zstd":
+        return _zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data, compression):
+    if compression == "gzip":
+        return gzip.decompress(data)
+    elif compression == "zstd":
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return data
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Package 'zstandard' is required for zstd compression")
+    return zstandard
+
+
+class RegistryWriter:
+    """Write activity files to the registry in the background.
+
+    Updates and deletions are queued and applied by a worker thread in the
+    order in which they have been requested. All queued changes are written
+    to the registry in one transaction. Changes that are still queued when
+    the interpreter exits will be written before, see close.
+
+    Parameters
+    ----------
+    registry : Registry
+        Registry.
+
+    render : callable
+        Converts an item to the content of an activity file. Will be called
+        by the worker thread.
+
+    max_batch_size : int, optional (default: 100)
+        Maximum number of changes per transaction.
+
+    Attributes
+    ----------
+    errors : dict
+        Maps names of activity files that could not be written to the
+        corresponding exception.
+    """
+    def __init__(self, registry, render, max_batch_size=100):
+        self.registry = registry
+        self.render = render
+        self.max_batch_size = max_batch_size
+        self.errors = {}
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        # files that have not been written yet will be recovered on restart
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        # daemon threads would be stopped without writing queued changes
+        atexit.register(self.close)
+
+    def update(self, item, filename, timestamp=None):
+        """Queue update of an activity file.
+
+        Parameters
+        ----------
+        item : object
+            Will be converted to the content of the activity file. It must
+            not be modified afterwards.
+
+        filename : str
+            Name of activity file.
+
+        timestamp : float, optional (default: None)
+            Timestamp at which the activity has been stored. By default,
+            the current time will be used.
+        """
+        self._put(item, filename, timestamp)
+
+    def delete(self, filename, timestamp=None):
+        """Queue deletion of an activity file.
+
+        Parameters
+        ----------
+        filename : str
+            Name of activity file.
+
+        timestamp : float, optional (default: None)
+            Timestamp at which the activity has been deleted. By default,
+            the current time will be used.
+        """
+        self._put(None, filename, timestamp)
 
-    def _base_path(self):
-        """Base path.
+    def _put(self, item, filename, timestamp):
+        if timestamp is None:
+            timestamp = time.time()
+        name = self.registry._name(filename)
+        with self._lock:
+            self._pending[name] += 1
+        self._queue.put((item, filename, timestamp))
+
+    def is_pending(self, filename):
+        """Check if changes of an activity file have not been written yet.
+
+        Parameters
+        ----------
+        filename : str
+            Name of activity file.
 
         Returns
         -------
-        base_path : str
-            Path at which activity files will be stored.
+        pending : bool
+            The file will be updated or deleted.
         """
-        return os.path.join(self.temp_dir, "data") + os.sep
+        with self._lock:
+            return self._pending[self.registry._name(filename)] > 0
+
+    def flush(self):
+        """Wait until all queued changes have been written.
+
+        Raises
+        ------
+        IOError
+            Files could not be written since the last flush.
+        """
+        self._queue.join()
+        with self._lock:
+            errors = self.errors
+            self.errors = {}
+        if errors:
+            raise IOError("Files could not be written: %s"
+                          % ", ".join(sorted(errors)))
+
+    def close(self):
+        """Write all queued changes and stop worker thread.
+
+        Raises
+        ------
+        IOError
+            Files could not be written since the last flush.
+        """
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        running = True
+        while running:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.max_batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in jobs:
+                running = False
+            self._write([job for job in jobs if job is not None])
+            for _ in jobs:
+                self._queue.task_done()
+
+    def _write(self, jobs):
+        entries = []
+        for item, filename, timestamp in jobs:
+            try:
+                content = None if item is None else self.render(item)
+                entries.append((content, filename, timestamp))
+            except Exception as e:
+                self._failed(filename, e)
+        try:
+            self.registry.update_many(entries)
+        except Exception as e:
+            for _, filename, _ in entries:
+                self._failed(filename, e)
+        with self._lock:
+            for _, filename, _ in jobs:
+                name = self.registry._name(filename)
+                self._pending[name] -= 1
+                if self._pending[name] == 0:
+                    del self._pending[name]
+
+    def _failed(self, filename, error):
+        with self._lock:
+            self.errors[filename] = error
@@ -1,21 +1,42 @@
 """Slither service."""
 import os
+import json
+import hashlib
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
+from functools import partial
 import sqlalchemy
-from sqlalchemy import func
 from . import domain_model
+from . import dataframes
+from .core.analysis import fastest_parts, compute_metrics
 from .core.config import config
-from .loader import Loader
+from .core.geodetic import recompute_velocities
+from .loader import Loader, read_file, make_activity
 from .io.tcx_export import TcxExport
+from .io.utils import content_hash, file_hash
 from .database import Database
-from .registry import Registry
+from .registry import Registry, RegistryWriter
+from .path_cache import PathCache, memory_cache, activity_key
 from .summary import WeekSummary, MonthSummary, YearSummary
 from .synchronization import Synchronizer
 
 
+REPROCESS_SETTINGS = ("records", "max_velocity", "geodetic", "pause_detection")
+"""Configuration from which the derived data of activities depend."""
+
+
 class Service:
     """Service of the slither application.
 
+    Activities are stored in the database immediately. The corresponding
+    activity files are written to the registry by a background thread, see
+    flush and close. Activity files that are missing, e.g., because the
+    application has been terminated before they have been written, will be
+    written again when the service is started.
+
     Parameters
     ----------
     debug : bool, optional (default: False)
@@ -39,9 +60,19 @@ class Service:
 
     base_path : str, optional (default: None)
         Base path at which application data will be stored.
+
+    db_profile : str or dict, optional (default: None)
+        Performance profile of the database, e.g. 'performance'. See
+        slither.database.sqlite_pragmas.
+
+    parent : Service, optional (default: None)
+        Service that has been cloned. Clones share the registry and the
+        queue of activity files with their parent, so that they see files
+        that have not been written yet. They do not recover missing files.
     """
     def __init__(self, debug=False, db_filename="db.sqlite", datadir="data",
-                 remote=None, username=None, password=None, base_path=None):
+                 remote=None, username=None, password=None, base_path=None,
+                 db_profile=None, parent=None):
         self.debug = debug
         self.db_filename = db_filename
         self.datadir = datadir
@@ -49,10 +80,23 @@ class Service:
         self.username = username
         self.password = password
         self.base_path = base_path
+        self.db_profile = db_profile
 
         temp_dir = self._setup_directories(debug, datadir)
-        self.database = Database(os.path.join(temp_dir, db_filename))
-        self.registry = Registry(temp_dir)
+        self.database = Database(
+            os.path.join(temp_dir, db_filename), db_profile)
+        self.path_cache = PathCache(os.path.join(temp_dir, "cache"))
+        self.database.session.info["path_cache"] = self.path_cache
+        self.checkpoint_filename = os.path.join(temp_dir, "reprocess.json")
+        self.parent = parent
+        if parent is None:
+            self.registry = Registry(temp_dir)
+            self.registry_writer = RegistryWriter(
+                self.registry, TcxExport().dumps)
+            self._recover_missing_files()
+        else:
+            self.registry = parent.registry
+            self.registry_writer = parent.registry_writer
 
     def _setup_directories(self, debug, datadir):
         """Prepare files for application.
@@ -87,6 +131,59 @@ class Service:
             os.makedirs(os.path.join(temp_dir, "cache"))
         return temp_dir
 
+    def _recover_missing_files(self):
+        """Write activity files that have never been written.
+
+        Files that have been deleted from the registry, e.g., during
+        synchronization, will not be written again.
+        """
+        q = self.database.session.query(
+            domain_model.Activity.id, domain_model.Activity.sport,
+            domain_model.Activity.start_time)
+        for activity_id, sport, start_time in q.all():
+            filename = os.path.join(
+                self.full_datadir, domain_model.Activity(
+                    sport=sport, start_time=start_time).get_filename())
+            if self.registry.exists(filename):
+                continue
+            try:
+                self.registry.timestamp(filename)
+            except KeyError:
+                self._export_activity(self.database.session.query(
+                    domain_model.Activity).get(activity_id))
+
+    def flush(self):
+        """Wait until all activity files have been written.
+
+        Raises
+        ------
+        IOError
+            Activity files could not be written. The activities are stored
+            in the database and their files will be written again when the
+            service is started the next time.
+        """
+        self.registry_writer.flush()
+
+    def close(self):
+        """Write all activity files and release resources.
+
+        Clones only close their database session. Their activity files
+        will be written by the parent.
+
+        Raises
+        ------
+        IOError
+            Activity files could not be written, see flush.
+        """
+        if self.parent is not None:
+            self.database.session.close()
+            return
+        try:
+            self.registry_writer.close()
+        finally:
+            self.registry.close()
+            self.database.session.close()
+
     def clone(self):
         """Clone service.
 
@@ -97,7 +194,7 @@ class Service:
         """
         return Service(self.debug, self.db_filename, self.datadir,
                        self.remote, self.username, self.password,
-                       self.base_path)
+                       self.base_path, self.db_profile, parent=self)
 
     def list_activities(self):
         """List all activities.
@@ -162,7 +259,9 @@ class Service:
         metadata : dict
             New metadata.
         """
-        self.registry.delete(activity.get_filename())
+        self.registry_writer.delete(
+            os.path.join(self.full_datadir, activity.get_filename()))
+        self._invalidate_path(activity)
         self._delete_records_for(activity)
         self.database.session.flush()
 
@@ -183,12 +282,38 @@ class Service:
         self.database.session.flush()
 
         self._add_records_for(activity)
+        self._update_metrics_for(activity)
+        self._update_fingerprint_for(activity)
         self.database.session.commit()
 
-        tcx = TcxExport().dumps(activity)
+        self._export_activity(activity)
+
+    def _export_activity(self, activity, timestamp=None):
+        """Queue export of an activity to the registry.
+
+        Parameters
+        ----------
+        activity : Activity
+            An activity that has been stored in the database.
+
+        timestamp : float, optional (default: None)
+            Timestamp of last update.
+        """
+        # the worker thread must not access the session
+        snapshot = domain_model.Activity(
+            sport=activity.sport, start_time=activity.start_time,
+            distance=activity.distance, time=activity.time,
+            calories=activity.calories, heartrate=activity.heartrate,
+            filetype=activity.filetype, has_path=activity.has_path)
+        if activity.has_path:
+            snapshot.path = activity.get_path()
         target_filename = os.path.join(
             self.full_datadir, activity.get_filename())
-        self.registry.update(tcx, target_filename)
+        self.registry_writer.update(snapshot, target_filename, timestamp)
+
+    def _file_exists(self, filename):
+        return (self.registry.exists(filename) or
+                self.registry_writer.is_pending(filename))
 
     def _add_records_for(self, activity):
         """Add records from an activity.
@@ -199,17 +324,94 @@ class Service:
             An activity from which the records should be stored.
         """
         distances = config["records"].get(activity.sport, [])
-        for distance in distances:
-            record = activity.compute_records(distance)
-            self.database.session.add(record)
+        self._store_records(activity.compute_all_records(distances))
+
+    def _store_records(self, records):
+        """Add records and update the corresponding leaderboards.
+
+        Parameters
+        ----------
+        records : list
+            New records.
+        """
+        session = self.database.session
+        session.add_all(records)
+        session.flush()
+        for record in records:
+            domain_model.update_leaderboard(
+                session, record.sport, record.distance, added=[record])
+
+    def _update_metrics_for(self, activity):
+        """Compute derived metrics of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            An activity from which the metrics should be computed.
+        """
+        if activity.metrics is None:
+            activity.metrics = domain_model.ActivityMetrics()
+        activity.metrics.update(activity)
+
+    def _update_fingerprint_for(self, activity, activity_hash=None):
+        """Add or update the fingerprint of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            An activity that has been flushed to the database.
+
+        activity_hash : str, optional (default: None)
+            Hash of the file from which the activity has been imported.
+        """
+        q = self.database.session.query(domain_model.Fingerprint)
+        fingerprint = q.filter(
+            domain_model.Fingerprint.activity_id == activity.id).first()
+        if fingerprint is None:
+            fingerprint = domain_model.Fingerprint()
+            self.database.session.add(fingerprint)
+        fingerprint.update(activity)
+        if activity_hash is not None:
+            fingerprint.content_hash = activity_hash
+
+    def _check_fingerprint(self, activity=None, activity_hash=None):
+        """Check if an activity is in the deduplication index.
+
+        Parameters
+        ----------
+        activity : Activity, optional (default: None)
+            New activity. Its sport, start time, and duration will be
+            compared to existing activities.
+
+        activity_hash : str, optional (default: None)
+            Hash of the file from which the activity will be imported.
+
+        Raises
+        ------
+        ValueError
+            Activity exists already.
+        """
+        q = self.database.session.query(domain_model.Fingerprint.id)
+        if activity_hash is not None and q.filter(
+                domain_model.Fingerprint.content_hash == activity_hash
+        ).first() is not None:
+            raise ValueError("File with the same content exists already")
+        if activity is not None and q.filter(
+                domain_model.Fingerprint.sport == activity.sport,
+                domain_model.Fingerprint.start_time == activity.start_time,
+                domain_model.Fingerprint.duration ==
+                domain_model.fingerprint_duration(activity.time)
+        ).first() is not None:
+            raise ValueError("Activity exists already")
 
     def import_activity(self, file_content, filename=None, timestamp=None):
         """Import activity from a format that can be inferred automatically.
 
         Parameters
         ----------
-        file_content : str
-            Activity in a format like e.g. TCX
+        file_content : str or None
+            Activity in a format like e.g. TCX. If it is None, the activity
+            will be read from the file, e.g., for binary FIT files.
 
         filename : str, optional (default: None)
             Filename that can be used to infer the data format, e.g. "test.tcx"
@@ -217,15 +419,27 @@ class Service:
         timestamp : float, optional (default: None)
             Timestamp of last update (in case this activity has been
             transferred from a remote data repository)
+
+        Raises
+        ------
+        ValueError
+            Activity exists already.
         """
+        if file_content is None:
+            # e.g. binary FIT files will be read by the loader
+            activity_hash = file_hash(filename)
+        else:
+            activity_hash = content_hash(file_content)
+        self._check_fingerprint(activity_hash=activity_hash)
+
         loader = Loader(filename)
         loader = loader.get_loader(file_content)
 
         activity = loader.load()
 
-        self.add_new_activity(activity, timestamp)
+        self.add_new_activity(activity, timestamp, activity_hash)
 
-    def add_new_activity(self, activity, timestamp=None):
+    def add_new_activity(self, activity, timestamp=None, activity_hash=None):
         """Add new activity.
 
         Parameters
@@ -237,28 +451,446 @@ class Service:
             Timestamp of last update (in case this activity has been
             transferred from a remote data repository).
 
+        activity_hash : str, optional (default: None)
+            Hash of the file from which the activity has been imported, see
+            slither.io.utils.content_hash.
+
         Raises
         ------
         ValueError
             Activity exists already.
-
-        IOError
-            File cannot be stored in registry.
         """
         target_filename = os.path.join(
             self.full_datadir, activity.get_filename())
-        if os.path.exists(target_filename):
+        if self._file_exists(target_filename):
             raise ValueError("File '%s' exists already" % target_filename)
+        self._check_fingerprint(activity, activity_hash)
         self.database.session.add(activity)
         self.database.session.flush()
         self._add_records_for(activity)
+        self._update_metrics_for(activity)
+        self._update_fingerprint_for(activity, activity_hash)
         self.database.session.commit()
+        self._export_activity(activity, timestamp)
+
+    def import_many(self, filenames, workers=None, batch_size=100,
+                    reader=read_file, start_time_tolerance=None,
+                    callback=None):
+        """Import multiple activity files.
+
+        Files are parsed in parallel by a pool of processes. The parsed
+        activities are stored by this process in batches: each batch is
+        stored in one transaction. Activity files are written to the
+        registry in the background, see flush.
+        Files that cannot be imported do not abort the import. Files that
+        have been imported before are recognized by their content hash and
+        will not be parsed again.
+
+        Parameters
+        ----------
+        filenames : list
+            Names of activity files.
+
+        workers : int, optional (default: None)
+            Number of processes that parse files. By default, the number of
+            CPUs will be used. With 1 worker, files are parsed in this
+            process.
+
+        batch_size : int, optional (default: 100)
+            Number of activities that will be stored per transaction.
+
+        reader : callable, optional (default: slither.loader.read_file)
+            Function that takes a filename and returns metadata and path of
+            the activity. It has to be picklable, i.e., defined at module
+            level.
+
+        start_time_tolerance : float, optional (default: None)
+            Activities that start within this number of seconds of an
+            existing activity will not be imported.
+
+        callback : callable, optional (default: None)
+            Will be called after each file with the filename, the imported
+            activity (None on failure), and the error (None on success).
+
+        Returns
+        -------
+        errors : dict
+            Maps names of files that could not be imported to the
+            corresponding exception.
+        """
+        errors = {}
+        if callback is None:
+            callback = _ignore
+        hashes = {}
+        new_filenames = self._filter_known_files(
+            filenames, hashes, errors, callback)
+        batch = []
+        for filename, metadata, path, error in _read_activity_files(
+                new_filenames, reader, workers):
+            if error is None:
+                try:
+                    activity = make_activity(metadata, path)
+                    self._check_duplicate(
+                        activity, hashes[filename], batch,
+                        start_time_tolerance)
+                    batch.append((filename, activity, hashes[filename],
+                                  (metadata, path)))
+                except Exception as e:
+                    error = e
+            if error is not None:
+                errors[filename] = error
+                callback(filename, None, error)
+
+            if len(batch) >= batch_size:
+                self._store_batch(batch, errors, callback)
+                batch = []
+        if batch:
+            self._store_batch(batch, errors, callback)
+        return errors
+
+    def _filter_known_files(self, filenames, hashes, errors, callback):
+        """Skip files that are in the deduplication index.
+
+        Parameters
+        ----------
+        filenames : iterable
+            Names of activity files.
+
+        hashes : dict
+            Content hashes of new files will be added to this dictionary.
+
+        errors : dict
+            Errors will be added to this dictionary.
+
+        callback : callable
+            Will be called for each skipped file, see import_many.
+
+        Returns
+        -------
+        filenames : generator
+            Names of files that have not been imported before.
+        """
+        for filename in filenames:
+            try:
+                hashes[filename] = file_hash(filename)
+                self._check_fingerprint(activity_hash=hashes[filename])
+            except Exception as e:
+                errors[filename] = e
+                callback(filename, None, e)
+                continue
+            yield filename
+
+    def _check_duplicate(self, activity, activity_hash, batch,
+                         start_time_tolerance):
+        """Check if an activity has been imported already.
+
+        Parameters
+        ----------
+        activity : Activity
+            New activity.
+
+        activity_hash : str
+            Hash of the file from which the activity will be imported.
+
+        batch : list
+            Tuples of filename, activity, content hash, and the result of
+            the reader that will be stored.
+
+        start_time_tolerance : float or None
+            Maximum difference of start times of duplicates in seconds.
+
+        Raises
+        ------
+        ValueError
+            Activity exists already.
+        """
+        target_filename = os.path.join(
+            self.full_datadir, activity.get_filename())
+        if self._file_exists(target_filename) or any(
+                activity.get_filename() == other.get_filename()
+                for _, other, _, _ in batch):
+            raise ValueError("File '%s' exists already" % target_filename)
+        if any(activity_hash == other_hash for _, _, other_hash, _ in batch):
+            raise ValueError("File with the same content exists already")
+        self._check_fingerprint(activity, activity_hash)
+        if start_time_tolerance is None:
+            return
+        tolerance = timedelta(seconds=start_time_tolerance)
+        start = activity.start_time - tolerance
+        end = activity.start_time + tolerance
+        q = self.database.session.query(domain_model.Activity.id)
+        similar = q.filter(
+            domain_model.Activity.start_time.between(start, end)).first()
+        if similar is not None or any(
+                start <= other.start_time <= end for _, other, _, _ in batch):
+            raise ValueError("Activity with similar start time exists already")
+
+    def _store_batch(self, batch, errors, callback):
+        """Store a batch of new activities.
+
+        Parameters
+        ----------
+        batch : list
+            Tuples of filename, activity, content hash, and the result of
+            the reader (metadata and path).
+
+        errors : dict
+            Errors will be added to this dictionary.
+
+        callback : callable
+            Will be called for each file, see import_many.
+        """
+        session = self.database.session
         try:
-            tcx = TcxExport().dumps(activity)
-            self.registry.update(tcx, target_filename, timestamp)
-        except:
-            self.delete_activity(activity)
-            raise IOError("File '%s' could not be written" % target_filename)
+            session.add_all([activity for _, activity, _, _ in batch])
+            session.flush()
+            for _, activity, activity_hash, _ in batch:
+                self._add_records_for(activity)
+                self._update_metrics_for(activity)
+                self._update_fingerprint_for(activity, activity_hash)
+            session.commit()
+            stored = [(filename, activity)
+                      for filename, activity, _, _ in batch]
+        except Exception:
+            # find out which activities cannot be stored
+            keys = [activity_key(activity) for _, activity, _, _ in batch]
+            session.rollback()
+            for key in keys:
+                memory_cache.invalidate(key)
+            stored = []
+            for filename, _, activity_hash, (metadata, path) in batch:
+                try:
+                    # the flush has modified the activities, e.g., their
+                    # trackpoint rows have been inserted already
+                    activity = make_activity(metadata, path)
+                    session.add(activity)
+                    session.flush()
+                    self._add_records_for(activity)
+                    self._update_metrics_for(activity)
+                    self._update_fingerprint_for(activity, activity_hash)
+                    session.commit()
+                    stored.append((filename, activity))
+                except Exception as e:
+                    session.rollback()
+                    errors[filename] = e
+                    callback(filename, None, e)
+
+        for filename, activity in stored:
+            self._export_activity(activity)
+            callback(filename, activity, None)
+
+    def reprocess(self, activities=None, workers=None, batch_size=100,
+                  resume=True, callback=None):
+        """Recompute derived data of stored activities.
+
+        Velocities, records, and metrics depend on the configuration, see
+        REPROCESS_SETTINGS. They will be recomputed from the stored paths
+        by a pool of processes and stored by this process in batches: each
+        batch is stored in one transaction. Records that have been marked
+        as invalid stay invalid. Leaderboards will be rebuilt at the end,
+        e.g., after config['leaderboard']['size'] has been changed.
+        Velocities are computed per track segment. They will not be
+        recomputed if the segments of an activity are unknown, e.g., if it
+        has been imported by a previous version. Activity files do not
+        contain velocities and will not be written again.
+        Activities are processed in the order of their ids. The progress is
+        saved after each batch, so that an interrupted run can be resumed
+        with the same selection of activities and the same configuration.
+        Activities that could not be reprocessed will be processed again
+        when the run is resumed.
+
+        Parameters
+        ----------
+        activities : list, optional (default: None)
+            Activities that should be reprocessed. By default, all
+            activities will be reprocessed.
+
+        workers : int, optional (default: None)
+            Number of processes. By default, the number of CPUs will be
+            used. With 1 worker, activities are processed in this process.
+
+        batch_size : int, optional (default: 100)
+            Number of activities that will be stored per transaction.
+
+        resume : bool, optional (default: True)
+            Skip activities that have been reprocessed by an interrupted
+            run or by a run with errors.
+
+        callback : callable, optional (default: None)
+            Will be called after each activity with the activity and the
+            error (None on success).
+
+        Returns
+        -------
+        stats : dict
+            Number of reprocessed activities ('activities') and trackpoints
+            ('trackpoints'), number of activities that have been skipped
+            because they have been reprocessed before ('skipped'), duration
+            in seconds ('seconds'), and errors ('errors', maps activity ids
+            to the corresponding exception).
+        """
+        start_time = time.time()
+        if callback is None:
+            callback = _ignore
+        session = self.database.session
+        if activities is None:
+            ids = [activity_id for activity_id, in session.query(
+                domain_model.Activity.id)]
+        else:
+            ids = [activity.id for activity in activities]
+        ids = sorted(set(ids))
+        checkpoint = {
+            "settings": {key: config[key] for key in REPROCESS_SETTINGS},
+            "selection": hashlib.sha256(
+                json.dumps(ids).encode("utf-8")).hexdigest(),
+            "last_id": None,
+            "failed": []}
+        last_id, failed = (
+            self._load_checkpoint(checkpoint) if resume else (None, []))
+        n_skipped = 0
+        if last_id is not None:
+            checkpoint["last_id"] = last_id
+            failed = set(failed)
+            n_skipped = len(ids)
+            ids = [activity_id for activity_id in ids
+                   if activity_id > last_id or activity_id in failed]
+            n_skipped -= len(ids)
+
+        stats = {"activities": 0, "trackpoints": 0, "skipped": n_skipped,
+                 "seconds": 0.0, "errors": {}}
+        loaded = {}
+        n_pending = 0
+        for activity_id, velocities, parts, metrics, error in _map_ordered(
+                _reprocess_path,
+                self._reprocess_items(ids, batch_size, loaded), workers):
+            activity = loaded.pop(activity_id)
+            if error is None:
+                self._store_reprocessed(activity, velocities, parts, metrics)
+                stats["activities"] += 1
+                if velocities is not None:
+                    stats["trackpoints"] += len(velocities)
+            else:
+                stats["errors"][activity_id] = error
+                checkpoint["failed"].append(activity_id)
+
+            n_pending += 1
+            if n_pending >= batch_size:
+                session.commit()
+                # failed activities are retried when the run is resumed
+                checkpoint["last_id"] = max(
+                    activity_id, checkpoint["last_id"] or activity_id)
+                self._save_checkpoint(checkpoint)
+                n_pending = 0
+            callback(activity, error)
+        self.database.rebuild_leaderboards()
+        session.commit()
+        if checkpoint["failed"]:
+            if ids:
+                checkpoint["last_id"] = max(
+                    ids[-1], checkpoint["last_id"] or ids[-1])
+            self._save_checkpoint(checkpoint)
+        elif os.path.exists(self.checkpoint_filename):
+            os.remove(self.checkpoint_filename)
+
+        stats["seconds"] = time.time() - start_time
+        return stats
+
+    def _reprocess_items(self, ids, batch_size, loaded):
+        """Load paths of activities that will be reprocessed.
+
+        Parameters
+        ----------
+        ids : list
+            Sorted ids of activities.
+
+        batch_size : int
+            Number of activities that will be loaded per query.
+
+        loaded : dict
+            Loaded activities will be added to this dictionary.
+
+        Returns
+        -------
+        items : generator
+            Arguments of _reprocess_path.
+        """
+        q = self.database.session.query(domain_model.Activity)
+        for i in range(0, len(ids), batch_size):
+            chunk = q.filter(domain_model.Activity.id.in_(
+                ids[i:i + batch_size])).order_by(domain_model.Activity.id)
+            for activity in chunk.all():
+                loaded[activity.id] = activity
+                path = activity.get_path() if activity.has_path else None
+                yield (activity.id, activity.sport, path,
+                       activity.get_segment_starts(),
+                       config["records"].get(activity.sport, []))
+
+    def _store_reprocessed(self, activity, velocities, parts, metrics):
+        """Replace derived data of an activity.
+
+        Parameters
+        ----------
+        activity : Activity
+            Activity.
+
+        velocities, parts, metrics
+            Results of _reprocess_path.
+        """
+        if velocities is not None:
+            activity.set_velocities(velocities)
+
+        invalid_distances = set(
+            record.distance for record in self._get_records_for_activity(
+                activity) if not record.valid)
+        self._delete_records_for(activity)
+        distances = config["records"].get(activity.sport, [])
+        records = activity.compute_all_records(distances, parts)
+        for record in records:
+            if record.distance in invalid_distances:
+                record.valid = False
+        self._store_records(records)
+
+        if activity.metrics is None:
+            activity.metrics = domain_model.ActivityMetrics()
+        activity.metrics.update(activity, metrics)
+
+    def _load_checkpoint(self, checkpoint):
+        """Load progress of an interrupted run of reprocess.
+
+        Parameters
+        ----------
+        checkpoint : dict
+            Settings and selection of activities of the current run.
+
+        Returns
+        -------
+        last_id : int or None
+            All activities up to this id have been processed. None if
+            there is no checkpoint of a run with the same settings and
+            selection.
+
+        failed : list
+            Ids of processed activities that could not be reprocessed.
+        """
+        try:
+            with open(self.checkpoint_filename, "r") as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return None, []
+        # settings are compared as they have been stored in JSON
+        current = json.loads(json.dumps(checkpoint))
+        if (saved.get("settings") != current["settings"] or
+                saved.get("selection") != current["selection"]):
+            return None, []
+        return saved.get("last_id"), saved.get("failed", [])
+
+    def _save_checkpoint(self, checkpoint):
+        # an interrupted write must not corrupt the previous checkpoint
+        directory = os.path.dirname(self.checkpoint_filename)
+        fd, temp_filename = tempfile.mkstemp(suffix=".json", dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_filename, self.checkpoint_filename)
 
     def _get_record_distances(self, sport):
         q = self.database.session.query(domain_model.Record.distance)
@@ -275,14 +907,29 @@ class Service:
             An activity that should be deleted.
         """
         filename = os.path.join(self.full_datadir, activity.get_filename())
+        self._invalidate_path(activity)
         self._delete_records_for(activity)
+        self._delete_fingerprint_for(activity)
         self.database.session.delete(activity)
         self.database.session.commit()
-        self.registry.delete(filename)
+        self.registry_writer.delete(filename)
+
+    def _invalidate_path(self, activity):
+        memory_cache.invalidate(activity_key(activity))
+        self.path_cache.invalidate(activity)
 
     def _delete_records_for(self, activity):
-        for record in self._get_records_for_activity(activity):
-            self.database.session.delete(record)
+        session = self.database.session
+        records = self._get_records_for_activity(activity)
+        for record in records:
+            session.delete(record)
+        for record in records:
+            domain_model.update_leaderboard(
+                session, record.sport, record.distance, removed=[record])
+
+    def _delete_fingerprint_for(self, activity):
+        q = self.database.session.query(domain_model.Fingerprint)
+        q.filter(domain_model.Fingerprint.activity_id == activity.id).delete()
 
     def get_best_splits(self, activity):
         """Get best splits of an activity.
@@ -302,13 +949,60 @@ class Service:
         return records
 
     def list_records(self):
-        q = self.database.session.query(
-            domain_model.Record, func.min(domain_model.Record.time))
-        grouped = q.filter(domain_model.Record.valid).group_by(
-            domain_model.Record.sport, domain_model.Record.distance)
-        res = grouped.order_by(domain_model.Record.sport,
-                               domain_model.Record.distance).all()
-        return [record for record, _ in res]
+        """List best records.
+
+        Returns
+        -------
+        records : list
+            Fastest valid record of each sport and distance, sorted by
+            sport and distance. Sports and distances without a finite time
+            are not listed.
+        """
+        q = self.database.session.query(domain_model.Record).join(
+            domain_model.LeaderboardEntry,
+            domain_model.LeaderboardEntry.record_id == domain_model.Record.id)
+        return q.filter(domain_model.LeaderboardEntry.rank == 1).order_by(
+            domain_model.LeaderboardEntry.sport,
+            domain_model.LeaderboardEntry.distance).all()
+
+    def leaderboard(self, sport, distance, k=None):
+        """Fastest valid records of a sport and distance.
+
+        Parameters
+        ----------
+        sport : str
+            Sport.
+
+        distance : float
+            Distance, see config['records'].
+
+        k : int, optional (default: None)
+            Number of entries. By default, all entries will be returned,
+            see config['leaderboard']['size'].
+
+        Returns
+        -------
+        entries : list
+            Leaderboard entries sorted by rank. Each entry contains the
+            rank, the time, the record, and the activity.
+
+        Raises
+        ------
+        ValueError
+            More entries requested than stored.
+        """
+        size = config["leaderboard"]["size"]
+        if k is None:
+            k = size
+        if k > size:
+            raise ValueError(
+                "Leaderboards contain at most %d entries" % size)
+        q = self.database.session.query(domain_model.LeaderboardEntry)
+        return q.filter(
+            domain_model.LeaderboardEntry.sport == sport,
+            domain_model.LeaderboardEntry.distance == distance,
+            domain_model.LeaderboardEntry.rank <= k).order_by(
+            domain_model.LeaderboardEntry.rank).all()
 
     def summarize_weeks(self, sport=None):
         return WeekSummary(self.database).summarize(sport)
@@ -319,10 +1013,184 @@ class Service:
     def summarize_years(self, sport=None):
         return YearSummary(self.database).summarize(sport)
 
+    def activities_frame(self, columns=None, sport=None, start=None,
+                         end=None):
+        """Table of activities.
+
+        See slither.dataframes.activities_frame.
+        """
+        return dataframes.activities_frame(
+            self.database.session, columns, sport, start, end)
+
+    def trackpoints_frame(self, ids=None, columns=None, sport=None,
+                          start=None, end=None):
+        """Table of trackpoints.
+
+        See slither.dataframes.trackpoints_frame.
+        """
+        return dataframes.trackpoints_frame(
+            self.database.session, ids, columns, sport, start, end)
+
+    def export_parquet(self, path, activity_filter=None):
+        """Export activities and trackpoints to a Parquet dataset.
+
+        See slither.dataframes.export_parquet.
+        """
+        dataframes.export_parquet(self.database.session, path, activity_filter)
+
     def invalidate_record(self, record):
         record.valid = False
+        domain_model.update_leaderboard(
+            self.database.session, record.sport, record.distance,
+            removed=[record])
         self.database.session.commit()
 
     def sync_to_server(self):
         Synchronizer(self, self.remote, self.username, self.password
                      ).sync_to_server()
+
+
+def _read_activity_file(reader, filename):
+    """Read activity file and catch all errors.
+
+    Parameters
+    ----------
+    reader : callable
+        Function that takes a filename and returns metadata and path.
+
+    filename : str
+        Name of activity file.
+
+    Returns
+    -------
+    filename : str
+        Name of activity file.
+
+    metadata : dict or None
+        Activity metadata.
+
+    path : dict or None
+        Trackpoint data.
+
+    error : Exception or None
+        Error that occurred while reading the file.
+    """
+    try:
+        metadata, path = reader(filename)
+        return filename, metadata, path, None
+    except Exception as e:
+        return filename, None, None, e
+
+
+def _read_activity_files(filenames, reader, workers):
+    """Read activity files in parallel.
+
+    Parameters
+    ----------
+    filenames : list
+        Names of activity files.
+
+    reader : callable
+        Function that takes a filename and returns metadata and path.
+
+    workers : int or None
+        Number of processes. By default, the number of CPUs will be used.
+
+    Returns
+    -------
+    results : generator
+        Results of _read_activity_file in the order of filenames. Only a
+        limited number of files will be read ahead.
+    """
+    return _map_ordered(partial(_read_activity_file, reader), filenames,
+                        workers)
+
+
+def _reprocess_path(item):
+    """Recompute derived data of a path and catch all errors.
+
+    Parameters
+    ----------
+    item : tuple
+        Id, sport, path (or None), track segments (or None), and record
+        distances of an activity.
+
+    Returns
+    -------
+    activity_id : int
+        Id of the activity.
+
+    velocities : array or None
+        New velocities, None if the activity has no path or if its track
+        segments are unknown.
+
+    parts : array or None
+        Fastest times for the record distances on the path.
+
+    metrics : dict or None
+        Metrics of the path, None if it has less than two trackpoints.
+
+    error : Exception or None
+        Error that occurred while processing the path.
+    """
+    activity_id, sport, path, segment_starts, distances = item
+    if path is None:
+        return activity_id, None, None, None, None
+    try:
+        velocities = None
+        if segment_starts is not None:
+            velocities = recompute_velocities(
+                path["timestamps"], path["coords"], segment_starts)
+            path = dict(path, velocities=velocities)
+        parts = None
+        if distances:
+            parts = fastest_parts(
+                sport, path["timestamps"], path["velocities"], distances)
+        metrics = None
+        if len(path["timestamps"]) > 1:
+            metrics = compute_metrics(path, sport)
+        return activity_id, velocities, parts, metrics, None
+    except Exception as e:
+        return activity_id, None, None, None, e
+
+
+def _map_ordered(function, items, workers):
+    """Apply a function to items in parallel.
+
+    Parameters
+    ----------
+    function : callable
+        Function that takes one item. It has to be picklable.
+
+    items : iterable
+        Items. They will be consumed by this process.
+
+    workers : int or None
+        Number of processes. By default, the number of CPUs will be used.
+        With 1 worker, the function will be applied in this process.
+
+    Returns
+    -------
+    results : generator
+        Results in the order of items. Only a limited number of items will
+        be processed ahead.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for item in items:
+            yield function(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 4 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _ignore(*args):
+    pass
@@ -25,11 +25,24 @@ class Summary(object):
         raise NotImplementedError("Base class")
 
     def _summary_entry(self, end, sport, start):
-        activities = self.database.list_activities_between(start, end)
-        summary = self._summarize_activities(activities, sport)
-        summary["start"] = start
-        summary["end"] = end
-        return summary
+        Activity = domain_model.Activity
+        ActivityMetrics = domain_model.ActivityMetrics
+        q = self.database.session.query(
+            func.count(Activity.id), func.sum(Activity.distance),
+            func.sum(Activity.time), func.sum(ActivityMetrics.moving_time),
+            func.sum(ActivityMetrics.elevation_gain)).outerjoin(
+            ActivityMetrics, ActivityMetrics.activity_id == Activity.id)
+        q = q.filter(Activity.start_time >= start, Activity.start_time < end)
+        if sport is not None:
+            q = q.filter(Activity.sport == sport)
+        n_activities, distance, time, moving_time, elevation_gain = q.one()
+        return {"distance": distance or 0.0,
+                "time": time or 0.0,
+                "moving_time": moving_time or 0.0,
+                "elevation_gain": elevation_gain or 0.0,
+                "n_activities": n_activities,
+                "start": start,
+                "end": end}
 
     def _start_of_first_activity(self):
         q = self.database.session.query(
@@ -41,21 +54,6 @@ class Summary(object):
             domain_model.Activity, func.max(domain_model.Activity.start_time))
         return q.first()[1]
 
-    def _summarize_activities(self, activities, sport):
-        distance = 0.0
-        time = 0.0
-        n_activities = 0
-        for activity in activities:
-            if sport is None or activity.sport == sport:
-                if activity.distance is not None:
-                    distance += activity.distance
-                if activity.time is not None:
-                    time += activity.time
-                n_activities += 1
-        return {"distance": distance,
-                "time": time,
-                "n_activities": n_activities}
-
 
 class WeekSummary(Summary):
     """Summaries activities of a week."""
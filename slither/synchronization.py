@@ -2,7 +2,6 @@
 import os
 import json
 import requests
-from .io.utils import to_utf8
 
 
 class Synchronizer:
@@ -33,6 +32,7 @@ class Synchronizer:
         if self.remote is None:
             return
 
+        self.service.flush()
         activities = self._sync_files()
         response = requests.get(self.remote + "/api/sync",
                                 auth=(self.username, self.password),
@@ -65,13 +65,8 @@ class Synchronizer:
         data = []
         for filename in latest_on_client:
             full_filename = os.path.join(self.service.full_datadir, filename)
-            if os.path.exists(full_filename):
-                with open(full_filename, "r") as f:
-                    content = to_utf8(f.read())
-            else:
-                content = None
             data.append({
-                "content": content,
+                "content": self.service.registry.content(full_filename),
                 "filename": filename,
                 "timestamp": self.service.registry.timestamp(full_filename)})
         return data
@@ -1,10 +1,13 @@
+from collections import deque
 import numpy as np
 from slither.core.analysis import (
     check_coords, interpolate_nan, filtered_heartrates, appropriate_partition,
-    elevation_summary, get_paces, is_outlier)
+    elevation_summary, get_paces, is_outlier, compute_metrics, fastest_part,
+    fastest_parts, compute_splits, cumulative_distances, detect_pauses)
+from slither.core.config import config
 from slither.loader import FitLoader
-from numpy.testing import assert_array_equal
-from nose.tools import assert_equal, assert_almost_equal
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from nose.tools import assert_equal, assert_almost_equal, assert_true
 
 
 def test_check_coords():
@@ -80,7 +83,179 @@ def test_get_paces():
     assert_equal(paces[6][1], 391)
 
 
+def test_compute_splits():
+    fit_loader = FitLoader(filename="test_data/running.fit")
+    activity = fit_loader.load()
+    path = activity.get_path()
+    distances = cumulative_distances(path, activity.sport)
+    assert_equal(len(distances), len(path["timestamps"]))
+
+    splits = compute_splits(path, activity.sport, split_length=500)
+    assert_equal(len(splits), int(distances[-1] // 500))
+    # each split ends at the first trackpoint after its boundary
+    indices = splits["index"]
+    assert_true(np.all(distances[indices] >= splits["boundary"]))
+    assert_true(np.all(distances[indices - 1] < splits["boundary"]))
+    assert_almost_equal(np.sum(splits["split_distance"]),
+                        splits["distance"][-1])
+    assert_almost_equal(np.sum(splits["split_time"]), splits["time"][-1])
+    assert_almost_equal(np.sum(splits["split_moving_time"]),
+                        splits["moving_time"][-1])
+    assert_true(np.all(splits["split_moving_time"] <= splits["split_time"]))
+    assert_true(np.all(splits["moving_pace"] <= splits["pace"]))
+
+    laps = compute_splits(path, activity.sport, boundaries=[1000, 1e6])
+    assert_equal(len(laps), 1)
+    assert_equal(laps["index"][0], splits["index"][1])
+
+    splits = compute_splits(path, activity.sport, split_length=600, by="time")
+    assert_true(np.all(splits["time"] >= splits["boundary"]))
+    assert_true(np.all(np.diff(splits["index"]) > 0))
+
+
+def test_compute_splits_empty_path():
+    path = {"timestamps": np.array([]), "velocities": np.array([])}
+    assert_equal(len(compute_splits(path, "running")), 0)
+
+
 def test_get_paces_empty_path():
     path = {"timestamps": np.array([]), "velocities": np.array([])}
     paces = get_paces(path, "running")
     assert_equal(len(paces), 0)
+
+
+def test_compute_metrics():
+    path = {
+        "timestamps": np.arange(6.0),
+        "velocities": np.array([0.0, 2.0, 0.0, np.nan, 100.0, 3.0]),
+        "altitudes": np.array([10.0, 11.0, 0.0, 12.0, 12.0, 11.0]),
+        "heartrates": np.array([np.nan, 100.0, 110.0, 120.0, 130.0, 140.0])
+    }
+    config["plot"]["filter_width"] = 1
+    try:
+        metrics = compute_metrics(path, "running")
+    finally:
+        config["plot"]["filter_width"] = 31
+    assert_equal(metrics["elevation_gain"], 2.0)
+    assert_equal(metrics["elevation_loss"], 1.0)
+    # invalid velocities (NaN or > max. velocity) and standing still
+    assert_equal(metrics["moving_time"], 2.0)
+    assert_equal(metrics["max_velocity"], 3.0)
+    assert_equal(metrics["heartrate_min"], 100.0)
+    assert_equal(metrics["heartrate_median"], 120.0)
+    assert_equal(metrics["heartrate_max"], 140.0)
+
+
+def test_detect_pauses():
+    path = {
+        "timestamps": np.array([0.0, 1.0, 2.0, 3.0, 63.0, 64.0, 65.0]),
+        "velocities": np.array([0.0, 3.0, 0.2, 3.0, 3.0, np.nan, 3.0])
+    }
+    pauses, moving_time = detect_pauses(path, "running")
+    # slow, gap, and unknown velocity
+    assert_array_equal(
+        pauses, [False, False, True, False, True, True, False])
+    assert_equal(moving_time, 3.0)
+
+    path["velocities"] = np.full(7, np.nan)
+    pauses, moving_time = detect_pauses(path, "running")
+    assert_array_equal(
+        pauses, [False, False, False, False, True, False, False])
+    assert_equal(moving_time, 5.0)
+
+    pauses, moving_time = detect_pauses(
+        {"timestamps": np.array([0.0]), "velocities": np.array([0.0])})
+    assert_array_equal(pauses, [False])
+    assert_equal(moving_time, 0.0)
+
+
+def test_compute_metrics_without_data():
+    path = {
+        "timestamps": np.arange(3.0),
+        "velocities": np.full(3, np.nan),
+        "altitudes": np.full(3, np.nan),
+        "heartrates": np.full(3, np.nan)
+    }
+    metrics = compute_metrics(path, "running")
+    # without velocities, only gaps are pauses
+    assert_equal(metrics["moving_time"], 2.0)
+    assert_equal(metrics["elevation_gain"], None)
+    assert_equal(metrics["max_velocity"], None)
+    assert_equal(metrics["heartrate_median"], None)
+
+
+def _fastest_part_loop(sport, timestamps, velocities, distance):
+    """Previous implementation of fastest_part."""
+    queue_dist = 0.0
+    queue_time = 0.0
+    dqueue = deque()
+    tqueue = deque()
+
+    v = velocities[1:]
+    dt = np.diff(timestamps)
+    record = float("inf")
+
+    for t in range(len(v)):
+        if np.isnan(v[t]):
+            queue_dist = 0.0
+            queue_time = 0.0
+            dqueue.clear()
+            tqueue.clear()
+            continue
+        if v[t] > config["max_velocity"][sport]:
+            continue
+        dist = v[t] * dt[t]
+        dqueue.appendleft(dist)
+        tqueue.appendleft(dt[t])
+        queue_dist += dist
+        queue_time += dt[t]
+        while queue_dist > distance:
+            if queue_time < record:
+                record = queue_time
+            dist = dqueue.pop()
+            time = tqueue.pop()
+            queue_dist -= dist
+            queue_time -= time
+
+    return record
+
+
+def test_fastest_parts_equivalent_to_loop():
+    random_state = np.random.RandomState(0)
+    distances = config["records"]["running"]
+    for _ in range(20):
+        n_steps = random_state.randint(2, 3000)
+        timestamps = np.cumsum(random_state.uniform(0.5, 3.0, n_steps))
+        velocities = random_state.uniform(0.0, 8.0, n_steps)
+        # gaps and implausible velocities
+        velocities[random_state.rand(n_steps) < 0.01] = np.nan
+        velocities[random_state.rand(n_steps) < 0.02] = 30.0
+        expected = [_fastest_part_loop("running", timestamps, velocities, d)
+                    for d in distances]
+        records = fastest_parts("running", timestamps, velocities, distances)
+        assert_array_almost_equal(records, expected)
+
+
+def test_fastest_parts_real_data():
+    loader = FitLoader(open("test_data/running.fit", "rb").read())
+    path = loader.load().get_path()
+    distances = [100.0, 400.0, 1000.0, 5000.0, 1e6]
+    records = fastest_parts(
+        "running", path["timestamps"], path["velocities"], distances)
+    for distance, record in zip(distances, records):
+        assert_almost_equal(record, _fastest_part_loop(
+            "running", path["timestamps"], path["velocities"], distance))
+        assert_almost_equal(record, fastest_part(
+            "running", path["timestamps"], path["velocities"], distance))
+    assert_equal(records[-1], float("inf"))
+
+
+def test_fastest_part_gaps():
+    timestamps = np.arange(7, dtype=float)
+    velocities = np.array([0.0, 1.0, 1.0, np.nan, 1.0, 20.0, 1.0])
+    # parts do not contain gaps, too fast steps are ignored
+    assert_equal(fastest_part("running", timestamps, velocities, 1.5), 2.0)
+    assert_equal(fastest_part("running", timestamps, velocities, 2.5),
+                 float("inf"))
+    assert_equal(fastest_parts("running", timestamps, velocities, []).shape,
+                 (0,))
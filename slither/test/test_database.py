@@ -1,9 +1,14 @@
 import os
 import tempfile
 from datetime import datetime
+import numpy as np
+import sqlalchemy
 from slither.database import Database
-from slither.domain_model import Activity
-from nose.tools import assert_true, assert_false, assert_equal
+from slither.domain_model import (
+    Activity, ActivityMetrics, Fingerprint, LeaderboardEntry, PathSegments,
+    Trackpoint)
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from nose.tools import assert_true, assert_false, assert_equal, assert_raises
 
 
 def test_intialization():
@@ -31,3 +36,151 @@ def test_add_activity():
         datetime(year=2000, month=10, day=15),
         datetime(year=2000, month=10, day=25))
     assert_equal(len(activities), 0)
+
+
+def test_migrate_fingerprints():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    db.session.add(Activity(
+        start_time=datetime(year=2000, month=10, day=10),
+        sport="swimming", time=1800.4))
+    db.session.commit()
+    Fingerprint.__table__.drop(db.engine)
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    fingerprints = db.session.query(Fingerprint).all()
+    assert_equal(len(fingerprints), 1)
+    assert_equal(fingerprints[0].sport, "swimming")
+    assert_equal(fingerprints[0].duration, 1800)
+    assert_equal(fingerprints[0].content_hash, None)
+
+
+def test_convert_trackpoints():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    activity = Activity(
+        start_time=datetime(year=2000, month=10, day=10),
+        sport="running", has_path=True)
+    activity.trackpoints = [
+        Trackpoint(timestamp=float(t), latitude=0.1 * t, longitude=0.2 * t,
+                   altitude=None, heartrate=100.0 + t, velocity=3.0)
+        for t in range(5)]
+    db.session.add(activity)
+    db.session.commit()
+
+    assert_equal(db.convert_trackpoints(), 1)
+    assert_equal(db.session.query(Trackpoint).count(), 0)
+    assert_equal(db.convert_trackpoints(), 0)
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    activity = db.session.query(Activity).one()
+    path = activity.get_path()
+    assert_array_equal(path["timestamps"], np.arange(5.0))
+    assert_array_almost_equal(path["coords"][:, 1], 0.2 * np.arange(5))
+    assert_true(np.isnan(path["altitudes"]).all())
+    assert_array_equal(path["heartrates"], 100.0 + np.arange(5))
+
+
+def test_migrate_indexes():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_activities_start_time")
+        connection.exec_driver_sql("DROP INDEX ix_trackpoints_activity_id")
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    inspector = sqlalchemy.inspect(db.engine)
+    indexes = [index["name"] for index in inspector.get_indexes("activities")]
+    assert_true("ix_activities_start_time" in indexes)
+    assert_true("ix_activities_sport_start_time" in indexes)
+    indexes = [index["name"] for index in inspector.get_indexes("trackpoints")]
+    assert_equal(indexes, ["ix_trackpoints_activity_id"])
+
+
+def test_performance_profile():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename, profile="performance")
+    with db.engine.connect() as connection:
+        assert_equal(connection.exec_driver_sql(
+            "PRAGMA journal_mode").scalar(), "wal")
+        assert_equal(connection.exec_driver_sql(
+            "PRAGMA synchronous").scalar(), 1)
+        assert_equal(connection.exec_driver_sql(
+            "PRAGMA temp_store").scalar(), 2)
+    db = Database(db_filename=filename, profile={"synchronous": "FULL"})
+    with db.engine.connect() as connection:
+        assert_equal(connection.exec_driver_sql(
+            "PRAGMA synchronous").scalar(), 2)
+
+
+def test_invalid_profile():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    assert_raises(ValueError, Database, filename, "fastest")
+    assert_raises(ValueError, Database, filename,
+                  {"synchronous": "OFF; DROP TABLE activities"})
+
+
+def test_migrate_activity_metrics():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    db.session.add(Activity(
+        start_time=datetime(year=2000, month=10, day=10),
+        sport="running", distance=1000.0, time=300.0, has_path=False))
+    db.session.commit()
+    ActivityMetrics.__table__.drop(db.engine)
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    metrics = db.session.query(ActivityMetrics).one()
+    assert_equal(metrics.moving_time, 300.0)
+    assert_equal(metrics.average_pace, 300.0)
+
+
+def test_migrate_leaderboard():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    for time in [300.0, 250.0]:
+        activity = Activity(
+            start_time=datetime(year=2000, month=10, day=10),
+            sport="running", distance=1000.0, time=time, has_path=False)
+        db.session.add(activity)
+        db.session.flush()
+        db.session.add_all(activity.compute_all_records([1000.0]))
+    db.session.commit()
+    LeaderboardEntry.__table__.drop(db.engine)
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    entries = db.session.query(LeaderboardEntry).order_by(
+        LeaderboardEntry.rank).all()
+    assert_equal([(e.sport, e.distance, e.rank, e.time) for e in entries],
+                 [("running", 1000.0, 1, 250.0),
+                  ("running", 1000.0, 2, 300.0)])
+    assert_equal(entries[0].record.time, 250.0)
+
+
+def test_migrate_path_segments():
+    filename = tempfile.mktemp(prefix="db", suffix=".sqlite")
+    db = Database(db_filename=filename)
+    for day, filetype in [(10, "fit"), (11, "gpx")]:
+        activity = Activity(
+            start_time=datetime(year=2000, month=10, day=day),
+            sport="running", filetype=filetype, has_path=True)
+        activity.set_path(
+            np.arange(3.0), np.zeros((3, 2)), np.zeros(3), np.zeros(3),
+            np.zeros(3), segment_starts=[0])
+        db.session.add(activity)
+    db.session.commit()
+    db.session.execute(PathSegments.__table__.delete())
+    db.session.commit()
+    PathSegments.__table__.drop(db.engine)
+    db.session.close()
+
+    db = Database(db_filename=filename)
+    activities = db.session.query(Activity).order_by(Activity.id).all()
+    # only FIT files are known to consist of one segment
+    assert_array_equal(activities[0].get_segment_starts(), [0])
+    assert_true(activities[1].get_segment_starts() is None)
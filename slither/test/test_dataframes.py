@@ -0,0 +1,94 @@
+import os
+import tempfile
+from datetime import datetime
+import numpy as np
+from slither.core.config import config
+from slither.service import Service
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_raises
+import pytest
+
+pytest.importorskip("pandas")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _make_service():
+    service = Service(base_path=tempfile.mkdtemp())
+    config["trackpoint_storage"] = "columns"
+    try:
+        service.import_many(
+            ["test_data/running.tcx", "test_data/running.gpx"], workers=1)
+    finally:
+        config["trackpoint_storage"] = "rows"
+    service.import_many(["test_data/running.fit"], workers=1)
+    return service
+
+
+def test_activities_frame():
+    service = _make_service()
+    activities = service.activities_frame()
+    assert_equal(len(activities), 3)
+    assert_equal(activities["start_time"].dtype.kind, "M")
+    assert_equal(activities["start_time"].is_monotonic_increasing, True)
+
+    activities = service.activities_frame(
+        columns=["distance"], sport="running", start=datetime(2017, 1, 1))
+    assert_equal(list(activities.columns), ["id", "distance"])
+    assert_equal(len(activities), 1)
+    assert_raises(ValueError, service.activities_frame, columns=["path"])
+    service.close()
+
+
+def test_trackpoints_frame():
+    service = _make_service()
+    trackpoints = service.trackpoints_frame(columns=["latitude", "heartrate"])
+    assert_equal(list(trackpoints.columns),
+                 ["activity_id", "latitude", "heartrate"])
+    # paths are stored in columns and in rows
+    for activity in service.list_activities():
+        path = activity.get_path()
+        selected = trackpoints[trackpoints["activity_id"] == activity.id]
+        assert_array_equal(selected["latitude"], path["coords"][:, 0])
+        assert_array_equal(selected["heartrate"], path["heartrates"])
+
+    activity_ids = service.trackpoints_frame(
+        sport="running", columns=[])["activity_id"]
+    assert_equal(len(np.unique(activity_ids)), 2)
+    assert_equal(len(service.trackpoints_frame(ids=[1], sport="other")), 0)
+    service.close()
+
+
+def test_export_parquet():
+    service = _make_service()
+    path = tempfile.mkdtemp()
+    service.export_parquet(path)
+    assert_equal(sorted(os.listdir(os.path.join(path, "trackpoints"))),
+                 ["sport=Other", "sport=running"])
+    trackpoints = pq.read_table(os.path.join(path, "trackpoints"))
+    assert_equal(trackpoints.num_rows, len(service.trackpoints_frame()))
+    activities = pq.read_table(os.path.join(path, "activities")).to_pandas()
+    assert_equal(sorted(activities["id"]), [1, 2, 3])
+
+    service.export_parquet(path, {"sport": "running"})
+    activities = pq.read_table(os.path.join(
+        path, "activities", "sport=running")).to_pandas()
+    assert_equal(len(activities), 2)
+    service.close()
+
+
+def test_export_parquet_date_ranges():
+    service = _make_service()
+    path = tempfile.mkdtemp()
+    service.export_parquet(path, {"end": datetime(2021, 1, 1)})
+    service.export_parquet(path, {"start": datetime(2021, 1, 1)})
+    # the second export must not remove data of the first one
+    activities = pq.read_table(os.path.join(path, "activities")).to_pandas()
+    assert_equal(sorted(activities["id"]), [1, 2, 3])
+    trackpoints = pq.read_table(os.path.join(path, "trackpoints"))
+    assert_equal(trackpoints.num_rows, len(service.trackpoints_frame()))
+
+    # exports of the same range replace the previous files
+    service.export_parquet(path, {"start": datetime(2021, 1, 1)})
+    activities = pq.read_table(os.path.join(path, "activities")).to_pandas()
+    assert_equal(len(activities), 3)
+    service.close()
@@ -1,6 +1,11 @@
+import tempfile
+from datetime import datetime
 import numpy as np
+from slither.database import Database
 from slither.domain_model import Activity, Trackpoint
-from nose.tools import assert_equal
+from slither.core.config import config
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_true
 
 
 def test_create_activity():
@@ -17,3 +22,52 @@ def test_create_activity():
     )
     path = a.get_path()
     assert_equal(len(path["timestamps"]), n_steps)
+
+
+def test_path_columns():
+    a = Activity(sport="running", distance=100.0, time=10.0, has_path=True)
+    n_steps = 11
+    path = {
+        "timestamps": np.arange(n_steps) + 1.5e9,
+        "coords": np.vstack((np.linspace(0, 0.001, n_steps),
+                             np.linspace(0, 0.002, n_steps))).T,
+        "altitudes": np.linspace(100.0, 110.0, n_steps),
+        "heartrates": np.r_[np.nan, np.arange(100.0, 110.0)],
+        "velocities": np.linspace(0.0, 5.0, n_steps)
+    }
+    config["trackpoint_storage"] = "columns"
+    try:
+        a.set_path(**path)
+    finally:
+        config["trackpoint_storage"] = "rows"
+    assert_equal(a.path_data.n_trackpoints, n_steps)
+    assert_equal(len(a.trackpoints), 0)
+    decoded = a.path_data.get_path()
+    for key in path:
+        assert_array_equal(decoded[key], path[key])
+    assert_equal(a.get_path()["altitudes"][5], 105.0)
+
+
+def test_path_rows():
+    a = Activity(sport="running", start_time=datetime(2020, 1, 1),
+                 has_path=True)
+    a.set_path(timestamps=np.arange(3.0), coords=np.zeros((3, 2)),
+               altitudes=np.array([np.nan, 1.0, 2.0]),
+               heartrates=np.zeros(3), velocities=np.zeros(3))
+    assert_true(a.path_data is None)
+    assert_equal(len(a.get_path()["timestamps"]), 3)
+
+    db = Database(tempfile.mktemp(prefix="db", suffix=".sqlite"))
+    db.session.add(a)
+    db.session.commit()
+    a = db.session.query(Activity).one()
+    path = a.get_path()
+    assert_true("trackpoints" not in a.__dict__)
+    assert_array_equal(path["timestamps"], np.arange(3.0))
+    assert_array_equal(path["altitudes"], [np.nan, 1.0, 2.0])
+    assert_equal(path["coords"].shape, (3, 2))
+    trackpoints = a.trackpoints
+    assert_equal(len(trackpoints), 3)
+    assert_equal(trackpoints[0].activity_id, a.id)
+    assert_true(trackpoints[0].altitude is None)
+    assert_equal(trackpoints[2].altitude, 2.0)
@@ -1,5 +1,11 @@
+import io
 import datetime
-from slither.loader import FitLoader
+from collections import namedtuple
+import numpy as np
+from slither.loader import Loader, FitLoader
+from slither.io.fit_loader import (
+    read_fit, _read_messages, RECORD_FIELDS, N_COLUMNS)
+from numpy.testing import assert_array_equal
 from nose.tools import assert_equal, assert_true
 
 
@@ -16,3 +22,66 @@ def test_fit_loader():
     assert_equal(activity.calories, 710)
     assert_equal(activity.filetype, "fit")
     assert_true(activity.has_path)
+
+
+def test_read_fit_from_bytes_and_file_object():
+    metadata, path = read_fit("test_data/running.fit")
+    with open("test_data/running.fit", "rb") as f:
+        content = f.read()
+    metadata_from_bytes, path_from_bytes = read_fit(content)
+    metadata_from_file, path_from_file = read_fit(io.BytesIO(content))
+    assert_equal(metadata, metadata_from_bytes)
+    assert_equal(metadata, metadata_from_file)
+    for k in path.keys():
+        assert_array_equal(path[k], path_from_bytes[k])
+        assert_array_equal(path[k], path_from_file[k])
+
+
+def test_read_fit_columns():
+    _, path = read_fit("test_data/running.fit")
+    n_trackpoints = len(path["timestamps"])
+    for k in ["coords", "altitudes", "heartrates", "cadences", "powers",
+              "speeds", "velocities"]:
+        assert_equal(len(path[k]), n_trackpoints)
+    assert_true(np.isfinite(path["cadences"]).any())
+    assert_true(np.isfinite(path["speeds"]).any())
+
+
+def test_loader_from_bytes():
+    with open("test_data/running.fit", "rb") as f:
+        content = f.read()
+    activity = Loader("running.fit").get_loader(content).load()
+    assert_equal(activity.distance, 7864.22)
+    assert_true(activity.has_path)
+
+
+Field = namedtuple("Field", ["name", "value"])
+Message = namedtuple("Message", ["name", "fields"])
+
+
+class FakeFitFile:
+    def __init__(self, messages):
+        self.messages = messages
+
+    def get_messages(self, names):
+        return [message for message in self.messages if message.name in names]
+
+
+def test_skip_records_without_timestamp():
+    start = datetime.datetime(2021, 3, 13, 12)
+    fitfile = FakeFitFile([
+        Message("record", [Field("timestamp", start),
+                           Field("heart_rate", 120)]),
+        Message("record", [Field("heart_rate", 200)]),
+        Message("record", [Field("timestamp", None),
+                           Field("heart_rate", 200)]),
+        Message("record", [Field("timestamp", start + datetime.timedelta(
+            seconds=1)), Field("altitude", 10.0)]),
+        Message("sport", [])])
+    dates, columns, messages = _read_messages(fitfile)
+    assert_equal(dates, [start, start + datetime.timedelta(seconds=1)])
+    assert_equal(columns.shape, (2, N_COLUMNS))
+    heartrates = columns[:, RECORD_FIELDS["heart_rate"]]
+    assert_equal(heartrates[0], 120)
+    assert_true(np.isnan(heartrates[1]))
+    assert_equal(len(messages["sport"]), 1)
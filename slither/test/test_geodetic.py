@@ -1,8 +1,8 @@
 import numpy as np
 from slither.core.geodetic import (
-    haversine_dist, dist_on_earth, compute_velocities)
-from nose.tools import assert_less, assert_almost_equal
-from numpy.testing import assert_array_almost_equal
+    haversine_dist, dist_on_earth, compute_velocities, recompute_velocities)
+from nose.tools import assert_less, assert_almost_equal, assert_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
 
 
 def test_compare_haversine_pyproj():
@@ -22,3 +22,87 @@ def test_compute_velocities_equal_timestamps():
     velocities, total_distance = compute_velocities(timestamps, coords)
     assert_array_almost_equal(velocities, [0.0, 11.12876992, 11.12876992])
     assert_almost_equal(total_distance, 11.128769923727916)
+
+
+def _compute_velocities_loop(timestamps, coords):
+    """Previous implementation of compute_velocities."""
+    delta_t = np.diff(timestamps)
+    dists = dist_on_earth(
+        coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+    n_steps = len(timestamps)
+    velocities = np.empty(n_steps)
+    velocities[0] = 0.0
+    total_distance = 0.0
+
+    for t in range(1, n_steps):
+        dt = delta_t[t - 1]
+        if dt <= 0.0:
+            velocity = velocities[t - 1]
+        else:
+            velocity = dists[t - 1] / dt
+            total_distance += dists[t - 1]
+        velocities[t] = velocity
+    return velocities, total_distance
+
+
+def _random_path(random_state, n_steps):
+    timestamps = np.cumsum(random_state.choice(
+        [-1.0, 0.0, 0.5, 1.0, 2.0], size=n_steps,
+        p=[0.05, 0.1, 0.25, 0.5, 0.1]))
+    coords = np.deg2rad(np.column_stack((
+        53.0 + np.cumsum(random_state.randn(n_steps) * 1e-5),
+        8.8 + np.cumsum(random_state.randn(n_steps) * 1e-5))))
+    return timestamps, coords
+
+
+def test_compute_velocities_equivalent_to_loop():
+    random_state = np.random.RandomState(0)
+    for n_steps in [1, 2, 3, 10, 1000]:
+        timestamps, coords = _random_path(random_state, n_steps)
+        velocities, total_distance = compute_velocities(timestamps, coords)
+        expected_velocities, expected_distance = _compute_velocities_loop(
+            timestamps, coords)
+        assert_array_equal(velocities, expected_velocities)
+        assert_equal(total_distance, expected_distance)
+
+
+def test_compute_velocities_missing_values():
+    random_state = np.random.RandomState(1)
+    timestamps, coords = _random_path(random_state, 200)
+    timestamps[[0, 1, 50]] = [10.0, 5.0, np.nan]
+    coords[[3, 100, 101], 0] = np.nan
+    velocities, total_distance = compute_velocities(timestamps, coords)
+    expected_velocities, expected_distance = _compute_velocities_loop(
+        timestamps, coords)
+    assert_array_equal(velocities, expected_velocities)
+    assert_array_equal(total_distance, expected_distance)
+
+
+def test_compute_velocities_not_moving():
+    timestamps = np.array([3.0, 3.0, 2.0])
+    coords = np.deg2rad([[53.0, 8.8], [53.1, 8.8], [53.2, 8.8]])
+    velocities, total_distance = compute_velocities(timestamps, coords)
+    assert_array_equal(velocities, [0.0, 0.0, 0.0])
+    assert_equal(total_distance, 0.0)
+
+
+def test_recompute_velocities_per_segment():
+    timestamps = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 4.0, 5.0])
+    latitudes = np.linspace(50.0, 50.01, 7)
+    # standing still in the first segment
+    latitudes[2] = latitudes[1]
+    coords = np.deg2rad(np.column_stack((latitudes, np.full(7, 8.0))))
+    velocities = np.concatenate((
+        compute_velocities(timestamps[:3], coords[:3])[0],
+        compute_velocities(timestamps[3:], coords[3:])[0]))
+    assert_equal(velocities[2], 0.0)
+    assert_equal(velocities[3], 0.0)
+    # the previous velocity is kept if the time does not advance
+    assert_equal(velocities[5], velocities[4])
+    assert_array_equal(
+        recompute_velocities(timestamps, coords, [0, 3]), velocities)
+    assert_array_equal(
+        recompute_velocities(timestamps, coords, [0]),
+        compute_velocities(timestamps, coords)[0])
+    assert_equal(len(recompute_velocities([], np.empty((0, 2)), [0])), 0)
@@ -1,6 +1,10 @@
 import os
+from datetime import datetime
+import numpy as np
 from slither.loader import GpxLoader
-from nose.tools import assert_equal, assert_in
+from slither.io.gpx_loader import read_gpx
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_in, assert_true, assert_false
 
 
 def test_load_tracked_activity():
@@ -17,3 +21,86 @@ def test_load_tracked_activity():
     assert_in("heartrates", paths)
     assert_in("velocities", paths)
     assert_equal(len(paths["timestamps"]), 3032)
+
+
+GPX_TWO_SEGMENTS = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1"
+     version="1.1">
+  <trk>
+    <trkseg>
+      <trkpt lat="53.0" lon="8.0">
+        <ele>10.0</ele>
+        <time>2021-03-13T12:00:00.000Z</time>
+        <extensions>
+          <gpxtpx:TrackPointExtension>
+            <gpxtpx:hr>120</gpxtpx:hr>
+          </gpxtpx:TrackPointExtension>
+        </extensions>
+      </trkpt>
+      <trkpt lat="53.0001" lon="8.0">
+        <ele>11.0</ele>
+        <time>2021-03-13T12:00:02.000Z</time>
+      </trkpt>
+    </trkseg>
+  </trk>
+  <trk>
+    <trkseg>
+      <trkpt lat="53.0002" lon="8.0">
+        <time>2021-03-13T12:01:00.000Z</time>
+        <extensions>
+          <gpxtpx:TrackPointExtension>
+            <gpxtpx:hr>140</gpxtpx:hr>
+          </gpxtpx:TrackPointExtension>
+        </extensions>
+      </trkpt>
+      <trkpt lat="53.0003" lon="8.0">
+        <time>2021-03-13T12:01:02.000Z</time>
+      </trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+
+def test_load_multiple_segments():
+    metadata, path = read_gpx(GPX_TWO_SEGMENTS)
+    assert_equal(len(path["timestamps"]), 4)
+    assert_array_equal(path["segment_starts"], [0, 2])
+    assert_equal(metadata["time"], 62.0)
+    assert_true(metadata["has_path"])
+    assert_equal(metadata["start_time"].minute, 0)
+    assert_equal(metadata["heartrate"], 130.0)
+    assert_array_equal(path["heartrates"][[0, 2]], [120.0, 140.0])
+    assert_true(np.isnan(path["heartrates"][[1, 3]]).all())
+    assert_true(np.isnan(path["altitudes"][2:]).all())
+    # pause between the segments does not count as movement
+    assert_equal(path["velocities"][2], 0.0)
+    assert_true(20.0 < metadata["distance"] < 25.0)
+
+
+def test_load_without_trackpoints():
+    metadata, path = read_gpx(
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1"><metadata>'
+        '<time>2021-03-13T12:00:00.000Z</time></metadata>'
+        '<trk><trkseg></trkseg></trk></gpx>')
+    assert_false(metadata["has_path"])
+    assert_equal(path, None)
+
+
+def test_load_timestamps_without_milliseconds():
+    gpx = GPX_TWO_SEGMENTS.replace(".000Z", "Z").replace(
+        "<trk>", "<metadata><time>2021-03-13T12:00:00Z</time></metadata>"
+        "<trk>", 1)
+    metadata, path = read_gpx(gpx)
+    assert_equal(metadata["start_time"], datetime(2021, 3, 13, 12))
+    assert_equal(metadata["time"], 62.0)
+
+
+def test_load_empty_heartrate():
+    gpx = GPX_TWO_SEGMENTS.replace(
+        "<gpxtpx:hr>120</gpxtpx:hr>", "<gpxtpx:hr/>").replace(
+        "<gpxtpx:hr>140</gpxtpx:hr>", "<gpxtpx:hr> </gpxtpx:hr>")
+    metadata, path = read_gpx(gpx)
+    assert_equal(len(path["timestamps"]), 4)
+    assert_true(np.isnan(path["heartrates"]).all())
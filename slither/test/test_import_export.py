@@ -1,6 +1,10 @@
+from datetime import datetime
+import numpy as np
 from slither.loader import TcxLoader
+from slither.domain_model import Activity
 from slither.io.tcx_export import TcxExport
-from nose.tools import assert_equal, assert_almost_equal
+from numpy.testing import assert_array_almost_equal
+from nose.tools import assert_equal, assert_in, assert_not_in
 
 
 def test_import_export():
@@ -14,10 +18,29 @@ def test_import_export():
     assert_equal(a1.calories, a2.calories)
     assert_equal(a1.heartrate, a2.heartrate)
     assert_equal(a1.distance, a2.distance)
-    for t1, t2 in zip(a1.trackpoints, a2.trackpoints):
-        assert_almost_equal(t1.timestamp, t2.timestamp)
-        assert_almost_equal(t1.latitude, t2.latitude)
-        assert_almost_equal(t1.longitude, t2.longitude)
-        assert_almost_equal(t1.altitude, t2.altitude)
-        assert_almost_equal(t1.heartrate, t2.heartrate)
-        assert_almost_equal(t1.velocity, t2.velocity, places=4)
+    path1 = a1.get_path()
+    path2 = a2.get_path()
+    assert_equal(len(path1["timestamps"]), len(path2["timestamps"]))
+    for key in ["timestamps", "coords", "altitudes", "heartrates"]:
+        assert_array_almost_equal(path1[key], path2[key])
+    assert_array_almost_equal(path1["velocities"], path2["velocities"],
+                              decimal=4)
+
+
+def test_export_missing_values():
+    activity = Activity(sport="running", start_time=datetime.now(),
+                        distance=0.0, time=1.0, calories=0.0, heartrate=0.0,
+                        has_path=True)
+    activity.set_path(
+        timestamps=np.array([1.5e9, 1.5e9 + 1.0]),
+        coords=np.deg2rad([[53.0, 8.0], [53.0, 8.0]]),
+        altitudes=np.array([0.0, 12.5]),
+        heartrates=np.array([np.nan, 140.0]),
+        velocities=np.zeros(2))
+    tcx = TcxExport().dumps(activity)
+    assert_equal(tcx.count("<Trackpoint>"), 2)
+    assert_equal(tcx.count("<AltitudeMeters>"), 1)
+    assert_in("<AltitudeMeters>12.5</AltitudeMeters>", tcx)
+    assert_in("<Value>nan</Value>", tcx)
+    assert_in("<LatitudeDegrees>53.0</LatitudeDegrees>", tcx)
+    assert_not_in("None", tcx)
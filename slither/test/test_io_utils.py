@@ -0,0 +1,87 @@
+import time
+from datetime import datetime
+import numpy as np
+from slither.io.utils import (
+    datetime_from_iso8601, timestamps_from_iso8601, timestamps_from_datetimes,
+    TrackpointBuffer, content_hash, local_time_strings)
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from nose.tools import assert_equal, assert_not_equal, assert_raises
+
+
+def test_datetime_from_iso8601():
+    expected = datetime(2021, 3, 4, 10, 0, 0)
+    for date_str in ["2021-03-04T10:00:00.000Z", "2021-03-04T10:00:00Z",
+                     "2021-03-04T10:00:00", "2021-03-04T10:00:00.5Z",
+                     "2021-03-04T10:00:00.123456", "2021-03-04T10:00:00+01:00",
+                     "2021-03-04T10:00:00-0530"]:
+        assert_equal(datetime_from_iso8601(date_str), expected)
+    assert_raises(ValueError, datetime_from_iso8601, "2021-03-04")
+    assert_raises(ValueError, datetime_from_iso8601,
+                  "2021-03-04T10:00:00 CET")
+
+
+def test_timestamps_from_iso8601_utc():
+    timestamps = timestamps_from_iso8601([
+        "1970-01-01T00:00:10.000Z", "1970-01-01T00:00:10.250Z",
+        "1970-01-01T01:00:10+01:00", "1970-01-01T00:00:10-0030",
+        "1970-01-01T00:00:10"])
+    assert_array_almost_equal(timestamps, [10.0, 10.25, 10.0, 1810.0, 10.0])
+
+
+def test_timestamps_from_iso8601_local_time():
+    date_strs = ["2020-03-29T00:59:59.000Z", "2020-03-29T01:30:00.000Z",
+                 "2020-10-25T02:30:00.000Z", "2021-01-01T12:00:00.000Z"]
+    expected = [time.mktime(datetime_from_iso8601(date_str).timetuple())
+                for date_str in date_strs]
+    assert_array_equal(
+        timestamps_from_iso8601(date_strs, local_time=True), expected)
+
+
+def test_timestamps_from_iso8601_empty():
+    assert_equal(len(timestamps_from_iso8601([])), 0)
+
+
+def test_timestamps_from_iso8601_unknown_format():
+    assert_raises(ValueError, timestamps_from_iso8601, ["2020-03-29"])
+    assert_raises(ValueError, timestamps_from_iso8601,
+                  ["2020-03-29T00:59:59 CET"])
+
+
+def test_timestamps_from_datetimes():
+    dates = [datetime(2020, 3, 29, 1, 30), datetime(2020, 7, 1, 12, 0)]
+    expected = [time.mktime(date.timetuple()) for date in dates]
+    assert_array_equal(
+        timestamps_from_datetimes(dates, local_time=True), expected)
+    assert_array_equal(
+        timestamps_from_datetimes([datetime(1970, 1, 1, 0, 1)]), [60.0])
+
+
+def test_trackpoint_buffer_grows():
+    buffer = TrackpointBuffer(capacity=2)
+    for t in range(5):
+        buffer.append("1970-01-01T00:00:0%d.000Z" % t, t, -t, 2 * t, np.nan)
+    path = buffer.path()
+    assert_equal(len(path["timestamps"]), 5)
+    assert_array_equal(np.diff(path["timestamps"]), np.ones(4))
+    assert_array_equal(path["coords"][:, 0], np.arange(5))
+    assert_array_equal(path["coords"][:, 1], -np.arange(5))
+    assert_array_equal(path["altitudes"], 2 * np.arange(5))
+
+
+def test_content_hash_normalizes_line_endings():
+    content = "<gpx>\n  <trk/>\n</gpx>\n"
+    assert_equal(content_hash(content), content_hash(content.encode()))
+    assert_equal(content_hash(content),
+                 content_hash(content.replace("\n", "\r\n")))
+    assert_not_equal(content_hash(content), content_hash("<gpx></gpx>"))
+
+
+def test_local_time_strings():
+    timestamps = 1.5e9 + np.array([0.0, 0.7, 59.9, 86400.0 * 180, 1e5])
+    expected = [datetime.fromtimestamp(t).strftime("%Y-%m-%dT%H:%M:%S")
+                for t in timestamps]
+    assert_equal(local_time_strings(timestamps).tolist(), expected)
+
+
+def test_local_time_strings_not_finite():
+    assert_raises(ValueError, local_time_strings, [1.5e9, np.nan])
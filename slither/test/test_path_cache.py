@@ -0,0 +1,91 @@
+import os
+import tempfile
+from datetime import datetime
+from unittest import mock
+import numpy as np
+from slither.domain_model import Activity
+from slither.path_cache import PathCache, MemoryPathCache
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_true, assert_false
+
+
+def test_store_load_invalidate():
+    cache = PathCache(tempfile.mkdtemp())
+    activity = Activity(id=3, sport="running",
+                        start_time=datetime(2020, 1, 1, 8, 30))
+    assert_true(cache.load(activity) is None)
+    path = {
+        "timestamps": np.arange(5.0),
+        "coords": np.arange(10.0).reshape(5, 2),
+        "altitudes": np.full(5, np.nan),
+        "heartrates": np.arange(100.0, 105.0),
+        "velocities": np.ones(5)
+    }
+    cache.store(activity, path)
+    cached_path = cache.load(activity)
+    for key in path:
+        assert_array_equal(cached_path[key], path[key])
+    assert_false(cached_path["timestamps"].flags.writeable)
+    assert_equal(len(os.listdir(cache.cache_dir)), 1)
+
+    cache.invalidate(activity)
+    assert_true(cache.load(activity) is None)
+    assert_equal(len(os.listdir(cache.cache_dir)), 0)
+    cache.invalidate(activity)
+
+
+def test_invalidate_mapped_file():
+    cache = PathCache(tempfile.mkdtemp())
+    activity = Activity(id=3, sport="running",
+                        start_time=datetime(2020, 1, 1, 8, 30))
+    path = {
+        "timestamps": np.arange(5.0),
+        "coords": np.arange(10.0).reshape(5, 2),
+        "altitudes": np.full(5, np.nan),
+        "heartrates": np.arange(100.0, 105.0),
+        "velocities": np.ones(5)
+    }
+    cache.store(activity, path)
+    cached_path = cache.load(activity)
+
+    # mapped files cannot be removed or replaced on Windows
+    with mock.patch("slither.path_cache.os.remove",
+                    side_effect=PermissionError):
+        cache.invalidate(activity)
+    assert_true(cache.load(activity) is None)
+    path["heartrates"] = np.arange(110.0, 115.0)
+    with mock.patch("slither.path_cache.os.replace",
+                    side_effect=PermissionError):
+        cache.store(activity, path)
+    assert_true(cache.load(activity) is None)
+    assert_equal(len(os.listdir(cache.cache_dir)), 2)
+    assert_array_equal(cached_path["heartrates"], np.arange(100.0, 105.0))
+
+    del cached_path
+    cache.store(activity, path)
+    assert_array_equal(cache.load(activity)["heartrates"], path["heartrates"])
+    assert_equal(len(os.listdir(cache.cache_dir)), 1)
+
+
+def test_memory_cache():
+    cache = MemoryPathCache(max_bytes=3 * 800)
+    for key in range(3):
+        cache.put(key, {"timestamps": np.zeros(100)})
+    assert_equal(len(cache), 3)
+    assert_equal(cache.n_bytes, 2400)
+    assert_true(cache.get(0) is not None)
+    cache.put(3, {"timestamps": np.zeros(100)})
+    # 1 is the least recently used key
+    assert_true(cache.get(1) is None)
+    assert_true(cache.get(0) is not None)
+    assert_equal((cache.hits, cache.misses, cache.evictions), (2, 1, 1))
+
+    cache.put(4, {"timestamps": np.zeros(1000)})
+    assert_true(cache.get(4) is None)
+    cache.invalidate(0)
+    assert_equal(cache.n_bytes, 1600)
+    cache.resize(800)
+    assert_equal(len(cache), 1)
+    assert_true(cache.get(3) is not None)
+    cache.clear()
+    assert_equal((len(cache), cache.n_bytes, cache.hits), (0, 0, 0))
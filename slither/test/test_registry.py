@@ -0,0 +1,149 @@
+import os
+import gzip
+import json
+import subprocess
+import sys
+import tempfile
+import pytest
+from slither.registry import Registry, RegistryWriter
+from nose.tools import assert_equal, assert_raises, assert_true, assert_false
+
+
+def test_update_and_delete():
+    registry = Registry(tempfile.mkdtemp())
+    registry.update("content", "a.tcx", 1.0)
+    registry.update_many([("content b", "b.tcx", 2.0),
+                          ("content c", os.path.join(
+                              registry.base_path, "c.tcx"), 3.0)])
+    assert_equal(registry.list(), {"a.tcx": 1.0, "b.tcx": 2.0, "c.tcx": 3.0})
+    assert_equal(registry.content("b.tcx"), "content b")
+    assert_equal(registry.timestamp(
+        os.path.join(registry.base_path, "c.tcx")), 3.0)
+    assert_equal(registry.list_modified_since(1.5),
+                 {"b.tcx": 2.0, "c.tcx": 3.0})
+    assert_raises(KeyError, registry.timestamp, "d.tcx")
+
+    registry.delete("a.tcx", 4.0)
+    assert_equal(registry.content("a.tcx"), None)
+    assert_equal(registry.timestamp("a.tcx"), 4.0)
+    assert_false(os.path.exists(os.path.join(registry.base_path, "a.tcx")))
+    registry.close()
+
+    registry = Registry(registry.temp_dir)
+    assert_equal(len(registry.list()), 3)
+
+
+def test_migrate_json():
+    temp_dir = tempfile.mkdtemp()
+    base_path = os.path.join(temp_dir, "data") + os.sep
+    json_filename = os.path.join(temp_dir, "registry.json")
+    with open(json_filename, "w") as f:
+        json.dump({base_path + "a.tcx": 1.0, base_path + "b.tcx": 2.0}, f)
+    registry = Registry(temp_dir)
+    assert_equal(registry.list(), {"a.tcx": 1.0, "b.tcx": 2.0})
+    assert_false(os.path.exists(json_filename))
+    assert_true(os.path.exists(json_filename + ".migrated"))
+
+
+def test_writer():
+    registry = Registry(tempfile.mkdtemp())
+    writer = RegistryWriter(registry, lambda item: "content %s" % item)
+    writer.update(1, "a.tcx", 1.0)
+    writer.update(2, "a.tcx", 2.0)
+    writer.update(3, "b.tcx")
+    writer.delete("b.tcx", 4.0)
+    writer.flush()
+    assert_false(writer.is_pending("a.tcx"))
+    assert_equal(registry.content("a.tcx"), "content 2")
+    assert_equal(registry.timestamp("a.tcx"), 2.0)
+    assert_equal(registry.content("b.tcx"), None)
+    assert_equal(registry.timestamp("b.tcx"), 4.0)
+    writer.close()
+    registry.close()
+
+
+def test_writer_errors():
+    registry = Registry(tempfile.mkdtemp())
+    writer = RegistryWriter(registry, _fail_render)
+    writer.update(0, "a.tcx")
+    writer.update(1, "b.tcx")
+    assert_raises(IOError, writer.flush)
+    assert_equal(registry.content("a.tcx"), "ok")
+    assert_equal(registry.content("b.tcx"), None)
+    # errors are reported once
+    writer.close()
+    registry.close()
+
+
+def test_writer_at_exit():
+    temp_dir = tempfile.mkdtemp()
+    # the process exits without closing the writer
+    subprocess.check_call([sys.executable, "-c", (
+        "from slither.registry import Registry, RegistryWriter\n"
+        "registry = Registry(%r)\n"
+        "writer = RegistryWriter(registry, lambda item: 'content')\n"
+        "for i in range(100):\n"
+        "    writer.update(i, '%%d.tcx' %% i, 1.0)\n") % temp_dir])
+    registry = Registry(temp_dir)
+    assert_equal(len(registry.list()), 100)
+    assert_equal(registry.content("99.tcx"), "content")
+    registry.close()
+
+
+def _fail_render(item):
+    if item == 0:
+        return "ok"
+    raise ValueError("Cannot render %s" % item)
+
+
+def test_compression():
+    registry = Registry(tempfile.mkdtemp(), compression="gzip")
+    registry.update("content ä", "a.tcx", 1.0)
+    filename = os.path.join(registry.base_path, "a.tcx")
+    assert_false(os.path.exists(filename))
+    with gzip.open(filename + ".gz", "rb") as f:
+        assert_equal(f.read().decode("utf-8"), "content ä")
+    assert_true(registry.exists("a.tcx"))
+    assert_equal(registry.content("a.tcx"), "content ä")
+    assert_equal(registry.list(), {"a.tcx": 1.0})
+
+    registry.delete("a.tcx")
+    assert_false(registry.exists("a.tcx"))
+    assert_false(os.path.exists(filename + ".gz"))
+    assert_equal(registry.content("a.tcx"), None)
+    registry.close()
+    assert_raises(ValueError, Registry, registry.temp_dir, "rar")
+
+
+def test_lazy_migration():
+    registry = Registry(tempfile.mkdtemp(), compression="none")
+    registry.update("content", "a.tcx", 1.0)
+    filename = os.path.join(registry.base_path, "a.tcx")
+    assert_true(os.path.exists(filename))
+    registry.close()
+
+    registry = Registry(registry.temp_dir, compression="gzip")
+    assert_true(registry.exists("a.tcx"))
+    assert_true(os.path.exists(filename))
+    assert_equal(registry.content("a.tcx"), "content")
+    assert_false(os.path.exists(filename))
+    assert_true(os.path.exists(filename + ".gz"))
+    assert_equal(registry.content("a.tcx"), "content")
+    assert_equal(registry.timestamp("a.tcx"), 1.0)
+
+    # files in other formats are replaced by updates
+    registry.compression = "none"
+    registry.update("new content", "a.tcx", 2.0)
+    assert_false(os.path.exists(filename + ".gz"))
+    assert_equal(registry.content("a.tcx"), "new content")
+    registry.close()
+
+
+def test_zstd():
+    pytest.importorskip("zstandard")
+    registry = Registry(tempfile.mkdtemp(), compression="zstd")
+    registry.update("content", "a.tcx", 1.0)
+    assert_true(os.path.exists(
+        os.path.join(registry.base_path, "a.tcx.zst")))
+    assert_equal(registry.content("a.tcx"), "content")
+    registry.close()
@@ -1,7 +1,17 @@
+import os
 import datetime
+import threading
+from unittest import mock
+from datetime import timedelta
+import numpy as np
 from slither.service import Service
-from slither.domain_model import Activity
-from nose.tools import assert_equal, assert_raises
+from slither.core.config import config
+from slither.domain_model import Activity, ActivityMetrics, Record, Trackpoint
+from slither.path_cache import memory_cache, activity_key
+from numpy.testing import assert_array_equal
+from nose.tools import (
+    assert_equal, assert_almost_equal, assert_raises, assert_true,
+    assert_false)
 
 
 def test_add_and_delete_activity():
@@ -69,3 +79,533 @@ def test_clone():
     assert_equal(len(activities), 0)
     activities = cloned_service.list_activities()
     assert_equal(len(activities), 0)
+
+
+def test_clone_does_not_recover_files():
+    service = Service(debug=True)
+    activity = Activity(
+        sport="running", start_time=datetime.datetime.now(), distance=0.0)
+    try:
+        service.database.session.add(activity)
+        service.database.session.commit()
+        target_filename = os.path.join(
+            service.full_datadir, activity.get_filename())
+        cloned_service = service.clone()
+        assert_false(cloned_service.registry_writer.is_pending(
+            target_filename))
+        cloned_service.close()
+        assert_false(service.registry.exists(target_filename))
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_clone_shares_queued_files():
+    service = Service(debug=True)
+    written = threading.Event()
+    render = service.registry_writer.render
+    service.registry_writer.render = lambda item: (
+        written.wait(), render(item))[1]
+    try:
+        service.new_activity(
+            {"sport": "running", "start_time": datetime.datetime.now(),
+             "distance": 0.0})
+        activity = service.list_activities()[0]
+        target_filename = os.path.join(
+            service.full_datadir, activity.get_filename())
+        cloned_service = service.clone()
+        # files queued by the parent are visible to the clone
+        assert_true(cloned_service._file_exists(target_filename))
+        written.set()
+        cloned_service.flush()
+        assert_true(cloned_service.registry.exists(target_filename))
+        cloned_service.close()
+        service.update_activity(activity, {"distance": 10.0})
+        service.flush()
+        assert_true(service.registry.exists(target_filename))
+    finally:
+        written.set()
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_import_many():
+    service = Service(debug=True)
+    filenames = ["test_data/running.tcx", "test_data/running.fit",
+                 "test_data/running.gpx", "test_data/missing.tcx",
+                 "test_data/running.tcx"]
+    imported = []
+    try:
+        errors = service.import_many(
+            filenames, workers=2, batch_size=2,
+            callback=lambda filename, activity, error: imported.append(
+                (filename, activity is not None)))
+        assert_equal(len(imported), 5)
+        assert_equal(sorted(errors.keys()),
+                     ["test_data/missing.tcx", "test_data/running.tcx"])
+        assert_true(isinstance(errors["test_data/running.tcx"], ValueError))
+        activities = service.list_activities()
+        assert_equal(len(activities), 3)
+        service.flush()
+        for activity in activities:
+            assert_true(activity.has_path)
+            assert_true(service.registry.exists(os.path.join(
+                service.full_datadir, activity.get_filename())))
+        assert_equal(len(service.get_best_splits(activities[0])), 8)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+
+
+def test_import_many_failed_batch():
+    service = Service(debug=True)
+    update_metrics_for = service._update_metrics_for
+
+    def fail_for_gpx(activity):
+        if activity.filetype == "gpx":
+            raise ValueError("Cannot store GPX")
+        update_metrics_for(activity)
+
+    service._update_metrics_for = fail_for_gpx
+    try:
+        errors = service.import_many(
+            ["test_data/running.tcx", "test_data/running.gpx",
+             "test_data/running.fit"], workers=1, batch_size=3)
+        assert_equal(list(errors.keys()), ["test_data/running.gpx"])
+        activities = service.list_activities()
+        assert_equal(len(activities), 2)
+        memory_cache.clear()
+        for activity in activities:
+            # trackpoint rows are inserted again after the rollback
+            n_trackpoints = service.database.session.query(Trackpoint).filter(
+                Trackpoint.activity_id == activity.id).count()
+            assert_true(n_trackpoints > 0)
+            assert_equal(len(activity.get_path()["timestamps"]),
+                         n_trackpoints)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+
+
+def test_import_many_start_time_tolerance():
+    service = Service(debug=True)
+    try:
+        service.import_many(["test_data/running.tcx"], workers=1)
+        activity = service.list_activities()[0]
+        service.update_activity(
+            activity, {"start_time": activity.start_time + timedelta(
+                seconds=30)})
+        errors = service.import_many(
+            ["test_data/running.tcx"], workers=1, start_time_tolerance=60)
+        assert_equal(len(errors), 1)
+        assert_equal(len(service.list_activities()), 1)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+
+
+def test_import_activity_twice():
+    service = Service(debug=True)
+    filename = "test_data/running.tcx"
+    try:
+        with open(filename, "r") as f:
+            content = f.read()
+        service.import_activity(content, filename)
+        assert_raises(ValueError, service.import_activity, content, filename)
+        # the same activity is recognized by its fingerprint
+        activity = service.list_activities()[0]
+        service.flush()
+        service.registry.delete(os.path.join(
+            service.full_datadir, activity.get_filename()))
+        assert_raises(ValueError, service.import_activity,
+                      content.replace("\n", "\r\n"), filename)
+        assert_raises(ValueError, service.import_activity,
+                      content + "\n", filename)
+        assert_equal(len(service.list_activities()), 1)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+
+
+def test_import_activity_without_content():
+    service = Service(debug=True)
+    filename = "test_data/running.fit"
+    try:
+        service.import_activity(None, filename)
+        assert_equal(len(service.list_activities()), 1)
+        assert_raises(ValueError, service.import_activity, None, filename)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_import_many_skips_known_files():
+    service = Service(debug=True)
+    filenames = ["test_data/running.tcx", "test_data/running.gpx"]
+    try:
+        errors = service.import_many(filenames, workers=1)
+        assert_equal(len(errors), 0)
+        errors = service.import_many(
+            filenames, workers=1, reader=_fail_reader)
+        assert_equal(sorted(errors.keys()), sorted(filenames))
+        for error in errors.values():
+            assert_true(isinstance(error, ValueError))
+        assert_equal(len(service.list_activities()), 2)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+    # fingerprints are deleted with the activity
+    assert_equal(len(service.import_many(filenames[:1], workers=1)), 0)
+    for a in service.list_activities():
+        service.delete_activity(a)
+
+
+def _fail_reader(filename):
+    raise AssertionError("Known files should not be read")
+
+
+def test_path_cache():
+    service = Service(debug=True)
+    try:
+        service.import_many(["test_data/running.tcx"], workers=1)
+        activity = service.list_activities()[0]
+        # paths of new activities are only kept in memory
+        assert_false(os.path.exists(service.path_cache._filename(activity)))
+        memory_cache.clear()
+        path = activity.get_path()
+        assert_true(activity.get_path() is path)
+        cache_filename = service.path_cache._filename(activity)
+        assert_true(os.path.exists(cache_filename))
+
+        service.update_activity(activity, {"sport": "other"})
+        service.flush()
+        assert_false(os.path.exists(cache_filename))
+        cached_path = activity.get_path()
+        assert_true(cached_path is not path)
+        assert_array_equal(cached_path["coords"], path["coords"])
+        cache_filename = service.path_cache._filename(activity)
+        assert_true(os.path.exists(cache_filename))
+
+        memory_cache.clear()
+        cached_path = activity.get_path()
+        assert_true(isinstance(cached_path["timestamps"], np.memmap))
+        assert_equal(memory_cache.misses, 1)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+    assert_false(os.path.exists(cache_filename))
+    assert_equal(len(memory_cache), 0)
+
+
+def test_set_path_of_stored_activity():
+    service = Service(debug=True)
+    try:
+        imported = []
+        service.import_many(
+            ["test_data/running.tcx"], workers=1,
+            callback=lambda filename, activity, error: imported.append(
+                activity))
+        # stored activities do not keep their path outside of the cache
+        assert_false(hasattr(imported[0], "path"))
+        assert_true(memory_cache.get(activity_key(imported[0])) is not None)
+
+        activity = service.list_activities()[0]
+        memory_cache.clear()
+        path = activity.get_path()
+        cache_filename = service.path_cache._filename(activity)
+        assert_true(os.path.exists(cache_filename))
+
+        activity.set_path(
+            path["timestamps"], path["coords"], path["altitudes"],
+            np.full(len(path["timestamps"]), 150.0), path["velocities"])
+        assert_false(hasattr(activity, "path"))
+        assert_false(os.path.exists(cache_filename))
+        assert_array_equal(activity.get_path()["heartrates"], 150.0)
+        assert_equal(memory_cache.n_bytes, sum(
+            channel.nbytes for channel in activity.get_path().values()))
+    finally:
+        service.database.session.rollback()
+        for a in service.list_activities():
+            service.delete_activity(a)
+
+
+def test_activity_metrics():
+    service = Service(debug=True)
+    try:
+        service.import_many(["test_data/running.tcx"], workers=1)
+        activity = service.list_activities()[0]
+        metrics = activity.metrics
+        assert_true(0.0 < metrics.moving_time <= activity.time)
+        assert_true(metrics.elevation_gain > 0.0)
+        assert_true(metrics.heartrate_min <= metrics.heartrate_median
+                    <= metrics.heartrate_max)
+        assert_true(metrics.average_pace > 0.0)
+
+        pace = metrics.average_pace
+        service.update_activity(activity, {"distance": 2 * activity.distance})
+        assert_almost_equal(activity.metrics.average_pace, pace / 2.0)
+        assert_equal(service.database.session.query(
+            ActivityMetrics).count(), 1)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+    assert_equal(service.database.session.query(ActivityMetrics).count(), 0)
+
+
+def test_activity_metrics_without_gps():
+    service = Service(debug=True)
+    activity = Activity(
+        sport="running", start_time=datetime.datetime(2000, 10, 10),
+        distance=1000.0, time=300.0, has_path=True)
+    n_steps = 301
+    activity.set_path(
+        np.arange(n_steps, dtype=float), np.full((n_steps, 2), np.nan),
+        np.full(n_steps, np.nan), np.full(n_steps, 150.0),
+        np.full(n_steps, np.nan))
+    try:
+        service.add_new_activity(activity)
+        assert_equal(activity.metrics.moving_time, 300.0)
+        assert_equal(activity.metrics.average_pace, 300.0)
+        summary = service.summarize_years("running")
+        assert_equal(summary[0]["moving_time"], 300.0)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_write_behind():
+    service = Service(debug=True)
+    filename = "test_data/running.tcx"
+    try:
+        with open(filename, "r") as f:
+            service.import_activity(f.read(), filename)
+        activity = service.list_activities()[0]
+        target_filename = os.path.join(
+            service.full_datadir, activity.get_filename())
+        # the same file cannot be added before it has been written
+        assert_raises(ValueError, service.add_new_activity, Activity(
+            sport=activity.sport, start_time=activity.start_time,
+            distance=0.0))
+        service.flush()
+        assert_true(service.registry.exists(target_filename))
+        assert_equal(service.registry.content(target_filename)[:5],
+                     "<?xml")
+
+        service.delete_activity(activity)
+        service.flush()
+        assert_false(service.registry.exists(target_filename))
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_recover_missing_files():
+    service = Service(debug=True)
+    activity = Activity(
+        sport="running", start_time=datetime.datetime.now(), distance=0.0)
+    try:
+        # activity file has not been written before the service stopped
+        service.database.session.add(activity)
+        service.database.session.commit()
+        target_filename = os.path.join(
+            service.full_datadir, activity.get_filename())
+        service.close()
+        assert_false(service.registry.exists(target_filename))
+
+        service = Service(debug=True)
+        service.flush()
+        assert_true(service.registry.exists(target_filename))
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+    # deleted files will not be recovered
+    service = Service(debug=True)
+    service.database.session.add(activity)
+    service.database.session.commit()
+    service.close()
+    service = Service(debug=True)
+    service.flush()
+    assert_false(service.registry.exists(target_filename))
+    for a in service.list_activities():
+        service.delete_activity(a)
+    service.close()
+
+
+def test_reprocess():
+    service = Service(debug=True)
+    try:
+        service.import_many(
+            ["test_data/running.tcx", "test_data/running.gpx"], workers=1)
+        activities = service.list_activities()
+        running = [a for a in activities if a.sport == "running"][0]
+        expected = {}
+        for activity in activities:
+            expected[activity.id] = (
+                np.array(activity.get_path()["velocities"]),
+                service.get_best_splits(activity),
+                activity.metrics.moving_time)
+            # derived data of a previous configuration
+            activity.set_velocities(
+                2.0 * activity.get_path()["velocities"])
+            service._invalidate_path(activity)
+            service._delete_records_for(activity)
+        service.database.session.commit()
+        records = service._get_records_for_activity(running)
+        assert_equal(len(records), 0)
+        service._add_records_for(running)
+        service.database.session.commit()
+        records = service._get_records_for_activity(running)
+        service.invalidate_record(records[0])
+
+        processed = []
+        stats = service.reprocess(
+            workers=2, batch_size=1,
+            callback=lambda activity, error: processed.append(activity.id))
+        assert_equal(sorted(processed), sorted(expected))
+        assert_equal(stats["activities"], 2)
+        assert_equal(stats["skipped"], 0)
+        assert_equal(len(stats["errors"]), 0)
+        assert_true(stats["trackpoints"] > 0)
+        assert_false(os.path.exists(service.checkpoint_filename))
+
+        for activity in service.list_activities():
+            velocities, splits, moving_time = expected[activity.id]
+            assert_array_equal(activity.get_path()["velocities"], velocities)
+            assert_equal(service.get_best_splits(activity), splits)
+            assert_equal(activity.metrics.moving_time, moving_time)
+        records = service._get_records_for_activity(running)
+        assert_false(records[0].valid)
+        assert_true(all(record.valid for record in records[1:]))
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_reprocess_unknown_segments():
+    service = Service(debug=True)
+    try:
+        service.import_many(["test_data/running.gpx"], workers=1)
+        activity = service.list_activities()[0]
+        assert_array_equal(activity.get_segment_starts(), [0])
+        velocities = 2.0 * activity.get_path()["velocities"]
+        activity.set_velocities(velocities)
+        # e.g., imported by a previous version
+        activity.segments = None
+        service.database.session.commit()
+        stats = service.reprocess(workers=1)
+        assert_equal(stats["activities"], 1)
+        assert_equal(stats["trackpoints"], 0)
+        assert_array_equal(activity.get_path()["velocities"], velocities)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def test_reprocess_resume():
+    service = Service(debug=True)
+
+    def interrupt(activity, error):
+        raise KeyboardInterrupt()
+
+    try:
+        service.import_many(
+            ["test_data/running.tcx", "test_data/running.gpx"], workers=1)
+        assert_raises(KeyboardInterrupt, service.reprocess, workers=1,
+                      batch_size=1, callback=interrupt)
+        assert_true(os.path.exists(service.checkpoint_filename))
+
+        stats = service.reprocess(workers=1)
+        assert_equal(stats["activities"], 1)
+        assert_equal(stats["skipped"], 1)
+        assert_false(os.path.exists(service.checkpoint_filename))
+
+        # a different selection of activities starts from the beginning
+        assert_raises(KeyboardInterrupt, service.reprocess, workers=1,
+                      batch_size=1, callback=interrupt)
+        stats = service.reprocess(service.list_activities()[:1], workers=1)
+        assert_equal(stats["activities"], 1)
+        assert_equal(stats["skipped"], 0)
+        stats = service.reprocess(workers=1, resume=False)
+        assert_equal(stats["activities"], 2)
+        assert_equal(stats["skipped"], 0)
+
+        # activities that could not be reprocessed are retried
+        with mock.patch("slither.service.recompute_velocities",
+                        side_effect=ValueError("Cannot reprocess")):
+            stats = service.reprocess(workers=1, batch_size=1)
+        assert_equal(len(stats["errors"]), 2)
+        assert_true(os.path.exists(service.checkpoint_filename))
+        stats = service.reprocess(workers=1)
+        assert_equal(stats["activities"], 2)
+        assert_equal(stats["skipped"], 0)
+        assert_false(os.path.exists(service.checkpoint_filename))
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
+
+
+def _best_times(service, sport, distance, k):
+    q = service.database.session.query(Record.time).filter(
+        Record.sport == sport, Record.distance == distance, Record.valid,
+        Record.time < float("inf"))
+    return [time for time, in q.order_by(Record.time).limit(k)]
+
+
+def test_leaderboard():
+    service = Service(debug=True)
+    size = config["leaderboard"]["size"]
+    config["leaderboard"]["size"] = 3
+    try:
+        start_time = datetime.datetime(2000, 10, 10)
+        for i, time in enumerate([300.0, 250.0, 400.0, 200.0, 350.0]):
+            service.add_new_activity(Activity(
+                sport="running", start_time=start_time + timedelta(days=i),
+                distance=1000.0, time=time, has_path=False))
+        entries = service.leaderboard("running", 1000.0)
+        assert_equal([entry.rank for entry in entries], [1, 2, 3])
+        assert_equal([entry.time for entry in entries], [200.0, 250.0, 300.0])
+        assert_equal(entries[0].activity.time, 200.0)
+        assert_equal(len(service.leaderboard("running", 1000.0, 2)), 2)
+        assert_raises(ValueError, service.leaderboard, "running", 1000.0, 4)
+
+        service.delete_activity(entries[0].activity)
+        times = [entry.time for entry in service.leaderboard(
+            "running", 1000.0)]
+        assert_equal(times, [250.0, 300.0, 350.0])
+        assert_equal(times, _best_times(service, "running", 1000.0, 3))
+
+        record = service.leaderboard("running", 1000.0)[0].record
+        service.invalidate_record(record)
+        times = [entry.time for entry in service.leaderboard(
+            "running", 1000.0)]
+        assert_equal(times, [300.0, 350.0, 400.0])
+        assert_equal(times, _best_times(service, "running", 1000.0, 3))
+
+        activity = service.leaderboard("running", 1000.0)[2].activity
+        service.update_activity(activity, {"time": 100.0})
+        times = [entry.time for entry in service.leaderboard(
+            "running", 1000.0)]
+        assert_equal(times, [100.0, 300.0, 350.0])
+        assert_equal(times, _best_times(service, "running", 1000.0, 3))
+
+        records = [(r.sport, r.distance, r.time)
+                   for r in service.list_records() if r.sport == "running"]
+        assert_true(("running", 1000.0, 100.0) in records)
+        assert_true(("running", 400.0, 40.0) in records)
+        assert_false(any(r.time == float("inf")
+                         for r in service.list_records()))
+    finally:
+        config["leaderboard"]["size"] = size
+        for a in service.list_activities():
+            service.delete_activity(a)
+        service.close()
@@ -70,3 +70,25 @@ def test_week_summary():
     finally:
         for a in service.list_activities():
             service.delete_activity(a)
+
+
+def test_summary_metrics():
+    service = Service(debug=True)
+    service.new_activity({"start_time": datetime(year=2000, month=1, day=1),
+                          "sport": "running",
+                          "distance": 5.0,
+                          "time": 3.0})
+    service.new_activity({"start_time": datetime(year=2000, month=1, day=2),
+                          "sport": "swimming",
+                          "distance": 1.0,
+                          "time": 2.0})
+    try:
+        summary = service.summarize_years()
+        assert_equal(summary[0]["n_activities"], 2)
+        assert_equal(summary[0]["distance"], 6.0)
+        # activities without path: moving time is the total time
+        assert_equal(summary[0]["moving_time"], 5.0)
+        assert_equal(summary[0]["elevation_gain"], 0.0)
+    finally:
+        for a in service.list_activities():
+            service.delete_activity(a)
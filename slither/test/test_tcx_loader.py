@@ -1,7 +1,11 @@
 import os
 from datetime import datetime
+import numpy as np
 from slither.loader import TcxLoader
-from nose.tools import assert_equal, assert_in
+from slither.io.tcx_loader import read_tcx
+from numpy.testing import assert_array_equal
+from nose.tools import (
+    assert_equal, assert_in, assert_true, assert_almost_equal)
 
 
 def test_load_tracked_activity():
@@ -26,3 +30,79 @@ def test_load_tracked_activity():
     assert_in("heartrates", paths)
     assert_in("velocities", paths)
     assert_equal(len(paths["timestamps"]), 750)
+
+
+TCX_TWO_LAPS = """<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase
+    xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+  <Activities>
+    <Activity Sport="Biking">
+      <Lap StartTime="2021-03-13T12:00:00.000Z">
+        <TotalTimeSeconds>2</TotalTimeSeconds>
+        <DistanceMeters>20</DistanceMeters>
+        <Calories>10</Calories>
+        <AverageHeartRateBpm><Value>100</Value></AverageHeartRateBpm>
+        <Track>
+          <Trackpoint>
+            <Time>2021-03-13T12:00:00.000Z</Time>
+            <Position>
+              <LatitudeDegrees>53.0</LatitudeDegrees>
+              <LongitudeDegrees>8.0</LongitudeDegrees>
+            </Position>
+            <AltitudeMeters>10.0</AltitudeMeters>
+            <HeartRateBpm><Value>100</Value></HeartRateBpm>
+          </Trackpoint>
+          <Trackpoint>
+            <Time>2021-03-13T12:00:02.000Z</Time>
+            <Position>
+              <LatitudeDegrees>53.0001</LatitudeDegrees>
+              <LongitudeDegrees>8.0</LongitudeDegrees>
+            </Position>
+          </Trackpoint>
+        </Track>
+      </Lap>
+      <Lap StartTime="2021-03-13T12:00:02.000Z">
+        <TotalTimeSeconds>6</TotalTimeSeconds>
+        <DistanceMeters>30</DistanceMeters>
+        <Calories>20</Calories>
+        <AverageHeartRateBpm><Value>120</Value></AverageHeartRateBpm>
+        <Track>
+          <Trackpoint>
+            <Time>2021-03-13T12:00:04.000Z</Time>
+          </Trackpoint>
+        </Track>
+      </Lap>
+    </Activity>
+  </Activities>
+</TrainingCenterDatabase>
+"""
+
+
+def test_load_multiple_laps():
+    metadata, path = read_tcx(TCX_TWO_LAPS)
+    assert_equal(metadata["sport"], "biking")
+    assert_equal(
+        metadata["start_time"],
+        datetime(year=2021, month=3, day=13, hour=12))
+    assert_equal(metadata["distance"], 50.0)
+    assert_equal(metadata["time"], 8.0)
+    assert_equal(metadata["calories"], 30.0)
+    assert_equal(metadata["heartrate"], 115.0)
+    assert_true(metadata["has_path"])
+    assert_equal(len(path["timestamps"]), 3)
+    assert_array_equal(path["altitudes"], [10.0, 0.0, 0.0])
+    assert_array_equal(path["heartrates"][0], 100.0)
+    assert_true(np.isnan(path["heartrates"][1:]).all())
+    assert_true(np.isnan(path["coords"][2]).all())
+    # each track starts with velocity 0
+    assert_equal(path["velocities"][2], 0.0)
+    assert_almost_equal(path["velocities"][1], 5.564, places=3)
+
+
+def test_load_timestamps_without_milliseconds():
+    metadata, path = read_tcx(TCX_TWO_LAPS.replace(".000Z", "Z"))
+    assert_equal(
+        metadata["start_time"],
+        datetime(year=2021, month=3, day=13, hour=12))
+    _, expected_path = read_tcx(TCX_TWO_LAPS)
+    assert_array_equal(path["timestamps"], expected_path["timestamps"])
@@ -1,6 +1,6 @@
 import numpy as np
 from slither.loader import TcxLoader
-from slither.core.visualization import make_map
+from slither.core.visualization import make_map, generate_distance_markers
 from nose.tools import assert_equal, assert_in
 
 
@@ -19,3 +19,15 @@ def test_make_empty_map():
     d = map.to_dict()
     assert_equal(d["name"], "Map")
     assert_in("openstreetmap", d["children"])
+
+
+def test_generate_distance_markers():
+    with open("test_data/running.tcx", "r") as f:
+        loader = TcxLoader(f.read())
+    path = loader.load().get_path()
+    markers = generate_distance_markers(path, "running")
+    assert_equal(list(markers.keys())[:2], ["400 m", "800 m"])
+    assert_equal(generate_distance_markers(path), markers)
+    # swimming distances are scaled by 100 m / 1000 m
+    markers = generate_distance_markers(path, "swimming")
+    assert_equal(list(markers.keys())[:2], ["200 m", "400 m"])